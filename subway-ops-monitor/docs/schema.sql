@@ -1,32 +1,432 @@
--- 테이블명: subway_time
--- AGENT.md의 표준 스키마 정의에 따름
-
-CREATE TABLE IF NOT EXISTS subway_time (
-    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
-    
-    -- API 원본 데이터 매핑
-    line_id VARCHAR(50),          -- subwayId (지하철 호선 ID)
-    line_name VARCHAR(50),        -- subwayNm (지하철 호선명)
-    station_id VARCHAR(50),       -- statnId (지하철 역 ID)
-    station_name VARCHAR(100),    -- statnNm (지하철 역명)
-    train_number VARCHAR(50),     -- trainNo (열차 번호)
-    last_rec_date VARCHAR(20),    -- lastRecptnDt (최종 수신 날짜)
-    last_rec_time VARCHAR(20),    -- recptnDt (최종 수신 시간)
-    direction_type VARCHAR(10),   -- updnLine (0:상행/내선, 1:하행/외선)
-    dest_station_id VARCHAR(50),  -- statnTid (종착역 ID)
-    dest_station_name VARCHAR(100), -- statnTnm (종착역명)
-    train_status VARCHAR(10),     -- trainSttus (0:진입, 1:도착, 2:출발, 3:전전역출발 등)
-    is_express VARCHAR(10),       -- directAt (1:급행, 0:아님, 7:특급)
-    is_last_train VARCHAR(10),    -- lstcarAt (Boolean 변환 전 원본 저장 고려하여 VARCHAR 혹은 Boolean)
-                                  -- 보통 API는 "0", "1"로 줌. 여기서는 VARCHAR로 받고 변환 로직은 Python에서 처리하거나
-                                  -- DB에서 처리. AGENT.md에는 Boolean 변환이라 되어있으므로 Boolean으로 선언.
-    
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now()) NOT NULL
+-- 열차 위치 스키마 (AGENT.md 의 표준 컬럼을 정규화)
+-- - lines / stations: 호선/역 차원 테이블 (API 코드 subwayId/statnId 와 이름을 한 번만 저장)
+-- - subway_positions: 좁은 사실(fact) 테이블, 호선/역은 차원 테이블 id, 코드 값은 SMALLINT
+--   created_at 기준 일 단위 RANGE 파티션 (파티션명: subway_positions_pYYYYMMDD, 한국시간 기준 하루)
+--   파티션 키가 PK에 포함되어야 하므로 PK는 (id, created_at)
+-- - subway_time: 조회용 뷰 (차원 테이블을 조인해 기존 컬럼명/코드 그대로 제공)
+-- 이 파일이 유일한 DDL 정의이며 DbClient.initialize_table / init_db.py / tabel생성.py 모두 이 파일을 실행합니다.
+
+CREATE TABLE IF NOT EXISTS lines (
+    id SMALLINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    code VARCHAR(10) NOT NULL UNIQUE,     -- subwayId (지하철 호선 ID, 예: 1002)
+    name VARCHAR(50)                      -- subwayNm (지하철 호선명)
+);
+
+CREATE TABLE IF NOT EXISTS stations (
+    id INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    code VARCHAR(20) NOT NULL UNIQUE,     -- statnId / statnTid (지하철 역 ID, 예: 1002000222)
+    line_id SMALLINT REFERENCES lines (id),
+    name VARCHAR(100)                     -- statnNm / statnTnm (지하철 역명)
 );
 
+CREATE TABLE IF NOT EXISTS subway_positions (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY,
+
+    line_id SMALLINT REFERENCES lines (id),              -- subwayId
+    station_id INTEGER REFERENCES stations (id),         -- statnId
+    dest_station_id INTEGER REFERENCES stations (id),    -- statnTid (종착역)
+    train_number VARCHAR(10),     -- trainNo (열차 번호)
+    last_rec_date DATE,           -- lastRecptnDt (최종 수신 날짜)
+    last_rec_time TIMESTAMP,      -- recptnDt (최종 수신 시간, 한국시간)
+    direction_type SMALLINT,      -- updnLine (0:상행/내선, 1:하행/외선)
+    train_status SMALLINT,        -- trainSttus (0:진입, 1:도착, 2:출발, 3:전전역출발 등)
+    is_express SMALLINT,          -- directAt (1:급행, 0:아님, 7:특급)
+    is_last_train BOOLEAN,        -- lstcarAt (0/1 → false/true)
+
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now()) NOT NULL,
+
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
 -- 인덱스 설정 (조회 성능 최적화)
-CREATE INDEX IF NOT EXISTS idx_subway_positions_created_at ON subway_time(created_at);
-CREATE INDEX IF NOT EXISTS idx_subway_positions_line_id ON subway_time(line_id);
-CREATE INDEX IF NOT EXISTS idx_subway_positions_station_id ON subway_time(station_id);
+-- 시간 범위 조회는 BRIN (적재 순서 = 시간 순서라 매우 작은 크기로 범위 스캔 가능)
+CREATE INDEX IF NOT EXISTS idx_subway_positions_created_at_brin ON subway_positions USING BRIN (created_at);
+-- (created_at, id) keyset 페이지 조회용 (DbClient.fetch_range / fetch_latest)
+CREATE INDEX IF NOT EXISTS idx_subway_positions_created_id ON subway_positions (created_at, id);
+CREATE INDEX IF NOT EXISTS idx_subway_positions_line_created ON subway_positions (line_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_subway_positions_station_id ON subway_positions (station_id);
+
+COMMENT ON TABLE subway_positions IS '서울 지하철 실시간 열차 위치 모니터링 테이블 (일 단위 파티션, 정규화)';
+
+-- 조회용 뷰: 호선/역 코드와 이름을 조인해 기존 subway_time 컬럼명으로 제공
+CREATE OR REPLACE VIEW subway_time AS
+SELECT p.id,
+       l.code AS line_id,
+       l.name AS line_name,
+       s.code AS station_id,
+       s.name AS station_name,
+       p.train_number,
+       p.last_rec_date,
+       p.last_rec_time,
+       p.direction_type,
+       d.code AS dest_station_id,
+       d.name AS dest_station_name,
+       p.train_status,
+       p.is_express,
+       p.is_last_train,
+       p.created_at
+FROM subway_positions p
+LEFT JOIN lines l ON l.id = p.line_id
+LEFT JOIN stations s ON s.id = p.station_id
+LEFT JOIN stations d ON d.id = p.dest_station_id;
+
+COMMENT ON VIEW subway_time IS '열차 위치 조회용 뷰 (subway_positions + lines/stations)';
+
+-- 정규화 이전의 subway_time(테이블, DbClient 가 subway_time_legacy 로 이름 변경)의 행을 옮깁니다.
+-- 호선/역 차원 행을 먼저 채우고, 문자열 코드 값은 형식이 맞는 경우에만 숫자/날짜로 변환합니다.
+CREATE OR REPLACE FUNCTION migrate_subway_time_legacy()
+RETURNS BIGINT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    migrated BIGINT;
+BEGIN
+    INSERT INTO lines (code, name)
+    SELECT line_id::text, max(line_name)
+    FROM subway_time_legacy
+    WHERE line_id IS NOT NULL
+    GROUP BY line_id::text
+    ON CONFLICT (code) DO NOTHING;
+
+    INSERT INTO stations (code, line_id, name)
+    SELECT s.code, min(l.id), max(s.name)
+    FROM (
+        SELECT station_id::text AS code, line_id::text AS line_code, station_name AS name FROM subway_time_legacy
+        UNION ALL
+        SELECT dest_station_id::text, line_id::text, dest_station_name FROM subway_time_legacy
+    ) s
+    LEFT JOIN lines l ON l.code = s.line_code
+    WHERE s.code IS NOT NULL
+    GROUP BY s.code
+    ON CONFLICT (code) DO NOTHING;
+
+    INSERT INTO subway_positions (
+        id, line_id, station_id, dest_station_id, train_number, last_rec_date, last_rec_time,
+        direction_type, train_status, is_express, is_last_train, created_at
+    )
+    SELECT t.id, l.id, s.id, d.id, t.train_number,
+           CASE WHEN t.last_rec_date::text ~ '^\d{8}$' THEN to_date(t.last_rec_date::text, 'YYYYMMDD') END,
+           CASE WHEN t.last_rec_time::text ~ '^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$'
+                THEN t.last_rec_time::text::timestamp END,
+           CASE WHEN t.direction_type::text ~ '^\d{1,4}$' THEN t.direction_type::text::smallint END,
+           CASE WHEN t.train_status::text ~ '^\d{1,4}$' THEN t.train_status::text::smallint END,
+           CASE WHEN t.is_express::text ~ '^\d{1,4}$' THEN t.is_express::text::smallint END,
+           lower(t.is_last_train::text) IN ('true', 't', '1'),
+           t.created_at
+    FROM subway_time_legacy t
+    LEFT JOIN lines l ON l.code = t.line_id::text
+    LEFT JOIN stations s ON s.code = t.station_id::text
+    LEFT JOIN stations d ON d.code = t.dest_station_id::text;
+    GET DIAGNOSTICS migrated = ROW_COUNT;
+    RETURN migrated;
+END;
+$$;
+
+-- from_day ~ to_day (한국시간 기준 날짜, 양끝 포함) 의 일 단위 파티션을 생성합니다.
+-- 이미 존재하는 파티션은 건너뛰며, 새로 만든 파티션 수를 반환합니다.
+CREATE OR REPLACE FUNCTION create_subway_time_partitions(from_day DATE, to_day DATE)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    d DATE;
+    partition_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    FOR d IN SELECT generate_series(from_day, to_day, INTERVAL '1 day')::DATE LOOP
+        partition_name := format('subway_positions_p%s', to_char(d, 'YYYYMMDD'));
+        IF to_regclass(partition_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF subway_positions FOR VALUES FROM (%L) TO (%L)',
+                partition_name,
+                d::TIMESTAMP AT TIME ZONE 'Asia/Seoul',
+                (d + 1)::TIMESTAMP AT TIME ZONE 'Asia/Seoul'
+            );
+            created := created + 1;
+        END IF;
+    END LOOP;
+    RETURN created;
+END;
+$$;
+
+-- 보관 기간(keep_days)이 지난 파티션을 DETACH 후 DROP 합니다. (DELETE 없이 파일 단위로 정리)
+-- detach_only 가 TRUE 이면 분리만 하고 테이블은 남겨 둡니다. (별도 보관/백업 용도)
+CREATE OR REPLACE FUNCTION drop_subway_time_partitions(keep_days INTEGER, detach_only BOOLEAN DEFAULT FALSE)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    part RECORD;
+    cutoff DATE := (now() AT TIME ZONE 'Asia/Seoul')::DATE - keep_days;
+    removed INTEGER := 0;
+BEGIN
+    FOR part IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = 'subway_positions'
+          AND c.relname ~ '^subway_positions_p[0-9]{8}$'
+          AND to_date(substring(c.relname FROM 19), 'YYYYMMDD') < cutoff
+        ORDER BY c.relname
+    LOOP
+        EXECUTE format('ALTER TABLE subway_positions DETACH PARTITION %I', part.relname);
+        IF NOT detach_only THEN
+            EXECUTE format('DROP TABLE %I', part.relname);
+        END IF;
+        removed := removed + 1;
+    END LOOP;
+    RETURN removed;
+END;
+$$;
+
+-- 스풀 재적재 시 중복 방지를 위한 배치 반영 기록 (batch_id 단위로 한 번만 적재)
+CREATE TABLE IF NOT EXISTS ingest_batches (
+    batch_id VARCHAR(64) PRIMARY KEY,
+    applied_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL
+);
+
+-- 스풀 배치 적재 (REST 경로용 RPC) - batch_id 기록과 사실 테이블 적재를 한 트랜잭션으로 처리하여
+-- 재전송해도 이미 반영된 배치는 건너뜀 (copy/values 경로의 DbClient._write_batches 와 같은 동작)
+-- batches: [{"batch_id": "...", "rows": [{line_id, station_id, ..., created_at}, ...]}, ...]
+CREATE OR REPLACE FUNCTION ingest_spool_batches(batches JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    batch JSONB;
+    inserted INTEGER;
+    written INTEGER := 0;
+BEGIN
+    FOR batch IN SELECT value FROM jsonb_array_elements(batches) LOOP
+        INSERT INTO ingest_batches (batch_id) VALUES (batch->>'batch_id') ON CONFLICT (batch_id) DO NOTHING;
+        IF NOT FOUND THEN
+            CONTINUE;
+        END IF;
+        INSERT INTO subway_positions (line_id, station_id, dest_station_id, train_number, last_rec_date,
+                                      last_rec_time, direction_type, train_status, is_express, is_last_train,
+                                      created_at)
+        SELECT line_id, station_id, dest_station_id, train_number, last_rec_date,
+               last_rec_time, direction_type, train_status, is_express, is_last_train,
+               created_at
+        FROM jsonb_populate_recordset(NULL::subway_positions, batch->'rows');
+        GET DIAGNOSTICS inserted = ROW_COUNT;
+        written := written + inserted;
+    END LOOP;
+    RETURN written;
+END;
+$$;
+
+-- 수집기 수평 분할(샤딩) - 인스턴스 생존 신호와 호선별 임대(lease)
+-- 임대는 expires_at(DB 시각)까지 유효하며, 비어 있거나 만료된 임대만 다른 인스턴스가 가져감 (src/sharding.py)
+CREATE TABLE IF NOT EXISTS collector_instances (
+    instance_id VARCHAR(128) PRIMARY KEY,
+    heartbeat_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS collector_leases (
+    line_id VARCHAR(50) PRIMARY KEY,
+    owner VARCHAR(128),
+    expires_at TIMESTAMP WITH TIME ZONE,
+    acquired_at TIMESTAMP WITH TIME ZONE
+);
+
+-- 분/시간 단위 집계(rollup) 테이블 - 호선/역/방향별 지표를 미리 합산해 둠
+-- station_id = '*' 행은 호선/방향 전체 합계 (역 구분 없이 집계)
+-- 평균/표준편차를 정확히 다시 합칠 수 있도록 개수/합/제곱합을 저장 (시간 단위 = 분 단위 행의 합)
+-- headway_*: 배차 간격(초), dwell_*: 체류 시간(초)
+-- observations / express_observations / active_trains_* 는 적재된 행 기준입니다.
+-- CHANGE_DETECTION 을 켜면 상태가 바뀐 관측만 적재되므로, 조회 횟수나 운행 열차 수가 아니라
+-- 상태 전이 횟수와 그 분에 상태가 바뀐 열차 수가 됩니다. (정차 중이라 상태가 그대로인 열차는 세지 않음)
+-- 배차 간격/체류 시간은 상태가 바뀐 시각만으로 계산하므로 CHANGE_DETECTION 과 관계없이 같은 의미입니다.
+CREATE TABLE IF NOT EXISTS subway_rollup_minute (
+    bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+    line_id VARCHAR(50) NOT NULL,
+    line_name VARCHAR(50),
+    station_id VARCHAR(50) NOT NULL,
+    station_name VARCHAR(100),
+    direction_type VARCHAR(10) NOT NULL,
+
+    observations INTEGER NOT NULL,              -- 적재된 위치 행 수 (CHANGE_DETECTION 사용 시 상태 전이 횟수)
+    express_observations INTEGER NOT NULL,      -- 급행/특급 적재 행 수 (급행 비율 = express_observations / observations)
+    active_trains_max INTEGER NOT NULL,         -- 분 단위 적재 행이 있는 열차 수의 최대값
+    active_train_minutes INTEGER NOT NULL,      -- 분 단위 적재 행이 있는 열차 수의 합 (평균 = active_train_minutes / minutes)
+    minutes INTEGER NOT NULL,                   -- 집계에 포함된 분 단위 구간 수
+
+    arrivals INTEGER NOT NULL,
+    headway_count INTEGER NOT NULL,
+    headway_sum DOUBLE PRECISION NOT NULL,
+    headway_sumsq DOUBLE PRECISION NOT NULL,
+    headway_max DOUBLE PRECISION,
+
+    dwell_count INTEGER NOT NULL,
+    dwell_sum DOUBLE PRECISION NOT NULL,
+    dwell_sumsq DOUBLE PRECISION NOT NULL,
+    dwell_max DOUBLE PRECISION,
+
+    PRIMARY KEY (bucket, line_id, station_id, direction_type)
+);
+
+CREATE TABLE IF NOT EXISTS subway_rollup_hour (LIKE subway_rollup_minute INCLUDING ALL);
+
+-- [from_ts, to_ts] 에 걸친 분 단위 집계와, 그 분이 속한 시간 단위 집계를 원본 행에서 다시 계산합니다.
+-- 배치가 적재될 때마다 해당 배치의 created_at 범위로 호출하므로 매번 몇 분 분량만 다시 계산합니다.
+-- 같은 구간을 여러 번 계산해도 결과가 같으므로(멱등) 스풀 재적재/늦게 도착한 행도 그대로 반영됩니다.
+-- 배차 간격/체류 시간은 구간 이전 행이 필요하므로 lookback 만큼 앞의 행까지 읽습니다.
+-- (직전 도착이 lookback 보다 오래된 배차 간격은 집계하지 않음)
+-- line_ids 를 주면 그 호선(배치에 포함된 호선)의 행만 다시 계산하고, NULL 이면 모든 호선을 다시 계산합니다.
+-- 여러 수집기 인스턴스가 같은 구간을 동시에 다시 계산하지 않도록 트랜잭션 advisory lock 으로 직렬화합니다.
+-- (호선별 잠금은 호선 ID 순서로 잡아 교착을 피하고, 전체 호선 계산은 모든 호선별 계산과 배타적)
+-- 잠금은 적재 트랜잭션이 끝날 때 풀리므로, 뒤에 잠금을 얻은 쪽은 앞선 쪽이 커밋한 집계를 보고 다시 계산합니다.
+-- 이전 버전(line_ids 없는 3개 인자)과 호출이 모호해지지 않도록 먼저 지웁니다.
+DROP FUNCTION IF EXISTS refresh_subway_rollups(TIMESTAMP WITH TIME ZONE, TIMESTAMP WITH TIME ZONE, INTERVAL);
+
+CREATE OR REPLACE FUNCTION refresh_subway_rollups(
+    from_ts TIMESTAMP WITH TIME ZONE,
+    to_ts TIMESTAMP WITH TIME ZONE,
+    lookback INTERVAL DEFAULT INTERVAL '20 minutes',
+    line_ids VARCHAR[] DEFAULT NULL
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    lo TIMESTAMP WITH TIME ZONE := date_trunc('minute', from_ts);
+    hi TIMESTAMP WITH TIME ZONE := date_trunc('minute', to_ts) + INTERVAL '1 minute';
+    hour_lo TIMESTAMP WITH TIME ZONE := date_trunc('hour', from_ts);
+    hour_hi TIMESTAMP WITH TIME ZONE := date_trunc('hour', to_ts) + INTERVAL '1 hour';
+    written INTEGER;
+    lock_line VARCHAR;
+BEGIN
+    IF line_ids IS NULL THEN
+        PERFORM pg_advisory_xact_lock(hashtext('refresh_subway_rollups'));
+    ELSE
+        PERFORM pg_advisory_xact_lock_shared(hashtext('refresh_subway_rollups'));
+        FOR lock_line IN SELECT DISTINCT l FROM unnest(line_ids) AS l ORDER BY l LOOP
+            PERFORM pg_advisory_xact_lock(hashtext('refresh_subway_rollups'), hashtext(lock_line));
+        END LOOP;
+    END IF;
+
+    DELETE FROM subway_rollup_minute
+    WHERE bucket >= lo AND bucket < hi AND (line_ids IS NULL OR line_id = ANY(line_ids));
+
+    INSERT INTO subway_rollup_minute
+    WITH src AS (
+        SELECT id, created_at, train_number, train_status, is_express, line_name, station_name,
+               coalesce(line_id, '') AS line_id,
+               coalesce(station_id, '') AS station_id,
+               coalesce(direction_type::text, '') AS direction_type
+        FROM subway_time
+        WHERE created_at >= lo - lookback AND created_at < hi
+          AND (line_ids IS NULL OR coalesce(line_id, '') = ANY(line_ids))
+    ),
+    -- 배차 간격: 같은 호선/역/방향에서 직전 행과 열차가 바뀐 행을 도착으로 봄 (headway.py 와 같은 정의)
+    arrivals AS (
+        SELECT line_id, station_id, direction_type, created_at,
+               extract(epoch FROM created_at - lag(created_at) OVER (
+                   PARTITION BY line_id, station_id, direction_type ORDER BY created_at, id
+               )) AS headway
+        FROM (
+            SELECT *, train_number IS DISTINCT FROM lag(train_number) OVER (
+                       PARTITION BY line_id, station_id, direction_type ORDER BY created_at, id
+                   ) AS is_arrival
+            FROM src
+        ) marked
+        WHERE is_arrival
+    ),
+    -- 체류 시간: 열차별로 역이 바뀔 때마다 방문을 나누고, 방문의 첫 도착(1) ~ 첫 출발(2) 차이 (trips.py 와 같은 정의)
+    dwells AS (
+        SELECT line_id, station_id, direction_type, departure,
+               extract(epoch FROM departure - arrival) AS dwell
+        FROM (
+            SELECT line_id, station_id, direction_type,
+                   min(created_at) FILTER (WHERE train_status = 1) AS arrival,
+                   min(created_at) FILTER (WHERE train_status = 2) AS departure
+            FROM (
+                SELECT *, sum(station_changed) OVER (
+                           PARTITION BY line_id, train_number ORDER BY created_at, id
+                       ) AS visit
+                FROM (
+                    SELECT *, CASE WHEN station_id IS DISTINCT FROM lag(station_id) OVER (
+                                       PARTITION BY line_id, train_number ORDER BY created_at, id
+                                   ) THEN 1 ELSE 0 END AS station_changed
+                    FROM src
+                ) changed
+            ) visits
+            GROUP BY line_id, train_number, visit, station_id, direction_type
+        ) v
+        WHERE departure >= arrival
+    ),
+    obs AS (
+        SELECT date_trunc('minute', created_at) AS bucket, line_id,
+               max(line_name) AS line_name,
+               CASE WHEN grouping(station_id) = 1 THEN '*' ELSE station_id END AS station_id,
+               CASE WHEN grouping(station_id) = 1 THEN NULL ELSE max(station_name) END AS station_name,
+               direction_type,
+               count(*) AS observations,
+               count(*) FILTER (WHERE is_express IN (1, 7)) AS express_observations,
+               count(DISTINCT train_number) AS active_trains
+        FROM src
+        WHERE created_at >= lo
+        GROUP BY GROUPING SETS (
+            (date_trunc('minute', created_at), line_id, station_id, direction_type),
+            (date_trunc('minute', created_at), line_id, direction_type)
+        )
+    ),
+    hw AS (
+        SELECT date_trunc('minute', created_at) AS bucket, line_id,
+               CASE WHEN grouping(station_id) = 1 THEN '*' ELSE station_id END AS station_id,
+               direction_type,
+               count(*) AS arrivals,
+               count(headway) AS headway_count,
+               coalesce(sum(headway), 0) AS headway_sum,
+               coalesce(sum(headway * headway), 0) AS headway_sumsq,
+               max(headway) AS headway_max
+        FROM arrivals
+        WHERE created_at >= lo
+        GROUP BY GROUPING SETS (
+            (date_trunc('minute', created_at), line_id, station_id, direction_type),
+            (date_trunc('minute', created_at), line_id, direction_type)
+        )
+    ),
+    dw AS (
+        SELECT date_trunc('minute', departure) AS bucket, line_id,
+               CASE WHEN grouping(station_id) = 1 THEN '*' ELSE station_id END AS station_id,
+               direction_type,
+               count(*) AS dwell_count,
+               sum(dwell) AS dwell_sum,
+               sum(dwell * dwell) AS dwell_sumsq,
+               max(dwell) AS dwell_max
+        FROM dwells
+        WHERE departure >= lo
+        GROUP BY GROUPING SETS (
+            (date_trunc('minute', departure), line_id, station_id, direction_type),
+            (date_trunc('minute', departure), line_id, direction_type)
+        )
+    )
+    SELECT o.bucket, o.line_id, o.line_name, o.station_id, o.station_name, o.direction_type,
+           o.observations, o.express_observations, o.active_trains, o.active_trains, 1,
+           coalesce(h.arrivals, 0), coalesce(h.headway_count, 0),
+           coalesce(h.headway_sum, 0), coalesce(h.headway_sumsq, 0), h.headway_max,
+           coalesce(d.dwell_count, 0), coalesce(d.dwell_sum, 0), coalesce(d.dwell_sumsq, 0), d.dwell_max
+    FROM obs o
+    LEFT JOIN hw h USING (bucket, line_id, station_id, direction_type)
+    LEFT JOIN dw d USING (bucket, line_id, station_id, direction_type);
+    GET DIAGNOSTICS written = ROW_COUNT;
+
+    -- 시간 단위 집계는 분 단위 집계를 합산해 다시 만듦
+    DELETE FROM subway_rollup_hour
+    WHERE bucket >= hour_lo AND bucket < hour_hi AND (line_ids IS NULL OR line_id = ANY(line_ids));
+    INSERT INTO subway_rollup_hour
+    SELECT date_trunc('hour', bucket), line_id, max(line_name), station_id, max(station_name), direction_type,
+           sum(observations), sum(express_observations), max(active_trains_max),
+           sum(active_train_minutes), sum(minutes),
+           sum(arrivals), sum(headway_count), sum(headway_sum), sum(headway_sumsq), max(headway_max),
+           sum(dwell_count), sum(dwell_sum), sum(dwell_sumsq), max(dwell_max)
+    FROM subway_rollup_minute
+    WHERE bucket >= hour_lo AND bucket < hour_hi AND (line_ids IS NULL OR line_id = ANY(line_ids))
+    GROUP BY date_trunc('hour', bucket), line_id, station_id, direction_type;
 
-COMMENT ON TABLE subway_time IS '서울 지하철 실시간 열차 위치 모니터링 테이블';
+    RETURN written;
+END;
+$$;
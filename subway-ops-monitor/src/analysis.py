@@ -1,112 +1,223 @@
 import pandas as pd
+from config import Config
 from db_client import DbClient
-from datetime import timedelta
+from headway import summarize_headways
+from trips import reconstruct_visits, event_times, TripReconstructor
+from turnaround import compute_turnarounds, turnaround_stats
+from interference import detect_interference
+from topology import get_topology, train_spacing
+from rollup import rollup_metrics, combine_rollups
+from frames import typed_frame, concat_frames
+from datetime import datetime, timedelta, timezone
 
 class SubwayAnalyzer:
-    def __init__(self):
+    def __init__(self, window_minutes: int = None):
         self.db = DbClient()
+        # 증분 조회용 롤링 윈도우 (최근 window 만큼의 행만 메모리에 유지)
+        self.window = timedelta(minutes=window_minutes or Config.ANALYSIS_WINDOW_MINUTES)
+        self._window_df = pd.DataFrame()
+        # 마지막으로 가져온 행의 created_at (워터마크)
+        self._last_created = None
+        # 워터마크보다 이만큼 앞에서부터 다시 읽어, 늦게 커밋된 행(여러 인스턴스, 스풀 재적재)도 가져옴
+        # (겹쳐 읽은 행은 윈도우의 id 로 걸러내므로 윈도우보다 길 수 없음)
+        self.overlap = min(timedelta(seconds=Config.ANALYSIS_FETCH_OVERLAP_SECONDS), self.window)
+        # 증분 조회된 새 행으로 열차 방문 기록(체류/주행 시간)을 갱신
+        self.trips = TripReconstructor()
 
     def fetch_data(self, limit=1000):
         """최근 데이터를 가져옵니다."""
         print(f"Fetching last {limit} records from DB...")
-        response = self.db.supabase.table("subway_time")\
-            .select("*")\
-            .order("created_at", desc=True)\
-            .limit(limit)\
-            .execute()
-        
-        df = pd.DataFrame(response.data)
-        if not df.empty:
-            df['created_at'] = pd.to_datetime(df['created_at'])
-            df['last_rec_time'] = pd.to_datetime(df['last_rec_time'], errors='coerce') # API 포맷에 따라 조정 필요
-        return df
+        # PostgREST 응답 행 수 제한에 걸리지 않도록 keyset 페이지로 나눠 조회
+        rows = self.db.fetch_latest(limit)
+        return self._to_frame(rows)
+
+    def fetch_range(self, start: datetime, end: datetime):
+        """[start, end) 시간 구간의 데이터를 모두 가져옵니다. (구간 분할 병렬 조회)"""
+        print(f"Fetching records from {start} to {end}...")
+        return self._to_frame(self.db.fetch_range(start, end))
+
+    def fetch_incremental(self, page_size: int = 1000):
+        """
+        워터마크(created_at)에서 overlap 만큼 앞선 시각 이후의 행을 가져와, 윈도우에 없던 행만 롤링 윈도우에 추가합니다.
+        id 는 커밋 순서와 다르게 늘어날 수 있으므로(여러 인스턴스가 동시에 적재, 스풀 재적재) id 대신
+        created_at 구간을 겹쳐 읽고 id 로 중복을 제거합니다.
+        첫 호출 시에는 최근 window 구간을 불러오고, 이후에는 새 행 + 겹친 구간에 비례하는 비용만 듭니다.
+        윈도우보다 오래된 행은 제거됩니다.
+        :return: 현재 윈도우 DataFrame
+        """
+        if self._last_created is None:
+            since = datetime.now(timezone.utc) - self.window
+        else:
+            since = self._last_created - self.overlap
+
+        rows = self.db.fetch_since(since, page_size=page_size)
+        if rows and not self._window_df.empty:
+            known = set(self._window_df['id'].tolist())
+            rows = [row for row in rows if row['id'] not in known]
+
+        if rows:
+            new_df = self._to_frame(rows)
+            latest = new_df['created_at'].max()
+            self._last_created = latest if self._last_created is None else max(self._last_created, latest)
+            self.trips.update(new_df)
+            self._window_df = concat_frames([self._window_df, new_df])
+            print(f"Fetched {len(rows)} new records (watermark created_at={self._last_created.isoformat()}).")
+
+        # 윈도우 밖으로 밀려난 행 제거
+        if not self._window_df.empty:
+            cutoff = self._window_df['created_at'].max() - self.window
+            self._window_df = self._window_df[self._window_df['created_at'] >= cutoff].reset_index(drop=True)
+
+        return self._window_df
+
+    def fetch_rollups(self, grain: str = 'hour', start: datetime = None, end: datetime = None,
+                      station_level: bool = False, line_id: str = None, station_id: str = None):
+        """
+        분/시간 단위 집계 테이블을 조회합니다. (과거 구간 조회용, 원본 행을 읽지 않음)
+        기본 구간은 최근 24시간이며, 지표 컬럼(headway_mean 등)을 계산해 붙입니다.
+        """
+        end = end or datetime.now(timezone.utc)
+        start = start or end - timedelta(hours=24)
+        df = pd.DataFrame(self.db.fetch_rollups(grain, start, end, station_level=station_level,
+                                                line_id=line_id, station_id=station_id))
+        if df.empty:
+            return df
+        df['bucket'] = pd.to_datetime(df['bucket'])
+        return rollup_metrics(df)
+
+    def analyze_history(self, hours: int = 24, freq: str = None):
+        """
+        최근 hours 시간 동안의 호선별 시간대 지표 추이 (시간 단위 집계 테이블 사용)
+        :param freq: 시간보다 큰 단위로 다시 묶을 때 지정 (예: 'D')
+        """
+        end = datetime.now(timezone.utc)
+        rollups = self.fetch_rollups('hour', end - timedelta(hours=hours), end)
+        if rollups.empty:
+            return rollups
+        # 방향 구분 없이 호선 단위로 합침 (bucket 은 유지)
+        return combine_rollups(rollups, ['line_id', 'line_name'], freq=freq or 'h')
+
+    def reset_window(self):
+        """롤링 윈도우와 워터마크를 초기화합니다."""
+        self._window_df = pd.DataFrame()
+        self._last_created = None
+        self.trips = TripReconstructor()
+
+    def _visits(self, df):
+        """
+        df 구간의 열차 방문 기록을 반환합니다.
+        df 가 증분 윈도우(fetch_incremental)의 행이면 배치마다 갱신해 둔 방문 기록(self.trips)을 df 구간만큼 잘라 쓰고,
+        그 밖의 프레임(fetch_data/fetch_range 결과 등)은 df 에서 다시 재구성합니다.
+        """
+        window = self._window_df
+        if not window.empty and not df.empty and df['id'].isin(window['id']).all():
+            return self.trips.current(since=event_times(df).min())
+        return reconstruct_visits(df)
+
+    def _to_frame(self, rows: list):
+        """
+        DB 조회 결과(행 리스트)를 분석용 DataFrame으로 변환합니다.
+        반복 문자열은 category, 코드 값은 int8, 시각은 명시적 포맷으로 파싱합니다. (frames.typed_frame)
+        """
+        return typed_frame(rows)
 
     def analyze_interval_regularity(self, df):
         """1. 배차 간격 정기성 분석"""
         print("\n=== [Analysis 1] 배차 간격 정기성 분석 ===")
         if df.empty:
             print("데이터가 부족합니다.")
-            return
+            return pd.DataFrame()
 
-        # 특정 노선/방향/역 기준으로 정렬
-        # 예: 2호선(1002), 내선(0), 특정 역
-        # 여기서는 전체 데이터에서 샘플링하여 보여줌
-        
-        target_lines = df['line_name'].unique()
-        
-        for line in target_lines:
-            line_df = df[df['line_name'] == line]
-            # 역별로 그룹화하여 시간 차이 계산
-            # (단순화를 위해 데이터가 충분하다고 가정하고 가장 최근 도착 시간들의 차이를 계산)
-            
-            # 같은 역, 같은 방향의 열차들에 대해 도착 시간 차이 계산
-            # train_status: 1(도착) 인 경우만 필터링하거나, last_rec_time 기준으로 정렬
-            
-            sorted_df = line_df.sort_values(by=['station_name', 'direction_type', 'created_at'])
-            sorted_df['prev_arrival'] = sorted_df.groupby(['station_name', 'direction_type'])['created_at'].shift(1)
-            sorted_df['interval'] = sorted_df['created_at'] - sorted_df['prev_arrival']
-            
-            # 배차 간격 통계
-            intervals = sorted_df['interval'].dropna()
-            if not intervals.empty:
-                avg_interval = intervals.mean()
-                std_interval = intervals.std() # 표준편차로 불규칙성 측정 (Bunching Index 유사)
-                
-                print(f"[{line}] 평균 배차 간격: {avg_interval}, 불규칙성(One Sigma): {std_interval}")
-            else:
-                print(f"[{line}] 배차 간격 계산을 위한 데이터 부족")
-                
-        # Return summary stats for dashboard
-        # Group by line and calculate stats
-        if not df.empty:
-            df_sorted = df.sort_values(by=['station_name', 'direction_type', 'created_at'])
-            df_sorted['prev_arrival'] = df_sorted.groupby(['station_name', 'direction_type'])['created_at'].shift(1)
-            df_sorted['interval'] = (df_sorted['created_at'] - df_sorted['prev_arrival']).dt.total_seconds() / 60.0
-            
-            # Line-level stats
-            stats = df_sorted.groupby('line_name')['interval'].agg(['mean', 'std', 'count']).reset_index()
+        # 호선 단위 배차 간격 통계 (평균/표준편차/변동계수/백분위수)
+        stats = self.analyze_headways(df)['line']
+        if stats.empty:
+            print("배차 간격 계산을 위한 데이터 부족")
             return stats
-        return pd.DataFrame()
+
+        for row in stats.itertuples(index=False):
+            print(f"[{row.line_name}] 평균 배차 간격: {row.mean:.1f}분, 불규칙성(One Sigma): {row.std:.1f}분, "
+                  f"Bunching Index(CV): {row.cv:.2f}")
+
+        # Return summary stats for dashboard
+        return stats
+
+    def analyze_headways(self, df):
+        """
+        호선/방향/역 단위 배차 간격 통계를 반환합니다.
+        :return: {'line': DataFrame, 'direction': DataFrame, 'station': DataFrame}
+        """
+        return summarize_headways(df)
 
     def analyze_delay_hotspots(self, df):
         """2. 지연 발생 구간 탐지 (체류 시간)"""
         print("\n=== [Analysis 2] 지연 발생 구간 (Hotspots) ===")
         if df.empty: return pd.DataFrame()
 
-        # train_number 별로 역에서의 체류 시간 추정
-        # 같은 train_number가 같은 station_id에서 머무르는 시간 (count * batch_interval)
-        
-        # 열차별, 역별 체류 횟수 카운트
-        dwell_counts = df.groupby(['line_name', 'station_name', 'train_number']).size().reset_index(name='observed_count')
-        
-        # 단순히 많이 관측된 곳 = 오래 머무른 곳으로 추정 (배치 주기가 1분이면 count 3 = 3분 체류)
-        # 상위 5개 지연 의심 역 출력
-        top_delays = dwell_counts.sort_values(by='observed_count', ascending=False).head(10)
+        # 열차별 궤적(진입→도착→출발)을 재구성하여 역별 실제 체류 시간(초) 계산
+        visits = self._visits(df)
+        dwell = visits.dropna(subset=['dwell'])
+        if dwell.empty:
+            print("체류 시간 계산을 위한 도착/출발 기록이 부족합니다.")
+            return pd.DataFrame()
+
+        hotspots = dwell.groupby(['line_name', 'station_name'], observed=True)['dwell']\
+            .agg(mean_dwell_sec='mean', p90_dwell_sec=lambda x: x.quantile(0.9), max_dwell_sec='max', observed_count='count')\
+            .reset_index()
+
+        # 평균 체류 시간이 긴 역 = 지연 의심 구간
+        top_delays = hotspots.sort_values(by='mean_dwell_sec', ascending=False).head(10).round(1)
         print("Top 5 체류 시간 긴 구간 (지연 의심):")
         print(top_delays.head(5))
         return top_delays
 
+    def analyze_travel_times(self, df):
+        """역간 주행 시간 (이전 역 출발 → 다음 역 도착) 통계"""
+        visits = self._visits(df)
+        travel = visits.dropna(subset=['travel'])
+        if travel.empty:
+            return pd.DataFrame()
+        return travel.groupby(['line_name', 'station_name', 'next_station_name'], observed=True)['travel']\
+            .agg(mean_travel_sec='mean', std_travel_sec='std', observed_count='count')\
+            .reset_index()
+
     def analyze_turnaround_efficiency(self, df):
         """3. 회차 효율성 분석"""
         print("\n=== [Analysis 3] 회차 효율성 분석 ===")
-        # 종착역 근처 데이터 필터링
-        # train_status가 도착(1)이고 dest_station_name와 station_name이 같은 경우 찾기 등
-        print("데이터가 더 축적되어야 분석 가능합니다. (현재 로직 준비 중)")
+        if df.empty: return pd.DataFrame()
+
+        # 종착역 도착(station_id == dest_station_id, 도착) ~ 반대 방향 첫 관측까지의 시간
+        turnarounds = compute_turnarounds(df)
+        stats = turnaround_stats(turnarounds)
+        if stats.empty:
+            print("종착역 도착 후 회차가 관측되지 않았습니다. (데이터 축적 필요)")
+            return stats
+
+        renumbered = (turnarounds['matched_by'] == 'renumbered').sum()
+        print(f"회차 {len(turnarounds)}건 (열차번호 변경 {renumbered}건)")
+        print(stats.sort_values('p90', ascending=False).head(5).round(1))
+        return stats
 
     def analyze_express_interference(self, df):
         """4. 급행/일반 열차 간섭 분석"""
         print("\n=== [Analysis 4] 급행/일반 간섭 분석 ===")
         if df.empty: return
-        
-        express_trains = df[df['is_express'] == '1']
-        normal_trains = df[df['is_express'] == '0']
-        
-        print(f"수집된 급행 위치 수: {len(express_trains)}, 일반 위치 수: {len(normal_trains)}")
-        # 같은 역에 동시에 존재하거나 근접한 경우 탐지 로직 (복잡하므로 개수만 출력)
-        return {
-            "express_count": len(express_trains),
-            "normal_count": len(normal_trains)
-        }
+
+        # 스냅샷별 열차 위치를 비교하여 추월 횟수 / 간섭(급행이 일반 바로 뒤에 붙은) 시간 산출
+        result = detect_interference(df, topology=get_topology(df))
+        print(f"수집된 급행 위치 수: {result['express_count']}, 일반 위치 수: {result['normal_count']}")
+        print(f"추월 {int(result['overtakes']['overtake_count'].sum())}회, "
+              f"간섭 {result['interference']['interference_sec'].sum() / 60:.1f}분")
+        if not result['interference'].empty:
+            print(result['interference'].head(5))
+        return result
+
+    def analyze_train_spacing(self, df):
+        """역 순서 색인 기반 열차 간격(앞 열차까지의 역 수) 통계"""
+        spacing = train_spacing(df, get_topology(df)).dropna(subset=['spacing'])
+        if spacing.empty:
+            return pd.DataFrame()
+        return spacing.groupby(['line_name', 'direction_type'], observed=True)['spacing']\
+            .agg(['mean', 'std', 'min', 'max', 'count']).reset_index()
 
     def run_all(self):
         df = self.fetch_data(limit=2000)
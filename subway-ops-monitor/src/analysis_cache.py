@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+
+# 캐시에 None 결과도 저장할 수 있도록 "없음"을 나타내는 별도 값 사용
+_MISSING = object()
+
+class AnalysisCache:
+    """
+    프로세스 전체가 공유하는 조회/분석 결과 캐시입니다.
+    - 키: (결과 종류, 조회 구간, 데이터 워터마크) 등 호출하는 쪽에서 정한 튜플
+    - TTL 이 지나거나 최대 개수를 넘으면 가장 오래 사용하지 않은 항목부터 제거 (LRU)
+    - 같은 키를 여러 세션이 동시에 요청하면 한 번만 계산하고 나머지는 결과를 기다림
+    """
+
+    def __init__(self, ttl: float = None, max_entries: int = None):
+        self.ttl = Config.CACHE_TTL if ttl is None else ttl
+        self.max_entries = max_entries or Config.CACHE_MAX_ENTRIES
+        self._entries = OrderedDict()   # key -> (만료 시각, 값)
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, compute, ttl: float = None):
+        """
+        캐시에 유효한 값이 있으면 반환하고, 없으면 compute() 결과를 저장 후 반환합니다.
+        :param ttl: 이 항목에만 적용할 TTL(초)
+        """
+        value = self._get(key)
+        if value is not _MISSING:
+            return value
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # 다른 세션이 먼저 계산했으면 그 결과 사용
+            value = self._get(key, count=False)
+            if value is not _MISSING:
+                return value
+            value = compute()
+            self._put(key, value, self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._key_locks.pop(key, None)
+        return value
+
+    def invalidate(self, prefix: tuple = None):
+        """prefix 로 시작하는 키(미지정 시 전체)를 제거합니다."""
+        with self._lock:
+            if prefix is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[:len(prefix)] == prefix]:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _get(self, key, count: bool = True):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._entries[key]
+                if count:
+                    self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            if count:
+                self.hits += 1
+            return entry[1]
+
+    def _put(self, key, value, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
@@ -1,33 +1,166 @@
 import requests
 import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from requests.adapters import HTTPAdapter
 from config import Config
+from metrics import API_LATENCY, API_ERRORS
+from logs import log
 
 class SeoulSubwayAPI:
-    def __init__(self):
+    def __init__(self, recorder=None):
         self.api_key = Config.SEOUL_API_KEY
         self.base_url = Config.SEOUL_API_URL
+        # (connect, read) 타임아웃 - 응답 없는 요청이 배치 전체를 붙잡지 않도록 함
+        self.timeout = (Config.API_CONNECT_TIMEOUT, Config.API_READ_TIMEOUT)
+
+        # keep-alive 세션: 호선별 요청이 TCP 연결을 재사용하도록 커넥션 풀 크기를 워커 수에 맞춤
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=Config.COLLECT_WORKERS + Config.PAGE_WORKERS)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # 호선별 동시 조회용 스레드 풀 (배치 간 재사용)
+        self._executor = ThreadPoolExecutor(max_workers=Config.COLLECT_WORKERS, thread_name_prefix="subway-api")
+        # 추가 페이지 조회용 풀 (호선 워커가 페이지 결과를 기다리며 교착되지 않도록 분리)
+        self._page_executor = ThreadPoolExecutor(max_workers=Config.PAGE_WORKERS, thread_name_prefix="subway-api-page")
+        # 원본 응답 기록기 (recorder.PayloadRecorder, 선택)
+        self.recorder = recorder
 
     def get_realtime_positions(self, subway_line: str):
         """
         특정 호선의 실시간 열차 위치 정보를 가져옵니다.
+        첫 페이지의 전체 건수(list_total_count)를 확인한 뒤 나머지 페이지를 병렬로 조회합니다.
         :param subway_line: 호선명 (예: '1호선', '2호선')
         :return: API 응답 JSON 데이터 (리스트)
         """
-        # API URL 구성: http://swopenapi.seoul.go.kr/api/subway/(key)/json/realtimePosition/0/50/(line)
-        # 0/50은 요청 시작/종료 인덱스
-        url = f"{self.base_url}/{self.api_key}/json/realtimePosition/0/50/{subway_line}"
-        
+        page_size = Config.API_PAGE_SIZE
+        fetched_at = datetime.datetime.now(datetime.timezone.utc)
+        data = self._fetch_page(subway_line, 0, page_size - 1)
+        if data is None:
+            return []
+        pages = [(0, page_size - 1, data)]
+
+        if 'realtimePositionList' not in data:
+            self._record(subway_line, pages, fetched_at)
+            result = data.get('RESULT') or data.get('errorMessage') or {}
+            API_ERRORS.inc(line=subway_line, type=f"result_{result.get('CODE') or result.get('code') or 'unknown'}")
+            log("api_error", f"[API Error] {subway_line} 데이터 없음 또는 에러: {data.get('RESULT', {}).get('MESSAGE')}",
+                level="error", line=subway_line, result=result)
+            return []
+
+        positions = list(data['realtimePositionList'])
+        total = self._total_count(data, len(positions))
+
+        # 나머지 페이지는 동시에 요청하고, 순서대로 이어 붙임
+        if total > len(positions):
+            starts = range(page_size, total, page_size)
+            futures = [
+                self._page_executor.submit(self._fetch_page, subway_line, start, start + page_size - 1)
+                for start in starts
+            ]
+            for start, future in zip(starts, futures):
+                page = future.result()
+                if page:
+                    positions.extend(page.get('realtimePositionList', []))
+                    pages.append((start, start + page_size - 1, page))
+
+            if len(positions) < total:
+                API_ERRORS.inc(line=subway_line, type="missing_pages")
+                log("api_missing_pages", f"[API Warning] {subway_line} 일부 페이지 누락 ({len(positions)}/{total})",
+                    level="warning", line=subway_line, fetched=len(positions), total=total)
+
+        self._record(subway_line, pages, fetched_at)
+        return positions
+
+    def _record(self, subway_line: str, pages: list, fetched_at):
+        """원본 응답을 기록합니다. 기록 실패가 수집을 멈추지 않도록 경고만 출력합니다."""
+        if self.recorder is None:
+            return
+        try:
+            self.recorder.record(subway_line, pages, fetched_at)
+        except (OSError, ValueError) as e:
+            print(f"[Record Error] {subway_line} 응답 기록 실패: {e}")
+
+    def _fetch_page(self, subway_line: str, start: int, end: int):
+        """
+        지정한 인덱스 구간(start~end)의 원본 응답을 가져옵니다.
+        :return: 응답 JSON(dict), 요청 실패 시 None
+        """
+        # API URL 구성: http://swopenapi.seoul.go.kr/api/subway/(key)/json/realtimePosition/(start)/(end)/(line)
+        url = f"{self.base_url}/{self.api_key}/json/realtimePosition/{start}/{end}/{subway_line}"
+
+        request_start = time.perf_counter()
         try:
-            response = requests.get(url)
+            response = self.session.get(url, timeout=self.timeout)
             response.raise_for_status()
-            data = response.json()
-            
-            if 'realtimePositionList' in data:
-                return data['realtimePositionList']
-            else:
-                print(f"[API Error] {subway_line} 데이터 없음 또는 에러: {data.get('RESULT', {}).get('MESSAGE')}")
-                return []
-                
-        except requests.exceptions.RequestException as e:
-            print(f"[API Error] 요청 실패: {e}")
-            return []
+            return response.json()
+
+        except (requests.exceptions.RequestException, ValueError) as e:
+            API_ERRORS.inc(line=subway_line, type=type(e).__name__)
+            log("api_error", f"[API Error] {subway_line} ({start}/{end}) 요청 실패: {e}",
+                level="error", line=subway_line, start=start, end=end, error=str(e))
+            return None
+
+        finally:
+            API_LATENCY.observe(time.perf_counter() - request_start, line=subway_line)
+
+    @staticmethod
+    def _total_count(data: dict, default: int) -> int:
+        """
+        응답에서 전체 건수를 읽습니다.
+        문서상 list_total_count 이지만 실제 응답은 errorMessage.total 또는 각 행의 totalCount로 내려오기도 함
+        """
+        candidates = [
+            data.get('list_total_count'),
+            (data.get('errorMessage') or {}).get('total'),
+        ]
+        rows = data.get('realtimePositionList') or []
+        if rows:
+            candidates.append(rows[0].get('totalCount'))
+
+        for value in candidates:
+            try:
+                if value is not None:
+                    return int(value)
+            except (TypeError, ValueError):
+                continue
+        return default
+
+    def iter_realtime_positions(self, subway_lines: list, deadline: float = None):
+        """
+        여러 호선을 동시에 조회하고, 응답이 도착하는 순서대로 (호선명, 데이터)를 돌려줍니다.
+        배치 소요 시간은 전체 호선의 합이 아니라 가장 느린 호선에 맞춰집니다.
+        :param subway_lines: 호선명 리스트
+        :param deadline: 호선별 최대 대기 시간(초, 조회 시작 기준). 초과한 호선은 빈 리스트로 처리
+        """
+        deadline = Config.LINE_DEADLINE if deadline is None else deadline
+        expires = time.monotonic() + deadline
+        futures = {self._executor.submit(self.get_realtime_positions, line): line for line in subway_lines}
+
+        # 마감은 조회 시작 시각 기준으로만 계산 (호출한 쪽이 적재하느라 늦게 돌아와도
+        # 그 사이 완료된 호선은 마감 이후라도 모두 돌려줌)
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=max(expires - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                yield futures[future], future.result()
+
+        # 마감 시간 내에 끝나지 않은 호선은 이번 배치에서 제외 (요청 자체는 타임아웃으로 정리됨)
+        for future in pending:
+            line = futures[future]
+            future.cancel()
+            API_ERRORS.inc(line=line, type="deadline")
+            log("api_deadline", f"[API Error] {line} 응답 시간 초과 ({deadline}s)",
+                level="error", line=line, deadline=deadline)
+            yield line, []
+
+    def close(self):
+        """스레드 풀(진행 중인 요청이 끝날 때까지 대기)과 HTTP 세션, 응답 기록 파일을 정리합니다."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._page_executor.shutdown(wait=True, cancel_futures=True)
+        self.session.close()
+        if self.recorder is not None:
+            self.recorder.close()
@@ -0,0 +1,233 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from config import Config
+from synthetic_feed import SyntheticNetwork
+
+# 벤치마크 결과 누적 파일 (실행마다 한 줄씩 추가, 저장소에 커밋해 성능 추이를 추적)
+RESULTS_PATH = os.path.join(os.path.dirname(__file__), '..', 'docs', 'bench_results.jsonl')
+
+SUITES = ("transform", "insert", "analysis")
+DEFAULT_SIZES = "10k,1m,10m"
+# 이전 결과와 비교할 최근 실행 수, 회귀로 표시할 느려진 비율
+BASELINE_RUNS = 5
+REGRESSION_THRESHOLD = 0.2
+# 측정 잡음이 큰 짧은 구간은 이 시간(초) 이상 느려졌을 때만 회귀로 표시
+REGRESSION_MIN_SEC = 0.05
+
+# SubwayAnalyzer 의 DataFrame 입력 분석 메서드 (fetch_* / analyze_history 는 DB 조회라 제외)
+ANALYSIS_METHODS = [
+    "analyze_interval_regularity",
+    "analyze_headways",
+    "analyze_delay_hotspots",
+    "analyze_travel_times",
+    "analyze_turnaround_efficiency",
+    "analyze_express_interference",
+    "analyze_train_spacing",
+]
+
+def parse_sizes(text: str) -> list:
+    """'10k,1m,10m' → [10000, 1000000, 10000000]"""
+    units = {"k": 1_000, "m": 1_000_000}
+    sizes = []
+    for item in text.lower().split(","):
+        item = item.strip()
+        if not item:
+            continue
+        scale = units.get(item[-1], 1)
+        sizes.append(int(float(item[:-1] if item[-1] in units else item) * scale))
+    return sizes
+
+def environment() -> dict:
+    """결과를 비교할 때 함께 기록할 실행 환경 (커밋, 호스트, 라이브러리 버전)"""
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], capture_output=True, text=True, timeout=10,
+                                  cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+    return {
+        "commit": git("rev-parse", "--short", "HEAD") or None,
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+    }
+
+def measure(fn, repeat: int = 1) -> float:
+    """fn 을 repeat 번 실행해 가장 빠른 시간(초)을 반환합니다. (분석 메서드의 콘솔 출력은 숨김)"""
+    best = float("inf")
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+    return best
+
+# ---------------------------------------------------------------------- suites
+def bench_transform(network: SyntheticNetwork, sizes: list, interval: float, repeat: int):
+    """API 원본 → 적재용 행 변환 (_transform_data), 차원 id 변환 (DimensionCache.fact_rows)"""
+    from db_client import DbClient
+
+    db = DbClient()
+    # DB 없이 측정하도록 차원 id 를 미리 채움 (실제로는 최초 적재 시 DB 에서 받아 옴)
+    db.dimensions.store({line: i + 1 for i, line in enumerate(network.lines)},
+                        {code: i + 1 for i, code in enumerate(network.station_codes)})
+    for size in sizes:
+        transform, facts = float("inf"), float("inf")
+        for _ in range(repeat):
+            t_transform = t_facts = 0.0
+            for when, positions in network.iter_snapshots(size, interval):
+                collected_at = when.astimezone(timezone.utc).isoformat()
+                start = time.perf_counter()
+                rows = [db._transform_data(pos, collected_at) for pos in positions]
+                t_transform += time.perf_counter() - start
+                start = time.perf_counter()
+                db.dimensions.fact_rows(rows)
+                t_facts += time.perf_counter() - start
+            transform, facts = min(transform, t_transform), min(facts, t_facts)
+        yield "_transform_data", size, transform
+        yield "fact_rows", size, facts
+
+def bench_insert(network: SyntheticNetwork, sizes: list, interval: float, repeat: int,
+                 backends: list, batch_size: int):
+    """
+    적재 방식별 insert_positions 처리 시간. DATABASE_URL 이 가리키는 Postgres(로컬 Docker 등)에
+    docs/schema.sql 이 적용되어 있어야 하며, rest 는 SUPABASE_URL/KEY 가 있을 때만 측정합니다.
+    """
+    from bench_insert import prepare_table, drop_table, iter_batches, run_backend
+
+    if not Config.DATABASE_URL:
+        print("[Bench] DATABASE_URL 이 설정되지 않아 insert 스위트를 건너뜁니다.")
+        return
+    # 벤치마크 테이블 적재가 실제 집계 테이블/대시보드 알림에 영향을 주지 않도록 비활성화
+    Config.ROLLUP_ENABLED = False
+    Config.NOTIFY_ENABLED = False
+    try:
+        for backend in backends:
+            if backend == "rest" and not (Config.SUPABASE_URL and Config.SUPABASE_KEY):
+                print("[Bench] SUPABASE 접속 정보가 없어 rest 적재는 건너뜁니다.")
+                continue
+            for size in sizes:
+                best = float("inf")
+                for _ in range(repeat):
+                    prepare_table()
+                    _, elapsed = run_backend(backend, iter_batches(size, batch_size, network))
+                    best = min(best, elapsed)
+                yield f"insert_{backend}", size, best
+    finally:
+        drop_table()
+
+def bench_analysis(network: SyntheticNetwork, sizes: list, interval: float, repeat: int):
+    """SubwayAnalyzer 분석 메서드별 처리 시간 (subway_time 조회 결과와 같은 스키마의 가상 DataFrame)"""
+    import topology
+    from analysis import SubwayAnalyzer
+
+    analyzer = SubwayAnalyzer()
+    with tempfile.TemporaryDirectory() as tmp:
+        # 가상 역이 실제 역 순서 색인 캐시에 섞이지 않도록 임시 경로 사용
+        Config.TOPOLOGY_SEED_PATH = None
+        for size in sizes:
+            df = network.frame(size, interval)
+            Config.TOPOLOGY_CACHE_PATH = os.path.join(tmp, f"topology_{size}.csv")
+            yield "topology", size, measure(lambda: topology.get_topology(df, refresh=True))
+            for name in ANALYSIS_METHODS:
+                method = getattr(analyzer, name)
+                yield name, size, measure(lambda: method(df), repeat)
+            del df
+
+# ---------------------------------------------------------------------- results
+def load_history(path: str) -> list:
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def compare(record: dict, history: list, threshold: float) -> dict:
+    """같은 호스트/조건의 최근 BASELINE_RUNS 회 중앙값과 비교해 변화율과 회귀 여부를 붙입니다."""
+    key = ("host", "suite", "case", "rows", "scale", "interval")
+    previous = [h["seconds"] for h in history if all(h.get(k) == record[k] for k in key)][-BASELINE_RUNS:]
+    if not previous:
+        return dict(record, baseline=None, change=None, regression=False)
+    baseline = statistics.median(previous)
+    change = record["seconds"] / baseline - 1 if baseline > 0 else 0.0
+    slower = record["seconds"] - baseline
+    return dict(record, baseline=baseline, change=change,
+                regression=change > threshold and slower > REGRESSION_MIN_SEC)
+
+def main():
+    parser = argparse.ArgumentParser(description="가상 노선망 데이터로 변환/적재/분석 처리 시간을 측정하고 결과를 누적 기록")
+    parser.add_argument("--suites", default=",".join(SUITES), help=f"실행할 스위트 (쉼표 구분: {', '.join(SUITES)})")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="행 수 (쉼표 구분, k/m 단위 허용)")
+    parser.add_argument("--scale", type=float, default=1.0, help="열차 수 배율")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--interval", type=float, default=Config.BATCH_INTERVAL, help="스냅샷 간격 (초)")
+    parser.add_argument("--repeat", type=int, default=1, help="반복 측정 횟수 (가장 빠른 값 기록)")
+    parser.add_argument("--backends", default="copy,values,rest", help="insert 스위트의 적재 방식")
+    parser.add_argument("--batch", type=int, default=500, help="insert_positions 1회당 행 수")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="회귀로 표시할 느려진 비율")
+    parser.add_argument("--results", default=RESULTS_PATH, help="결과 누적 파일 (JSON Lines)")
+    parser.add_argument("--no-record", action="store_true", help="결과를 파일에 추가하지 않음")
+    parser.add_argument("--fail-on-regression", action="store_true", help="회귀가 있으면 종료 코드 1")
+    args = parser.parse_args()
+
+    suites = [s.strip() for s in args.suites.split(",") if s.strip()]
+    unknown = [s for s in suites if s not in SUITES]
+    if unknown:
+        parser.error(f"지원하지 않는 스위트입니다: {', '.join(unknown)}")
+    sizes = parse_sizes(args.sizes)
+    network = SyntheticNetwork(scale=args.scale, seed=args.seed)
+    env = environment()
+    history = load_history(args.results)
+    print(f"=== Benchmark: {', '.join(suites)} / {len(network.lines)} lines, "
+          f"{network.trains_per_snapshot} trains per snapshot / commit {env['commit']}"
+          f"{' (dirty)' if env['dirty'] else ''} ===")
+
+    runners = {
+        "transform": lambda: bench_transform(network, sizes, args.interval, args.repeat),
+        "insert": lambda: bench_insert(network, sizes, args.interval, args.repeat,
+                                       [b.strip() for b in args.backends.split(",") if b.strip()], args.batch),
+        "analysis": lambda: bench_analysis(network, sizes, args.interval, args.repeat),
+    }
+    results = []
+    for suite in suites:
+        for case, rows, seconds in runners[suite]():
+            record = {
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                **env,
+                "suite": suite, "case": case, "rows": rows,
+                "scale": args.scale, "interval": args.interval,
+                "seconds": round(seconds, 6),
+                "rows_per_sec": round(rows / seconds) if seconds > 0 else None,
+            }
+            result = compare(record, history, args.threshold)
+            results.append(result)
+            change = "" if result["change"] is None else f" ({result['change']:+.0%} vs median)"
+            flag = "  ⚠️ REGRESSION" if result["regression"] else ""
+            print(f"[{suite}] {case:<30} {rows:>10,} rows  {seconds:9.3f}s{change}{flag}")
+
+            if not args.no_record:
+                os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+                with open(args.results, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    regressions = [r for r in results if r["regression"]]
+    if regressions:
+        print(f"\n⚠️ {len(regressions)}건이 최근 {BASELINE_RUNS}회 중앙값보다 {args.threshold:.0%} 이상 느려졌습니다.")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import time
+import psycopg2
+from config import Config
+from db_client import DbClient
+from synthetic_feed import SyntheticNetwork
+
+BENCH_TABLE = "subway_positions_bench"
+
+def iter_batches(rows: int, batch_size: int, network: SyntheticNetwork = None):
+    """가상 노선망 스냅샷(API 원본 형식)을 batch_size 행씩 묶어 내보냅니다. (전체 행을 메모리에 올리지 않음)"""
+    network = network or SyntheticNetwork()
+    pending = []
+    for _, positions in network.iter_snapshots(rows):
+        pending.extend(positions)
+        while len(pending) >= batch_size:
+            yield pending[:batch_size]
+            pending = pending[batch_size:]
+    if pending:
+        yield pending
+
+def prepare_table():
+    """subway_positions 와 같은 구조의 벤치마크 전용 테이블을 만듭니다. (차원 테이블은 실제 테이블 공유)"""
+    conn = psycopg2.connect(Config.DATABASE_URL, connect_timeout=10)
+    with conn, conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE};")
+        cur.execute(f"CREATE TABLE {BENCH_TABLE} (LIKE subway_positions INCLUDING ALL);")
+        # REST 경로에서도 새 테이블이 보이도록 PostgREST 스키마 캐시 갱신
+        cur.execute("NOTIFY pgrst, 'reload schema';")
+    conn.close()
+
+def drop_table():
+    conn = psycopg2.connect(Config.DATABASE_URL, connect_timeout=10)
+    with conn, conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE};")
+        cur.execute("NOTIFY pgrst, 'reload schema';")
+    conn.close()
+
+def run_backend(backend: str, batches) -> tuple:
+    """
+    지정한 적재 방식으로 배치를 차례로 적재합니다. (데이터 생성 시간은 제외하고 적재 시간만 측정)
+    :return: (적재한 행 수, 적재에 걸린 초)
+    """
+    db = DbClient(write_backend=backend)
+    db.fact_table = BENCH_TABLE
+    inserted, requested, elapsed = 0, 0, 0.0
+    for batch in batches:
+        requested += len(batch)
+        start = time.perf_counter()
+        inserted += db.insert_positions(batch)
+        elapsed += time.perf_counter() - start
+    db.close()
+    if inserted != requested:
+        print(f"[Bench Warning] {backend}: {inserted}/{requested} 행만 적재됨")
+    return inserted, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="subway_positions 적재 방식별 처리량(rows/sec) 비교")
+    parser.add_argument("--rows", type=int, default=20000, help="적재할 총 행 수")
+    parser.add_argument("--batch", type=int, default=500, help="insert_positions 1회당 행 수")
+    parser.add_argument("--backends", default="rest,values,copy", help="비교할 적재 방식 (쉼표 구분)")
+    args = parser.parse_args()
+
+    if not Config.DATABASE_URL:
+        print("[Error] DATABASE_URL 이 설정되지 않아 벤치마크를 실행할 수 없습니다.")
+        return
+
+    # 벤치마크 테이블 적재가 실제 집계 테이블/대시보드 알림에 영향을 주지 않도록 비활성화
+    Config.ROLLUP_ENABLED = False
+    Config.NOTIFY_ENABLED = False
+
+    print(f"=== Insert Benchmark: {args.rows} rows, batch {args.batch} ===")
+    try:
+        for backend in [b.strip() for b in args.backends.split(",") if b.strip()]:
+            prepare_table()
+            inserted, elapsed = run_backend(backend, iter_batches(args.rows, args.batch))
+            rate = inserted / elapsed if elapsed > 0 else 0.0
+            print(f"{backend:>8}: {rate:,.0f} rows/sec")
+    finally:
+        drop_table()
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+import socket
 from dotenv import load_dotenv
 
 # .env 파일 로드
@@ -12,9 +13,170 @@ class Config:
     SUPABASE_KEY = os.getenv("SUPABASE_KEY")
     DATABASE_URL = os.getenv("DATABASE_URL")
     
+    # DB 적재 방식 - rest: Supabase REST(JSON), copy: COPY FROM STDIN, values: 다중 행 INSERT
+    # copy/values 는 DATABASE_URL 필요, 실패 시 rest 로 대체 적재
+    DB_WRITE_BACKEND = os.getenv("DB_WRITE_BACKEND", "rest").lower()
+    DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", 1))
+    DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", 4))
+
     # 배치 실행 주기 (초) - 기본값 60초
     BATCH_INTERVAL = int(os.getenv("BATCH_INTERVAL", 60))
 
+    # 배치 스케줄러 - 주기 경계 기준 시작 오프셋(초), 실행이 주기를 넘겼을 때 정책 (skip | coalesce | catchup),
+    # catchup 최대 연속 실행 횟수, 예정 시각을 수집 시각으로 기록할 최대 시작 지연(초)
+    SCHEDULE_OFFSET = float(os.getenv("SCHEDULE_OFFSET", 0))
+    SCHEDULE_POLICY = os.getenv("SCHEDULE_POLICY", "skip").lower()
+    SCHEDULE_CATCHUP_MAX = int(os.getenv("SCHEDULE_CATCHUP_MAX", 3))
+    SCHEDULE_ALIGN_TOLERANCE = float(os.getenv("SCHEDULE_ALIGN_TOLERANCE", 2))
+
+    # 호선별 적응형 조회 주기 (CHANGE_DETECTION 필요) - 사용 여부, 최소/최대 조회 간격(초, 최소 간격이 배치 주기가 됨),
+    # 목표 변화 비율 (조회당 상태가 바뀐 열차 비율), 변화 비율 평활 계수,
+    # 일일 API 호출 한도 (0 이면 제한 없음, 한국시간 자정 초기화), 토큰 버킷 크기(초 단위 예산), 상태 저장 경로
+    ADAPTIVE_POLLING = os.getenv("ADAPTIVE_POLLING", "false").lower() == "true"
+    POLL_MIN_INTERVAL = float(os.getenv("POLL_MIN_INTERVAL", 30))
+    POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL", 300))
+    POLL_TARGET_CHANGE = float(os.getenv("POLL_TARGET_CHANGE", 0.5))
+    POLL_SMOOTHING = float(os.getenv("POLL_SMOOTHING", 0.3))
+    API_DAILY_QUOTA = int(os.getenv("API_DAILY_QUOTA", 0))
+    POLL_BUCKET_SECONDS = float(os.getenv("POLL_BUCKET_SECONDS", 600))
+    POLL_STATE_PATH = os.getenv(
+        "POLL_STATE_PATH",
+        os.path.join(os.path.dirname(__file__), '..', 'data', 'poll_planner.json'),
+    )
+
+    # API 호출 설정 - 동시 조회 워커 수, 요청 타임아웃(초), 호선별 마감 시간(초)
+    COLLECT_WORKERS = int(os.getenv("COLLECT_WORKERS", 16))
+    PAGE_WORKERS = int(os.getenv("PAGE_WORKERS", 8))
+    API_PAGE_SIZE = int(os.getenv("API_PAGE_SIZE", 100))
+    API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", 3))
+    API_READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", 10))
+    LINE_DEADLINE = float(os.getenv("LINE_DEADLINE", 20))
+
+    # 상태 변화 감지 적재 - 열차 상태가 바뀐 행만 저장 (false 시 매 배치 전체 스냅샷 저장)
+    # 켜면 집계 테이블의 observations/active_trains 도 상태 전이 기준이 됨 (docs/schema.sql 참고)
+    CHANGE_DETECTION = os.getenv("CHANGE_DETECTION", "true").lower() == "true"
+    STATE_CHECKPOINT_PATH = os.getenv(
+        "STATE_CHECKPOINT_PATH",
+        os.path.join(os.path.dirname(__file__), '..', 'data', 'train_state.json'),
+    )
+    # 관측되지 않은 열차를 상태표에서 제거하기까지의 시간 (초)
+    STATE_TTL = int(os.getenv("STATE_TTL", 1800))
+
+    # 파티션 관리 - 미리 만들어 둘 일 수, 보관 기간(일), 보관 기간 경과 시 처리 방식 (drop | detach)
+    PARTITION_DAYS_AHEAD = int(os.getenv("PARTITION_DAYS_AHEAD", 7))
+    RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", 30))
+    RETENTION_MODE = os.getenv("RETENTION_MODE", "drop").lower()
+
+    # 조회 설정 - 페이지 크기(PostgREST 최대 응답 행 수 이하 권장), 구간 동시 조회 워커 수
+    READ_PAGE_SIZE = int(os.getenv("READ_PAGE_SIZE", 1000))
+    READ_WORKERS = int(os.getenv("READ_WORKERS", 4))
+
+    # 분/시간 단위 집계 테이블 - 배치 적재 시 갱신 여부, 배차 간격/체류 시간 계산용 이전 구간(분), 분 단위 보관 기간(일)
+    ROLLUP_ENABLED = os.getenv("ROLLUP_ENABLED", "true").lower() == "true"
+    ROLLUP_LOOKBACK_MINUTES = int(os.getenv("ROLLUP_LOOKBACK_MINUTES", 20))
+    ROLLUP_MINUTE_RETENTION_DAYS = int(os.getenv("ROLLUP_MINUTE_RETENTION_DAYS", 90))
+
+    # 분석기 증분 조회 시 메모리에 유지할 최근 구간 (분)
+    ANALYSIS_WINDOW_MINUTES = int(os.getenv("ANALYSIS_WINDOW_MINUTES", 60))
+    # 증분 조회 시 마지막으로 본 created_at 보다 이만큼 앞에서부터 다시 읽음 (초, 늦게 커밋된 배치/스풀 재적재 반영)
+    ANALYSIS_FETCH_OVERLAP_SECONDS = int(os.getenv("ANALYSIS_FETCH_OVERLAP_SECONDS", 300))
+
+    # 대시보드 공유 캐시 - 항목 TTL(초), 최대 항목 수, 최신 데이터 워터마크 확인 주기(초)
+    CACHE_TTL = float(os.getenv("CACHE_TTL", 300))
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 64))
+    WATERMARK_TTL = float(os.getenv("WATERMARK_TTL", 10))
+
+    # 대시보드 시계열 차트 - 계열 전체에 보낼 최대 점 수, 최대 조회 기간(일)
+    CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", 2000))
+    CHART_MAX_DAYS = int(os.getenv("CHART_MAX_DAYS", 7))
+
+    # 새 배치 알림 (Postgres LISTEN/NOTIFY) - 채널 이름, 대시보드의 알림 확인 주기(초)
+    NOTIFY_ENABLED = os.getenv("NOTIFY_ENABLED", "true").lower() == "true"
+    NOTIFY_CHANNEL = os.getenv("NOTIFY_CHANNEL", "subway_batch")
+    LIVE_POLL_SECONDS = float(os.getenv("LIVE_POLL_SECONDS", 2))
+
+    # 역 순서 색인 - 시드 파일(저장소 포함, 선택), 관측 궤적으로 만든 색인의 캐시 파일
+    TOPOLOGY_SEED_PATH = os.getenv(
+        "TOPOLOGY_SEED_PATH",
+        os.path.join(os.path.dirname(__file__), '..', 'docs', 'station_topology.csv'),
+    )
+    TOPOLOGY_CACHE_PATH = os.getenv(
+        "TOPOLOGY_CACHE_PATH",
+        os.path.join(os.path.dirname(__file__), '..', 'data', 'station_topology.csv'),
+    )
+    # 관측으로 만든 역 순서를 캐시에 저장하기 위한 호선/방향별 최소 누적 역간 이동 수
+    TOPOLOGY_MIN_TRANSITIONS = int(os.getenv("TOPOLOGY_MIN_TRANSITIONS", 1000))
+
+    # 로컬 스풀 (DB 장애 시에도 수집 데이터를 보존하는 write-ahead 버퍼)
+    SPOOL_ENABLED = os.getenv("SPOOL_ENABLED", "true").lower() == "true"
+    SPOOL_DIR = os.getenv("SPOOL_DIR", os.path.join(os.path.dirname(__file__), '..', 'data', 'spool'))
+    SPOOL_SEGMENT_BYTES = int(os.getenv("SPOOL_SEGMENT_BYTES", 16 * 1024 * 1024))
+    # 스풀 최대 크기(바이트, 0 이면 제한 없음)와 가득 찼을 때 정책
+    # (drop_oldest: 가장 오래된 세그먼트부터 버림 | stop: 새 배치를 받지 않고 다음 배치에서 다시 수집)
+    SPOOL_MAX_BYTES = int(os.getenv("SPOOL_MAX_BYTES", 1024 * 1024 * 1024))
+    SPOOL_FULL_POLICY = os.getenv("SPOOL_FULL_POLICY", "drop_oldest").lower()
+    # 한 번에 DB로 보낼 최대 행 수, 재시도 최대 대기 시간(초)
+    SPOOL_DRAIN_MAX_ROWS = int(os.getenv("SPOOL_DRAIN_MAX_ROWS", 20000))
+    SPOOL_RETRY_MAX = float(os.getenv("SPOOL_RETRY_MAX", 60))
+
+    # 메트릭/로그 - Prometheus /metrics 포트 (0 이면 비활성), 바인드 주소, 로그 형식 (text | json)
+    METRICS_PORT = int(os.getenv("METRICS_PORT", 9108))
+    METRICS_HOST = os.getenv("METRICS_HOST", "0.0.0.0")
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+
+    # 배치 프로파일링 - 대상 배치 번호 (쉼표 구분, SIGUSR1 로도 다음 배치 지정), 방식 (cprofile | sample),
+    # 스택 샘플링 간격(ms), 결과 저장 경로
+    PROFILE_BATCHES = [int(x) for x in os.getenv("PROFILE_BATCHES", "").split(",") if x.strip()]
+    PROFILE_MODE = os.getenv("PROFILE_MODE", "cprofile").lower()
+    PROFILE_SAMPLE_MS = float(os.getenv("PROFILE_SAMPLE_MS", 5))
+    PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.path.dirname(__file__), '..', 'data', 'profiles'))
+
+    # 수집기 수평 분할 - 여러 인스턴스가 호선을 나눠 수집 (DATABASE_URL 필요, 같은 호스트에서 여러 개 실행 시
+    # STATE_CHECKPOINT_PATH / SPOOL_DIR / POLL_STATE_PATH 는 인스턴스마다 다르게 지정), 인스턴스 ID (기본: 호스트명-PID),
+    # 임대 유효 시간(초, 인스턴스가 죽으면 이 시간 뒤 다른 인스턴스가 가져감), 임대 만료 전에 적재를 멈추는 여유 시간(초)
+    SHARDING_ENABLED = os.getenv("SHARDING_ENABLED", "false").lower() == "true"
+    COLLECTOR_ID = os.getenv("COLLECTOR_ID") or f"{socket.gethostname()}-{os.getpid()}"
+    SHARD_LEASE_TTL = float(os.getenv("SHARD_LEASE_TTL", 180))
+    SHARD_LEASE_MARGIN = float(os.getenv("SHARD_LEASE_MARGIN", 10))
+
+    # 원본 API 응답 기록 (장애 재현/백필/회귀 테스트용, replay.py 로 재생) - 사용 여부, 저장 경로, 파일 분할 단위(분)
+    RECORD_ENABLED = os.getenv("RECORD_ENABLED", "false").lower() == "true"
+    RECORD_DIR = os.getenv("RECORD_DIR", os.path.join(os.path.dirname(__file__), '..', 'data', 'recordings'))
+    RECORD_SEGMENT_MINUTES = int(os.getenv("RECORD_SEGMENT_MINUTES", 60))
+
+    # 호선 레지스트리 (subwayId -> API 호출용 호선명, API ENDPOINT 문서 기준)
+    LINE_REGISTRY = {
+        "1001": "1호선",
+        "1002": "2호선",
+        "1003": "3호선",
+        "1004": "4호선",
+        "1005": "5호선",
+        "1006": "6호선",
+        "1007": "7호선",
+        "1008": "8호선",
+        "1009": "9호선",
+        "1063": "경의중앙선",
+        "1065": "공항철도",
+        "1067": "경춘선",
+        "1075": "수인분당선",
+        "1077": "신분당선",
+        "1092": "우이신설선",
+        "1032": "GTX-A",
+    }
+
+    # 수집 대상 호선 ID (쉼표 구분, 예: "1001,1002"). 미설정 시 레지스트리 전체 수집
+    TARGET_LINE_IDS = [x.strip() for x in os.getenv("TARGET_LINE_IDS", "").split(",") if x.strip()]
+
+    @staticmethod
+    def get_target_lines() -> dict:
+        """수집 대상 호선을 {subwayId: 호선명} 형태로 반환합니다."""
+        if not Config.TARGET_LINE_IDS:
+            return dict(Config.LINE_REGISTRY)
+        unknown = [line_id for line_id in Config.TARGET_LINE_IDS if line_id not in Config.LINE_REGISTRY]
+        if unknown:
+            raise ValueError(f"등록되지 않은 호선 ID입니다: {', '.join(unknown)}")
+        return {line_id: Config.LINE_REGISTRY[line_id] for line_id in Config.TARGET_LINE_IDS}
+
     @staticmethod
     def check_config():
         """필수 환경변수가 설정되었는지 확인"""
@@ -22,3 +184,28 @@ class Config:
             raise ValueError("SEOUL_API_KEY가 설정되지 않았습니다.")
         if not Config.SUPABASE_URL or not Config.SUPABASE_KEY:
             raise ValueError("SUPABASE 접속 정보가 설정되지 않았습니다.")
+        if Config.DB_WRITE_BACKEND not in ("rest", "copy", "values"):
+            raise ValueError(f"지원하지 않는 DB_WRITE_BACKEND 입니다: {Config.DB_WRITE_BACKEND}")
+        if Config.RETENTION_MODE not in ("drop", "detach"):
+            raise ValueError(f"지원하지 않는 RETENTION_MODE 입니다: {Config.RETENTION_MODE}")
+        if Config.SCHEDULE_POLICY not in ("skip", "coalesce", "catchup"):
+            raise ValueError(f"지원하지 않는 SCHEDULE_POLICY 입니다: {Config.SCHEDULE_POLICY}")
+        if Config.LOG_FORMAT not in ("text", "json"):
+            raise ValueError(f"지원하지 않는 LOG_FORMAT 입니다: {Config.LOG_FORMAT}")
+        if Config.PROFILE_MODE not in ("cprofile", "sample"):
+            raise ValueError(f"지원하지 않는 PROFILE_MODE 입니다: {Config.PROFILE_MODE}")
+        if Config.SPOOL_FULL_POLICY not in ("drop_oldest", "stop"):
+            raise ValueError(f"지원하지 않는 SPOOL_FULL_POLICY 입니다: {Config.SPOOL_FULL_POLICY}")
+        if Config.ADAPTIVE_POLLING and not Config.CHANGE_DETECTION:
+            raise ValueError("ADAPTIVE_POLLING 은 CHANGE_DETECTION 이 켜져 있어야 합니다.")
+        if not 0 < Config.POLL_MIN_INTERVAL <= Config.POLL_MAX_INTERVAL:
+            raise ValueError("POLL_MIN_INTERVAL 은 0보다 크고 POLL_MAX_INTERVAL 이하여야 합니다.")
+        if Config.SHARDING_ENABLED:
+            if not Config.DATABASE_URL:
+                raise ValueError("SHARDING_ENABLED 는 DATABASE_URL 이 설정되어 있어야 합니다.")
+            # 배치마다 임대를 갱신하므로 배치 주기 + 여유 시간보다 길어야 함
+            interval = Config.POLL_MIN_INTERVAL if Config.ADAPTIVE_POLLING else Config.BATCH_INTERVAL
+            if Config.SHARD_LEASE_TTL <= interval + Config.SHARD_LEASE_MARGIN:
+                raise ValueError("SHARD_LEASE_TTL 은 배치 주기 + SHARD_LEASE_MARGIN 보다 길어야 합니다.")
+        # 대상 호선 ID가 레지스트리에 있는지 검증
+        Config.get_target_lines()
@@ -1,12 +1,93 @@
-from shiny import App, ui, render, reactive
+from shiny import App, ui, render, reactive, req
 import pandas as pd
 from analysis import SubwayAnalyzer
+from analysis_cache import AnalysisCache
+from config import Config
+from notify import BatchListener
+from downsample import downsample_frame
+import threading
 import matplotlib.pyplot as plt
+import plotly.graph_objects as go
+from shinywidgets import output_widget, render_widget
 import faicons as fa
 
 # Initialize analyzer
 analyzer = SubwayAnalyzer()
 
+# Process-wide cache shared by every session and output.
+# Keys are (kind, limit, token) so all viewers share one fetch/analysis per data version.
+cache = AnalysisCache()
+
+# Push updates: the collector NOTIFYs after each committed batch and this thread bumps a version.
+# Without DATABASE_URL (or while reconnecting) the dashboard falls back to polling the id watermark.
+listener = None
+if Config.DATABASE_URL and Config.NOTIFY_ENABLED:
+    listener = BatchListener()
+    listener.start()
+
+# fetch_incremental mutates the analyzer's rolling window, so only one delta fetch runs at a time
+window_lock = threading.Lock()
+
+def data_token():
+    """Cheap data-version check used by reactive.poll (no row fetch)."""
+    if listener is not None and listener.connected.is_set():
+        return ("push", listener.version)
+    watermark = cache.get_or_compute(("watermark",), analyzer.db.latest_id, ttl=Config.WATERMARK_TTL)
+    return ("poll", watermark)
+
+def line_token(line_id):
+    """Data version for one line: moves only when a batch for that line is announced."""
+    if listener is not None and listener.connected.is_set():
+        return ("push", listener.line_version(line_id))
+    return data_token()
+
+def fetch_window():
+    """Pull only rows newer than the last fetch into the shared rolling window."""
+    with window_lock:
+        return analyzer.fetch_incremental()
+
+def shared_frame(limit, token):
+    """Return (cache key, DataFrame) for the latest `limit` rows of the window, built once per data version."""
+    key = (limit, token)
+
+    def latest():
+        window = cache.get_or_compute(("window", token), fetch_window)
+        if window.empty:
+            return window
+        return window.sort_values(['created_at', 'id'], kind='stable').tail(limit).reset_index(drop=True)
+
+    return key, cache.get_or_compute(("frame",) + key, latest)
+
+def shared_result(kind, key, df, compute):
+    """Return an analysis result computed once per (kind, limit, token)."""
+    return cache.get_or_compute((kind,) + key, lambda: compute(df))
+
+DIRECTION_LABELS = {"0": "Up / Inner (0)", "1": "Down / Outer (1)"}
+
+def headway_series(line_id, station_id, days, token):
+    """
+    Full-resolution per-minute headway series from the minute rollups.
+    Closed hours are fetched once per hour; only the current hour is re-read per data version.
+    """
+    now = pd.Timestamp.now(tz="UTC")
+    edge_start = now.floor("h")
+    start = edge_start - pd.Timedelta(days=days)
+
+    def fetch(lo, hi):
+        return analyzer.fetch_rollups("minute", lo, hi, line_id=line_id, station_id=station_id)
+
+    history = cache.get_or_compute(("ts_history", line_id, station_id, days, edge_start),
+                                   lambda: fetch(start, edge_start), ttl=3600)
+    edge = cache.get_or_compute(("ts_edge", line_id, station_id, edge_start, token),
+                                lambda: fetch(edge_start, now))
+    series = pd.concat([f for f in (history, edge) if not f.empty], ignore_index=True) \
+        if not (history.empty and edge.empty) else pd.DataFrame(columns=["bucket", "direction_type", "headway_mean"])
+    series = series[["bucket", "direction_type", "headway_mean"]].copy()
+    # Plot in local (KST) wall-clock time so zoom ranges from the browser compare directly
+    series["time"] = pd.to_datetime(series["bucket"], utc=True).dt.tz_convert("Asia/Seoul").dt.tz_localize(None)
+    series["direction_type"] = series["direction_type"].astype(str)
+    return series
+
 app_ui = ui.page_sidebar(
     ui.sidebar(
         ui.input_action_button("refresh", "Refresh Data", icon=fa.icon_svg("arrows-rotate")),
@@ -42,52 +123,89 @@ app_ui = ui.page_sidebar(
             ui.output_data_frame("delay_table"),
         ),
     ),
+    ui.card(
+        ui.card_header("Hourly Avg Interval by Line (Last 24h, Rollups)"),
+        ui.output_plot("history_plot"),
+    ),
+    ui.card(
+        ui.card_header("Interval Time Series (Per-Minute Rollups, Zoom to Re-Bin)"),
+        ui.layout_columns(
+            ui.input_select("ts_line", "Line", Config.LINE_REGISTRY, selected="1002"),
+            ui.input_select("ts_station", "Station", {"": "All stations"}),
+            ui.input_slider("ts_days", "Days", 1, Config.CHART_MAX_DAYS, 1),
+            ui.input_radio_buttons("ts_method", "Downsampling", {"lttb": "LTTB", "minmax": "Min/Max"}, inline=True),
+        ),
+        output_widget("headway_ts"),
+    ),
     title="Subway Operations Monitor",
 )
 
 def server(input, output, session):
     
+    @reactive.poll(data_token, interval_secs=Config.LIVE_POLL_SECONDS)
+    def live_token():
+        return data_token()
+
+    # Token of the line selected in the time-series card. Kept in a value that is only set when it
+    # actually changes, so batches for other lines do not re-run the per-line outputs below.
+    selected_token = reactive.Value(None)
+
+    @reactive.Effect(priority=1)
+    def _track_selected_line():
+        live_token()
+        token = (input.ts_line(), line_token(input.ts_line()))
+        with reactive.isolate():
+            current = selected_token()
+        if token != current:
+            selected_token.set(token)
+
     @reactive.Calc
     def get_data():
-        input.refresh() # Dependency
+        # Re-runs only when a new batch is announced (or the watermark moves), not on a timer
+        live_token()
+        if input.refresh():
+            # Manual refresh: re-check the data watermark right away
+            cache.invalidate(("watermark",))
         limit = input.limit()
-        # Invalidate manually or just rely on button
-        return analyzer.fetch_data(limit=limit)
+        return shared_frame(limit, data_token())
+
+    @reactive.Calc
+    def interval_stats():
+        key, df = get_data()
+        if df.empty: return None
+        return shared_result("interval", key, df, analyzer.analyze_interval_regularity)
 
     @render.text
     def last_update_time():
-        df = get_data()
+        _, df = get_data()
         if df.empty: return "No Data"
-        # Return current time because we just fetched
-        return pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S")
+        # Time of the newest row in the window (updates as batches are pushed)
+        latest = df['created_at'].max().tz_convert("Asia/Seoul")
+        return latest.strftime("%Y-%m-%d %H:%M:%S")
 
     @render.ui
     def total_trains():
-        df = get_data()
+        _, df = get_data()
         if df.empty: return "0"
         return str(df['train_number'].nunique())
 
     @render.ui
     def avg_interval():
-        df = get_data()
-        if df.empty: return "N/A"
-        stats = analyzer.analyze_interval_regularity(df)
+        stats = interval_stats()
         if stats is None or stats.empty: return "N/A"
         avg = stats['mean'].mean() 
         return f"{avg:.1f} min"
 
     @render.ui
     def express_count():
-        df = get_data()
+        key, df = get_data()
         if df.empty: return "0"
-        counts = analyzer.analyze_express_interference(df)
+        counts = shared_result("interference", key, df, analyzer.analyze_express_interference)
         return str(counts.get('express_count', 0))
 
     @render.plot
     def interval_plot():
-        df = get_data()
-        if df.empty: return
-        stats = analyzer.analyze_interval_regularity(df)
+        stats = interval_stats()
         if stats is None or stats.empty: return
         
         # Plot using matplotlib
@@ -104,9 +222,101 @@ def server(input, output, session):
 
     @render.data_frame
     def delay_table():
-        df = get_data()
+        key, df = get_data()
         if df.empty: return pd.DataFrame()
-        hotspots = analyzer.analyze_delay_hotspots(df)
+        hotspots = shared_result("hotspots", key, df, analyzer.analyze_delay_hotspots)
         return render.DataGrid(hotspots, selection_mode="none")
 
+    @render.plot
+    def history_plot():
+        # Historical view comes from the hourly rollup table, not raw rows.
+        # The current hour is kept up to date by the collector, so refresh it per data version.
+        history = cache.get_or_compute(("history", live_token()), analyzer.analyze_history)
+        if history.empty: return
+
+        fig, ax = plt.subplots(figsize=(10, 3.5))
+        for line_name, g in history.groupby('line_name', sort=True):
+            ax.plot(g['bucket'].dt.tz_convert("Asia/Seoul"), g['headway_mean'], marker='o', label=line_name)
+        ax.set_ylabel('Interval (min)')
+        ax.legend(fontsize=7, ncol=4)
+        plt.tight_layout()
+        return fig
+
+    @reactive.Effect
+    def _station_choices():
+        # Station list for the selected line, taken from the live window (refreshed only when that line changes)
+        line_id, _ = req(selected_token())
+        with reactive.isolate():
+            _, df = get_data()
+        choices = {"": "All stations"}
+        if not df.empty:
+            stations = df.loc[df['line_id'].astype(str) == line_id, ['station_id', 'station_name']]\
+                .drop_duplicates('station_id').sort_values('station_name')
+            choices.update(zip(stations['station_id'].astype(str), stations['station_name'].astype(str)))
+        with reactive.isolate():
+            current = input.ts_station()
+        ui.update_select("ts_station", choices=choices, selected=current if current in choices else "")
+
+    @reactive.Calc
+    def ts_series():
+        line_id, token = req(selected_token())
+        return headway_series(line_id, input.ts_station() or None, input.ts_days(), token)
+
+    # Per-session chart state: the widget is built once per selection and its traces are
+    # re-binned in place on zoom or when a new batch arrives, so the browser keeps its view.
+    chart = {}
+
+    def sync_traces(fig, series):
+        # One trace per direction present in the series; the set changes with the selection or as data arrives
+        directions = sorted(series["direction_type"].unique())
+        existing = {trace.meta for trace in fig.data}
+        if existing == set(directions):
+            return
+        fig.data = tuple(trace for trace in fig.data if trace.meta in directions)
+        for direction in directions:
+            if direction not in existing:
+                fig.add_scattergl(mode="lines", name=DIRECTION_LABELS.get(direction, direction), meta=direction)
+
+    def redraw(x_range=None):
+        fig, series = chart["fig"], chart["series"]
+        sampled = downsample_frame(series, "time", "headway_mean", Config.CHART_MAX_POINTS,
+                                   chart["method"], by=["direction_type"], x_range=x_range)
+        with fig.batch_update():
+            for trace in fig.data:
+                g = sampled[sampled["direction_type"] == trace.meta]
+                trace.x = g["time"]
+                trace.y = g["headway_mean"]
+
+    @render_widget
+    def headway_ts():
+        method = input.ts_method()
+        with reactive.isolate():
+            series = ts_series()
+
+        fig = go.FigureWidget(layout=go.Layout(
+            height=380, yaxis_title="Interval (min)", legend=dict(orientation="h"),
+            margin=dict(l=40, r=10, t=10, b=30),
+        ))
+        sync_traces(fig, series)
+        chart.update(fig=fig, series=series, method=method)
+        redraw()
+
+        def on_zoom(xaxis, x_range):
+            # Zoom/pan: re-bin only the visible range; autorange (double-click) shows the full span again
+            redraw(None if xaxis.autorange else x_range)
+
+        fig.layout.xaxis.on_change(on_zoom, "range")
+        return fig
+
+    @reactive.Effect
+    def _refresh_series():
+        # New batch for the selected line or new selection: swap in the latest series and keep the current zoom
+        series = ts_series()
+        if "fig" not in chart:
+            return
+        chart["series"] = series
+        sync_traces(chart["fig"], series)
+        xaxis = chart["fig"].layout.xaxis
+        redraw(None if xaxis.autorange or xaxis.range is None else xaxis.range)
+
 app = App(app_ui, server)
@@ -1,16 +1,58 @@
 from supabase import create_client, Client
 from config import Config
-from datetime import datetime
+from datetime import datetime, timezone
+import csv
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import psycopg2
+import psycopg2.extras
+from psycopg2 import sql
+from psycopg2.pool import ThreadedConnectionPool
+from notify import batch_summary, publish_batch
+from metrics import DB_WRITE_LATENCY, DB_ROWS, DB_ERRORS
+from logs import log
+from dimensions import DimensionCache, FACT_COLUMNS, small_int, as_date, as_timestamp
 from urllib.parse import urlparse
 
+# 분/시간 단위 집계 테이블 (docs/schema.sql 의 refresh_subway_rollups 로 갱신)
+ROLLUP_TABLES = {"minute": "subway_rollup_minute", "hour": "subway_rollup_hour"}
+
+# 테이블/파티션/함수 정의 (init_db.py 와 동일한 DDL 사용)
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), '..', 'docs', 'schema.sql')
+
+def _rollup_lines(rows: list) -> list:
+    """집계를 다시 계산할 호선 ID 목록 (호선 ID 가 없는 행은 집계 테이블과 같이 '' 로 묶음)"""
+    return sorted({row.get("line_id") or "" for row in rows})
+
 class DbClient:
-    def __init__(self):
-        self.supabase: Client = create_client(Config.SUPABASE_URL, Config.SUPABASE_KEY)
+    def __init__(self, write_backend: str = None):
+        # Supabase 클라이언트는 최초 사용 시 생성 (copy/values 적재, 벤치마크는 REST 접속 정보 없이도 동작)
+        self._supabase = None
+        # 조회는 차원 테이블을 조인한 뷰, 적재는 정규화된 사실 테이블
+        self.table = "subway_time"
+        self.fact_table = "subway_positions"
+        # 호선/역 코드 → 차원 테이블 id (프로세스 내 캐시)
+        self.dimensions = DimensionCache()
+        self.write_backend = (write_backend or Config.DB_WRITE_BACKEND).lower()
+        # psycopg2 커넥션 풀 (copy/values 적재 시 최초 사용 시점에 생성)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def supabase(self) -> Client:
+        with self._pool_lock:
+            if self._supabase is None:
+                self._supabase = create_client(Config.SUPABASE_URL, Config.SUPABASE_KEY)
+            return self._supabase
 
     def initialize_table(self):
         """
-        Check and create 'subway_time' table using direct PostgreSQL connection.
+        Check and create the normalized schema (lines/stations, partitioned 'subway_positions',
+        'subway_time' view) using direct PostgreSQL connection.
+        Runs docs/schema.sql (idempotent), migrates a legacy wide 'subway_time' table if found,
+        then creates upcoming daily partitions and applies the retention policy.
         """
         if not Config.DATABASE_URL:
             print("⚠️ DATABASE_URL is not set. Skipping table creation.")
@@ -20,29 +62,18 @@ class DbClient:
             print("⏳ Initializing database table...")
             conn = psycopg2.connect(Config.DATABASE_URL, connect_timeout=10)
             cur = conn.cursor()
-            
-            create_query = """
-            CREATE TABLE IF NOT EXISTS subway_time (
-                id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
-                line_id VARCHAR(50),
-                line_name VARCHAR(50),
-                station_id VARCHAR(50),
-                station_name VARCHAR(100),
-                train_number VARCHAR(50),
-                last_rec_date VARCHAR(20),
-                last_rec_time VARCHAR(20),
-                direction_type INTEGER,
-                dest_station_id VARCHAR(50),
-                dest_station_name VARCHAR(100),
-                train_status VARCHAR(50),
-                is_express INTEGER,
-                is_last_train VARCHAR(10),
-                created_at TIMESTAMPTZ DEFAULT NOW()
-            );
-            CREATE INDEX IF NOT EXISTS idx_subway_time_created_at ON subway_time(created_at);
-            CREATE INDEX IF NOT EXISTS idx_subway_time_line_id ON subway_time(line_id);
-            """
-            cur.execute(create_query)
+
+            # 기존 단일 테이블(파티션 아님)이면 이름을 바꿔 두고 새 파티션 테이블로 옮김
+            legacy = self._rename_legacy_table(cur)
+            self._rename_legacy_indexes(cur)
+
+            with open(SCHEMA_PATH, 'r', encoding='utf-8') as f:
+                cur.execute(f.read())
+
+            if legacy:
+                self._migrate_legacy_rows(cur)
+
+            self._maintain_partitions(cur)
             
             # Refresh PostgREST schema cache
             cur.execute("NOTIFY pgrst, 'reload schema';")
@@ -50,33 +81,565 @@ class DbClient:
             conn.commit()
             cur.close()
             conn.close()
-            print("✅ Table 'subway_time' is ready.")
+            print("✅ Table 'subway_positions' and view 'subway_time' are ready.")
         except Exception as e:
             print(f"❌ Table initialization failed: {e}")
 
-    def insert_positions(self, positions: list):
+    def maintain_partitions(self):
+        """
+        앞으로 사용할 일 단위 파티션을 미리 만들고, 보관 기간이 지난 파티션을 정리합니다.
+        멱등 동작이므로 수집기에서 주기적으로 호출합니다.
+        """
+        if not Config.DATABASE_URL:
+            return
+
+        try:
+            conn = psycopg2.connect(Config.DATABASE_URL, connect_timeout=10)
+            with conn, conn.cursor() as cur:
+                self._maintain_partitions(cur)
+            conn.close()
+        except Exception as e:
+            print(f"[DB Error] 파티션 관리 실패: {e}")
+
+    def ensure_partitions(self, from_day, to_day) -> int:
+        """
+        from_day ~ to_day (한국시간 날짜, 양끝 포함) 파티션이 없으면 만듭니다.
+        기록 재생/백필처럼 maintain_partitions 가 만드는 구간 밖의 날짜를 적재하기 전에 호출합니다.
+        실패하면 예외를 그대로 올려 적재 전에 멈추게 합니다.
+        :return: 새로 만든 파티션 수
+        """
+        if Config.DATABASE_URL:
+            conn = psycopg2.connect(Config.DATABASE_URL, connect_timeout=10)
+            try:
+                with conn, conn.cursor() as cur:
+                    cur.execute("SELECT create_subway_time_partitions(%s, %s)", (from_day, to_day))
+                    created = cur.fetchone()[0]
+            finally:
+                conn.close()
+        else:
+            created = self.supabase.rpc("create_subway_time_partitions", {
+                "from_day": from_day.isoformat(), "to_day": to_day.isoformat(),
+            }).execute().data
+        if created:
+            print(f"[DB] 파티션 생성 {created}개 ({from_day} ~ {to_day})")
+        return created
+
+    def _maintain_partitions(self, cur):
+        cur.execute(
+            "SELECT create_subway_time_partitions("
+            "(now() AT TIME ZONE 'Asia/Seoul')::date - 1, "
+            "(now() AT TIME ZONE 'Asia/Seoul')::date + %s)",
+            (Config.PARTITION_DAYS_AHEAD,),
+        )
+        created = cur.fetchone()[0]
+        cur.execute(
+            "SELECT drop_subway_time_partitions(%s, %s)",
+            (Config.RETENTION_DAYS, Config.RETENTION_MODE == "detach"),
+        )
+        removed = cur.fetchone()[0]
+        # 배치 반영 기록도 보관 기간만큼만 유지
+        cur.execute(
+            "DELETE FROM ingest_batches WHERE applied_at < now() - make_interval(days => %s)",
+            (Config.RETENTION_DAYS,),
+        )
+        # 분 단위 집계는 별도 보관 기간 적용 (시간 단위 집계는 계속 유지)
+        cur.execute(
+            "DELETE FROM subway_rollup_minute WHERE bucket < now() - make_interval(days => %s)",
+            (Config.ROLLUP_MINUTE_RETENTION_DAYS,),
+        )
+        if created or removed:
+            print(f"[DB] 파티션 생성 {created}개, 보관 기간 경과 파티션 정리 {removed}개")
+
+    def _rename_legacy_table(self, cur) -> bool:
+        """
+        subway_time 이 뷰가 아닌 테이블(정규화 이전의 일반/파티션 테이블)이면 subway_time_legacy 로 이름을 바꿉니다.
+        """
+        cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('subway_time')")
+        row = cur.fetchone()
+        if row is None or row[0] == 'v':
+            return False
+        if row[0] not in ('r', 'p'):
+            raise RuntimeError(f"subway_time 의 relkind({row[0]})를 처리할 수 없습니다.")
+
+        print("⏳ Legacy wide 'subway_time' table found. Renaming to 'subway_time_legacy'...")
+        cur.execute("ALTER TABLE subway_time RENAME TO subway_time_legacy;")
+        # PK 인덱스 이름이 새 테이블과 겹치지 않도록 변경
+        cur.execute("ALTER TABLE subway_time_legacy RENAME CONSTRAINT subway_time_pkey TO subway_time_legacy_pkey;")
+        return True
+
+    def _rename_legacy_indexes(self, cur):
+        """
+        subway_time_legacy 의 인덱스 이름 끝에 _legacy 를 붙입니다. (이미 옮긴 DB 에서 다시 실행해도 안전)
+        초기 스키마의 idx_subway_positions_* 가 남아 있으면 새 사실 테이블의
+        CREATE INDEX IF NOT EXISTS 가 아무것도 만들지 않으므로 schema.sql 실행 전에 호출합니다.
+        """
+        cur.execute("SELECT to_regclass('subway_time_legacy') IS NOT NULL")
+        if not cur.fetchone()[0]:
+            return
+        cur.execute(
+            "SELECT i.relname FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid "
+            "WHERE x.indrelid = 'subway_time_legacy'::regclass AND i.relname NOT LIKE '%\\_legacy' "
+            "AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid)"
+        )
+        for (name,) in cur.fetchall():
+            # 식별자 최대 길이(63바이트)를 넘지 않도록 자름
+            legacy_name = f"{name[:63 - len('_legacy')]}_legacy"
+            cur.execute(sql.SQL("ALTER INDEX {} RENAME TO {}").format(sql.Identifier(name), sql.Identifier(legacy_name)))
+
+    def _migrate_legacy_rows(self, cur):
+        """
+        subway_time_legacy 의 행을 차원 테이블 + 사실 테이블로 옮깁니다. (원본은 확인 후 수동 삭제)
+        변환은 docs/schema.sql 의 migrate_subway_time_legacy() 가 DB 안에서 처리합니다.
+        """
+        cur.execute("SELECT min(created_at), max(id) FROM subway_time_legacy")
+        min_created, max_id = cur.fetchone()
+        if min_created is None:
+            return
+
+        cur.execute(
+            "SELECT create_subway_time_partitions("
+            "(%s AT TIME ZONE 'Asia/Seoul')::date, (now() AT TIME ZONE 'Asia/Seoul')::date)",
+            (min_created,),
+        )
+        cur.execute("SELECT migrate_subway_time_legacy()")
+        migrated = cur.fetchone()[0]
+        # 이후 새로 적재되는 행의 id 가 기존 id 와 겹치지 않도록 시퀀스 이동
+        cur.execute("SELECT setval(pg_get_serial_sequence('subway_positions', 'id'), %s)", (max_id,))
+        # 옮겨 온 구간의 집계 테이블을 한 번에 채움
+        cur.execute(
+            "SELECT refresh_subway_rollups(%s, now(), make_interval(mins => %s))",
+            (min_created, Config.ROLLUP_LOOKBACK_MINUTES),
+        )
+        print(f"✅ Migrated {migrated} rows from 'subway_time_legacy'. Drop it manually once verified.")
+
+    def insert_positions(self, positions: list, collected_at: str = None):
         """
         API에서 수집한 열차 위치 리스트를 DB에 일괄 삽입합니다.
         :param positions: API 원본 데이터 리스트
+        :param collected_at: 수집 시각(ISO 8601). 기록 재생 시 원래 수집 시각을 넘김 (기본: 현재 시각)
         :return: 삽입 성공 여부/개수
         """
         if not positions:
             return 0
         
-        transformed_data = [self._transform_data(pos) for pos in positions]
-        
+        collected_at = collected_at or datetime.now(timezone.utc).isoformat()
+        transformed_data = [self._transform_data(pos, collected_at) for pos in positions]
+
+        # COPY / 다중 행 INSERT 경로 (실패 시 REST 로 대체)
+        if self._direct_backend():
+            try:
+                with DB_WRITE_LATENCY.time(backend=self.write_backend, path="insert"):
+                    inserted = self._insert_direct(transformed_data)
+                DB_ROWS.inc(inserted, backend=self.write_backend, path="insert")
+                return inserted
+            except Exception as e:
+                DB_ERRORS.inc(backend=self.write_backend, type=type(e).__name__)
+                log("db_fallback", f"[DB Warning] {self.write_backend} 적재 실패, REST 방식으로 재시도합니다: {e}",
+                    level="warning", backend=self.write_backend, rows=len(transformed_data), error=str(e))
+
+        with DB_WRITE_LATENCY.time(backend="rest", path="insert"):
+            inserted = self._insert_rest(transformed_data)
+        DB_ROWS.inc(inserted, backend="rest", path="insert")
+        return inserted
+
+    def _direct_backend(self) -> bool:
+        """copy/values 직접 연결 적재를 쓰는지 여부 (DATABASE_URL 이 없으면 REST)"""
+        return self.write_backend in ("copy", "values") and bool(Config.DATABASE_URL)
+
+    def spool_positions(self, spool, positions: list, collected_at: str = None):
+        """
+        API 원본 데이터를 변환하여 로컬 스풀에 기록합니다. (DB 접속 없이 즉시 반환)
+        :return: 스풀에 기록한 행 수
+        """
+        if not positions:
+            return 0
+        collected_at = collected_at or datetime.now(timezone.utc).isoformat()
+        spool.append([self._transform_data(pos, collected_at) for pos in positions])
+        return len(positions)
+
+    def write_batches(self, batches: list):
+        """
+        스풀에서 읽은 배치 묶음을 적재합니다. (SpoolDrainer 에서 호출)
+        ingest_batches 기록과 데이터 적재를 한 트랜잭션으로 처리하므로 이미 반영된 batch_id 는 건너뛰어
+        재전송해도 중복되지 않습니다. (copy/values 는 직접 연결, REST 는 ingest_spool_batches RPC)
+        실패 시 예외를 그대로 올려 호출한 쪽에서 재시도하도록 합니다.
+        :param batches: [{"batch_id": str, "rows": [변환된 행, ...]}, ...]
+        :return: 실제 적재한 행 수
+        """
+        backend = self.write_backend if self._direct_backend() else "rest"
+        try:
+            with DB_WRITE_LATENCY.time(backend=backend, path="spool"):
+                written = self._write_batches(batches)
+        except Exception as e:
+            DB_ERRORS.inc(backend=backend, type=type(e).__name__)
+            raise
+        DB_ROWS.inc(written, backend=backend, path="spool")
+        return written
+
+    def _write_batches(self, batches: list):
+        if not self._direct_backend():
+            payload = [{"batch_id": batch["batch_id"], "rows": self._resolve_dimensions(batch["rows"])}
+                       for batch in batches]
+            written = self.supabase.rpc("ingest_spool_batches", {"batches": payload}).execute().data or 0
+            if written:
+                rows = [row for batch in batches for row in batch["rows"]]
+                self._refresh_rollups_rest(rows)
+                self._publish(rows)
+            return written
+
+        pool = self._get_pool()
+        conn = pool.getconn()
+        broken = False
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "INSERT INTO ingest_batches (batch_id) SELECT unnest(%s::varchar[]) "
+                    "ON CONFLICT (batch_id) DO NOTHING RETURNING batch_id",
+                    ([batch["batch_id"] for batch in batches],),
+                )
+                new_ids = {row[0] for row in cur.fetchall()}
+                rows = [row for batch in batches if batch["batch_id"] in new_ids for row in batch["rows"]]
+                if rows:
+                    facts = self._resolve_dimensions(rows)
+                    if self.write_backend == "copy":
+                        self._copy_rows(cur, facts)
+                    else:
+                        self._execute_values(cur, facts)
+                    self._refresh_rollups(cur, rows)
+                    # 커밋될 때 대시보드로 새 배치 알림이 전달됨
+                    publish_batch(cur, rows)
+            conn.commit()
+            return len(rows)
+        except Exception:
+            broken = conn.closed != 0
+            if not broken:
+                conn.rollback()
+            raise
+        finally:
+            pool.putconn(conn, close=broken)
+
+    def latest_id(self):
+        """가장 최근에 적재된 행의 id 를 반환합니다. (데이터 변경 여부 확인용 워터마크, 없으면 0)"""
+        rows = self.supabase.table(self.table).select("id").order("id", desc=True).limit(1).execute().data
+        return rows[0]["id"] if rows else 0
+
+    def fetch_latest(self, limit: int, page_size: int = None):
+        """
+        최근 limit 건을 (created_at, id) 역순 keyset 페이지로 가져옵니다.
+        PostgREST 의 최대 응답 행 수(보통 1000) 보다 큰 limit 도 잘리지 않습니다.
+        """
+        page_size = page_size or Config.READ_PAGE_SIZE
+        rows = []
+        last = None
+        while len(rows) < limit:
+            query = self.supabase.table(self.table).select("*")\
+                .order("created_at", desc=True)\
+                .order("id", desc=True)\
+                .limit(min(page_size, limit - len(rows)))
+            if last is not None:
+                query = query.or_(
+                    f"created_at.lt.{last['created_at']},"
+                    f"and(created_at.eq.{last['created_at']},id.lt.{last['id']})"
+                )
+            page = query.execute().data
+            if not page:
+                break
+            rows.extend(page)
+            last = page[-1]
+        return rows
+
+    def fetch_range(self, start: datetime, end: datetime, page_size: int = None, workers: int = None):
+        """
+        [start, end) 구간의 행을 모두 가져옵니다.
+        구간을 시간 조각으로 나눠 동시에 조회하고, 각 조각은 (created_at, id) keyset 페이지로 끝까지 읽습니다.
+        :return: created_at, id 순으로 정렬된 행 리스트
+        """
+        page_size = page_size or Config.READ_PAGE_SIZE
+        workers = workers or Config.READ_WORKERS
+        if end <= start:
+            return []
+
+        # 작업자 수의 2배로 시간 구간 분할 (조각별 데이터 양 편차 완화)
+        slice_count = workers * 2
+        step = (end - start) / slice_count
+        bounds = [start + step * i for i in range(slice_count)] + [end]
+        slices = list(zip(bounds[:-1], bounds[1:]))
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="subway-read") as executor:
+            results = executor.map(lambda b: self._fetch_slice(b[0], b[1], page_size), slices)
+            rows = [row for chunk in results for row in chunk]
+        print(f"[DB] {start.isoformat()} ~ {end.isoformat()} 구간 {len(rows)}건 조회 ({slice_count}개 구간)")
+        return rows
+
+    def fetch_since(self, start: datetime, page_size: int = None):
+        """start 이후(포함) 적재된 행을 모두 (created_at, id) 순으로 가져옵니다. (증분 조회용)"""
+        return self._fetch_slice(start, None, page_size or Config.READ_PAGE_SIZE)
+
+    def _fetch_slice(self, start: datetime, end: datetime, page_size: int):
+        """한 시간 조각을 (created_at, id) keyset 페이지로 끝까지 읽습니다. (end 가 None 이면 끝까지)"""
+        rows = []
+        last = None
+        while True:
+            query = self.supabase.table(self.table).select("*")\
+                .gte("created_at", start.isoformat())
+            if end is not None:
+                query = query.lt("created_at", end.isoformat())
+            query = query.order("created_at")\
+                .order("id")\
+                .limit(page_size)
+            if last is not None:
+                query = query.or_(
+                    f"created_at.gt.{last['created_at']},"
+                    f"and(created_at.eq.{last['created_at']},id.gt.{last['id']})"
+                )
+            page = query.execute().data
+            # 서버 측 최대 행 수 제한으로 page_size 보다 적게 올 수 있으므로 빈 페이지가 나올 때까지 읽음
+            if not page:
+                return rows
+            rows.extend(page)
+            last = page[-1]
+
+    def _insert_rest(self, rows: list):
+        """Supabase REST(JSON) 로 적재합니다."""
         try:
             # Supabase insert
-            response = self.supabase.table("subway_time").insert(transformed_data).execute()
+            response = self.supabase.table(self.fact_table).insert(self._resolve_dimensions(rows)).execute()
             # response.data 확인 (버전에 따라 다를 수 있음)
-            return len(transformed_data)
         except Exception as e:
-            print(f"[DB Error] 데이터 삽입 실패: {e}")
+            DB_ERRORS.inc(backend="rest", type=type(e).__name__)
+            log("db_error", f"[DB Error] 데이터 삽입 실패: {e}", level="error", backend="rest",
+                rows=len(rows), error=str(e))
             return 0
+        self._refresh_rollups_rest(rows)
+        self._publish(rows)
+        return len(rows)
+
+    def _refresh_rollups(self, cur, rows: list):
+        """
+        적재한 행의 호선과 created_at 범위에 해당하는 분/시간 단위 집계만 같은 트랜잭션에서 다시 계산합니다.
+        같은 호선을 다시 계산하는 다른 인스턴스와는 함수 안의 advisory lock 으로 직렬화되며, 잠금은 커밋 때 풀립니다.
+        집계가 실패해도 적재는 유지되도록 savepoint 로 감쌉니다.
+        """
+        if not rows or not Config.ROLLUP_ENABLED:
+            return
+        summary = batch_summary(rows)
+        cur.execute("SAVEPOINT rollup")
+        try:
+            cur.execute(
+                "SELECT refresh_subway_rollups(%s, %s, make_interval(mins => %s), %s::varchar[])",
+                (summary["from"], summary["to"], Config.ROLLUP_LOOKBACK_MINUTES, _rollup_lines(rows)),
+            )
+            cur.execute("RELEASE SAVEPOINT rollup")
+        except psycopg2.Error as e:
+            cur.execute("ROLLBACK TO SAVEPOINT rollup")
+            print(f"[DB Warning] 집계 테이블 갱신 실패: {e}")
+
+    def _refresh_rollups_rest(self, rows: list):
+        """REST 적재 후 집계 테이블을 RPC 로 갱신합니다. (실패해도 적재 결과에는 영향 없음)"""
+        if not rows or not Config.ROLLUP_ENABLED:
+            return
+        summary = batch_summary(rows)
+        try:
+            self.supabase.rpc("refresh_subway_rollups", {
+                "from_ts": summary["from"],
+                "to_ts": summary["to"],
+                "lookback": f"{Config.ROLLUP_LOOKBACK_MINUTES} minutes",
+                "line_ids": _rollup_lines(rows),
+            }).execute()
+        except Exception as e:
+            print(f"[DB Warning] 집계 테이블 갱신 실패: {e}")
+
+    def fetch_rollups(self, grain: str, start: datetime, end: datetime, station_level: bool = False,
+                      line_id: str = None, station_id: str = None, page_size: int = None):
+        """
+        [start, end) 구간의 분/시간 단위 집계 행을 가져옵니다.
+        :param grain: 'minute' | 'hour'
+        :param station_level: False 면 호선/방향 합계 행(station_id = '*')만, True 면 역 단위 행만 조회
+        :param line_id: 지정 시 해당 호선만
+        :param station_id: 지정 시 해당 역만 (station_level 무시)
+        """
+        if grain not in ROLLUP_TABLES:
+            raise ValueError(f"지원하지 않는 집계 단위입니다: {grain}")
+        page_size = page_size or Config.READ_PAGE_SIZE
+        rows = []
+        while True:
+            query = self.supabase.table(ROLLUP_TABLES[grain]).select("*")\
+                .gte("bucket", start.isoformat())\
+                .lt("bucket", end.isoformat())
+            if station_id is not None:
+                query = query.eq("station_id", station_id)
+            else:
+                query = query.neq("station_id", "*") if station_level else query.eq("station_id", "*")
+            if line_id is not None:
+                query = query.eq("line_id", line_id)
+            # 집계 테이블은 원본보다 훨씬 작으므로 PK 순 offset 페이지로 충분
+            page = query.order("bucket").order("line_id").order("station_id").order("direction_type")\
+                .range(len(rows), len(rows) + page_size - 1).execute().data
+            rows.extend(page)
+            if not page:
+                return rows
+
+    def _publish(self, rows: list):
+        """
+        REST 적재 후 새 배치 알림을 별도 연결로 보냅니다. (DATABASE_URL 이 있을 때만)
+        알림 실패는 적재 결과에 영향을 주지 않으며, 대시보드는 워터마크 조회로 대체됩니다.
+        """
+        if not Config.DATABASE_URL or not Config.NOTIFY_ENABLED:
+            return
+        try:
+            pool = self._get_pool()
+            conn = pool.getconn()
+        except Exception as e:
+            print(f"[DB Warning] 새 배치 알림 실패: {e}")
+            return
+        broken = False
+        try:
+            with conn.cursor() as cur:
+                publish_batch(cur, rows)
+            conn.commit()
+        except Exception as e:
+            broken = conn.closed != 0
+            if not broken:
+                conn.rollback()
+            print(f"[DB Warning] 새 배치 알림 실패: {e}")
+        finally:
+            pool.putconn(conn, close=broken)
+
+    def _insert_direct(self, rows: list):
+        """
+        psycopg2 커넥션 풀을 통해 COPY FROM STDIN 또는 execute_values 로 적재합니다.
+        에러는 호출한 쪽에서 처리하도록 그대로 올립니다.
+        """
+        facts = self._resolve_dimensions(rows)
+        pool = self._get_pool()
+        conn = pool.getconn()
+        broken = False
+        try:
+            with conn.cursor() as cur:
+                if self.write_backend == "copy":
+                    self._copy_rows(cur, facts)
+                else:
+                    self._execute_values(cur, facts)
+                self._refresh_rollups(cur, rows)
+                publish_batch(cur, rows)
+            conn.commit()
+            return len(rows)
+        except Exception:
+            broken = conn.closed != 0
+            if not broken:
+                conn.rollback()
+            raise
+        finally:
+            pool.putconn(conn, close=broken)
+
+    def _copy_rows(self, cur, rows: list):
+        """사실 테이블 행 목록을 CSV 로 직렬화하여 COPY 로 스트리밍합니다. (None 은 NULL 로 적재)"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([row[col] for col in FACT_COLUMNS])
+        buffer.seek(0)
+        columns = ", ".join(FACT_COLUMNS)
+        cur.copy_expert(f"COPY {self.fact_table} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+    def _execute_values(self, cur, rows: list):
+        """다중 행 INSERT 로 적재합니다."""
+        columns = ", ".join(FACT_COLUMNS)
+        values = [tuple(row[col] for col in FACT_COLUMNS) for row in rows]
+        psycopg2.extras.execute_values(
+            cur,
+            f"INSERT INTO {self.fact_table} ({columns}) VALUES %s",
+            values,
+            page_size=1000,
+        )
+
+    def _resolve_dimensions(self, rows: list) -> list:
+        """
+        _transform_data 결과를 사실 테이블 행으로 바꿉니다.
+        캐시에 없는 호선/역은 차원 테이블에 먼저 등록(별도 트랜잭션으로 커밋)한 뒤 id 를 캐시에 넣습니다.
+        """
+        lines, stations = self.dimensions.missing(rows)
+        if lines or stations:
+            if Config.DATABASE_URL:
+                self._upsert_dimensions_direct(lines, stations)
+            else:
+                self._upsert_dimensions_rest(lines, stations)
+        return self.dimensions.fact_rows(rows)
+
+    def _upsert_dimensions_direct(self, lines: dict, stations: dict):
+        pool = self._get_pool()
+        conn = pool.getconn()
+        broken = False
+        try:
+            with conn.cursor() as cur:
+                line_keys = {}
+                if lines:
+                    line_keys = dict(psycopg2.extras.execute_values(
+                        cur,
+                        "INSERT INTO lines (code, name) VALUES %s "
+                        "ON CONFLICT (code) DO UPDATE SET name = coalesce(EXCLUDED.name, lines.name) "
+                        "RETURNING code, id",
+                        list(lines.items()), fetch=True,
+                    ))
+                station_keys = {}
+                if stations:
+                    values = [(code, line_keys.get(line) or self.dimensions.line_key(line), name)
+                              for code, (line, name) in stations.items()]
+                    station_keys = dict(psycopg2.extras.execute_values(
+                        cur,
+                        "INSERT INTO stations (code, line_id, name) VALUES %s "
+                        "ON CONFLICT (code) DO UPDATE SET name = coalesce(EXCLUDED.name, stations.name) "
+                        "RETURNING code, id",
+                        values, fetch=True,
+                    ))
+            conn.commit()
+        except Exception:
+            broken = conn.closed != 0
+            if not broken:
+                conn.rollback()
+            raise
+        finally:
+            pool.putconn(conn, close=broken)
+        self.dimensions.store(line_keys, station_keys)
+
+    def _upsert_dimensions_rest(self, lines: dict, stations: dict):
+        line_keys = {}
+        if lines:
+            data = self.supabase.table("lines").upsert(
+                [{"code": code, "name": name} for code, name in lines.items()], on_conflict="code"
+            ).execute().data
+            line_keys = {row["code"]: row["id"] for row in data}
+            self.dimensions.store(lines=line_keys)
+        if stations:
+            data = self.supabase.table("stations").upsert(
+                [{"code": code, "line_id": self.dimensions.line_key(line), "name": name}
+                 for code, (line, name) in stations.items()],
+                on_conflict="code",
+            ).execute().data
+            self.dimensions.store(stations={row["code"]: row["id"] for row in data})
+
+    def _get_pool(self) -> ThreadedConnectionPool:
+        """psycopg2 커넥션 풀을 (최초 1회) 생성하여 반환합니다."""
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadedConnectionPool(
+                    Config.DB_POOL_MIN, Config.DB_POOL_MAX, Config.DATABASE_URL, connect_timeout=10
+                )
+            return self._pool
+
+    def close(self):
+        """커넥션 풀을 정리합니다."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
 
-    def _transform_data(self, raw: dict) -> dict:
+    def _transform_data(self, raw: dict, collected_at: str = None) -> dict:
         """
         API 원본 데이터를 DB 스키마에 맞게 변환 (Snake case 매핑)
+        코드 값은 정수/불리언/날짜로 정리하고, 호선/역은 코드와 이름을 그대로 둡니다.
+        (스풀에는 DB 없이 기록해야 하므로 차원 테이블 id 는 적재 직전 _resolve_dimensions 에서 캐시로 변환)
+        :param collected_at: 수집 시각(ISO 8601). 스풀을 거쳐 늦게 적재되어도 수집 시각이 유지되도록 함
         """
         # Boolean 변환 처리 (lstcarAt 등)
         # API에서 "0", "1" string으로 올 수 있음
@@ -89,13 +652,13 @@ class DbClient:
             "station_id": raw.get('statnId'),
             "station_name": raw.get('statnNm'),
             "train_number": raw.get('trainNo'),
-            "last_rec_date": raw.get('lastRecptnDt'),
-            "last_rec_time": raw.get('recptnDt'),
-            "direction_type": raw.get('updnLine'),
+            "last_rec_date": as_date(raw.get('lastRecptnDt')),
+            "last_rec_time": as_timestamp(raw.get('recptnDt')),
+            "direction_type": small_int(raw.get('updnLine')),
             "dest_station_id": raw.get('statnTid'),
             "dest_station_name": raw.get('statnTnm'),
-            "train_status": raw.get('trainSttus'),
-            "is_express": raw.get('directAt'),
-            "is_last_train": str(is_last), # DB 스키마가 VARCHAR일 경우. Boolean이면 True/False
-            # created_at은 DB Default 값 사용
+            "train_status": small_int(raw.get('trainSttus')),
+            "is_express": small_int(raw.get('directAt')),
+            "is_last_train": is_last,
+            "created_at": collected_at or datetime.now(timezone.utc).isoformat(),
         }
@@ -0,0 +1,101 @@
+import re
+import threading
+from datetime import datetime
+
+# subway_positions 적재 컬럼 (docs/schema.sql 의 사실 테이블, line/station 은 차원 테이블 id)
+FACT_COLUMNS = (
+    "line_id", "station_id", "dest_station_id", "train_number",
+    "last_rec_date", "last_rec_time", "direction_type", "train_status",
+    "is_express", "is_last_train", "created_at",
+)
+
+def small_int(value):
+    """'0', '1', 7 등 코드 값을 정수로 변환합니다. (값이 없거나 숫자가 아니면 None)"""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def as_bool(value) -> bool:
+    """lstcarAt('0'/'1'), 예전 스풀 행의 'True'/'False' 모두 처리"""
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "t")
+
+def as_date(value):
+    """lastRecptnDt(YYYYMMDD) 또는 YYYY-MM-DD 를 ISO 날짜 문자열로 변환합니다."""
+    if not value:
+        return None
+    value = str(value).strip()
+    if re.fullmatch(r"\d{8}", value):
+        return f"{value[:4]}-{value[4:6]}-{value[6:]}"
+    return value if re.fullmatch(r"\d{4}-\d{2}-\d{2}", value) else None
+
+def as_timestamp(value):
+    """recptnDt(YYYY-MM-DD HH:MM:SS, 한국시간)가 올바른 형식일 때만 그대로 반환합니다."""
+    if not value:
+        return None
+    try:
+        datetime.strptime(str(value).strip(), "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return None
+    return str(value).strip()
+
+
+class DimensionCache:
+    """
+    호선/역 코드(subwayId, statnId) → 차원 테이블(lines, stations) id 매핑을 프로세스 안에 보관합니다.
+    처음 보는 코드만 DB 에 등록(upsert)하므로, 호선/역이 모두 등록된 뒤에는 적재 시 추가 조회가 없습니다.
+    """
+
+    def __init__(self):
+        self._lines = {}
+        self._stations = {}
+        self._lock = threading.Lock()
+
+    def missing(self, rows: list):
+        """
+        캐시에 없는 호선/역을 반환합니다.
+        :return: ({호선 코드: 호선명}, {역 코드: (호선 코드, 역명)})
+        """
+        lines, stations = {}, {}
+        with self._lock:
+            for row in rows:
+                line = row.get("line_id")
+                if line and line not in self._lines:
+                    lines[line] = lines.get(line) or row.get("line_name")
+                for code_key, name_key in (("station_id", "station_name"), ("dest_station_id", "dest_station_name")):
+                    code = row.get(code_key)
+                    if code and code not in self._stations:
+                        known = stations.get(code)
+                        stations[code] = (line, (known and known[1]) or row.get(name_key))
+        return lines, stations
+
+    def line_key(self, code):
+        return self._lines.get(code)
+
+    def store(self, lines=(), stations=()):
+        """DB 에 등록된 (코드, id) 쌍을 캐시에 추가합니다. (커밋된 뒤에만 호출)"""
+        with self._lock:
+            self._lines.update(lines)
+            self._stations.update(stations)
+
+    def fact_rows(self, rows: list) -> list:
+        """_transform_data 결과(코드 기반 행)를 subway_positions 적재용 행으로 바꿉니다."""
+        with self._lock:
+            lines, stations = self._lines, self._stations
+            return [{
+                "line_id": lines.get(row.get("line_id")),
+                "station_id": stations.get(row.get("station_id")),
+                "dest_station_id": stations.get(row.get("dest_station_id")),
+                "train_number": row.get("train_number"),
+                "last_rec_date": as_date(row.get("last_rec_date")),
+                "last_rec_time": as_timestamp(row.get("last_rec_time")),
+                "direction_type": small_int(row.get("direction_type")),
+                "train_status": small_int(row.get("train_status")),
+                "is_express": small_int(row.get("is_express")),
+                "is_last_train": as_bool(row.get("is_last_train")),
+                "created_at": row.get("created_at"),
+            } for row in rows]
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets 다운샘플링.
+    첫/마지막 점은 유지하고, 나머지 구간을 n_out - 2 개 버킷으로 나눠 버킷마다
+    (직전 선택 점, 다음 버킷 평균 점)과 만드는 삼각형 면적이 가장 큰 점을 고릅니다.
+    :param x: 오름차순 정렬된 x 값 (float)
+    :return: 선택된 점의 인덱스 (오름차순)
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i < n_out - 3:
+            next_x = x[edges[i + 1]:edges[i + 2]].mean()
+            next_y = y[edges[i + 1]:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[n - 1], y[n - 1]
+        area = np.abs((x[a] - next_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+def minmax_bins(x: np.ndarray, y: np.ndarray, n_bins: int) -> np.ndarray:
+    """
+    x 구간을 n_bins 개 등간격 구간으로 나누고 구간별 최소/최대 점만 남깁니다. (급등/급락 보존)
+    :return: 선택된 점의 인덱스 (오름차순, 최대 2 * n_bins 개)
+    """
+    n = len(x)
+    if n <= 2 * n_bins or n_bins < 1:
+        return np.arange(n)
+
+    span = x[-1] - x[0]
+    bins = np.zeros(n, dtype=np.int64) if span <= 0 else \
+        np.minimum(((x - x[0]) / span * n_bins).astype(np.int64), n_bins - 1)
+    # 구간, y 순으로 정렬하면 구간의 첫 점 = 최소, 마지막 점 = 최대
+    order = np.lexsort((y, bins))
+    sorted_bins = bins[order]
+    first = np.flatnonzero(np.r_[True, sorted_bins[1:] != sorted_bins[:-1]])
+    last = np.r_[first[1:] - 1, n - 1]
+    return np.unique(np.concatenate([order[first], order[last]]))
+
+DOWNSAMPLERS = {
+    'lttb': lttb,
+    # minmax 는 구간당 2 점을 남기므로 구간 수를 절반으로
+    'minmax': lambda x, y, n_out: minmax_bins(x, y, max(n_out // 2, 1)),
+}
+
+def downsample_frame(df: pd.DataFrame, x: str, y: str, n_points: int, method: str = 'lttb',
+                     by: list = None, x_range: tuple = None) -> pd.DataFrame:
+    """
+    보이는 구간(x_range) 안의 행만 골라 그룹별로 약 n_points 개 이하로 줄입니다.
+    확대할수록 구간이 좁아져 같은 점 수로 더 촘촘하게 다시 샘플링됩니다.
+    :param x: 시간 축 컬럼 (datetime)
+    :param by: 계열 구분 컬럼 (예: ['direction_type']), 점 수는 계열 수로 나눠 배분
+    :param x_range: (시작, 끝) 시각, None 이면 전체
+    """
+    if method not in DOWNSAMPLERS:
+        raise ValueError(f"지원하지 않는 다운샘플링 방식입니다: {method}")
+    df = df.dropna(subset=[x, y])
+    if x_range is not None:
+        start, end = (pd.Timestamp(v) for v in x_range)
+        df = df[(df[x] >= start) & (df[x] <= end)]
+    if df.empty:
+        return df
+
+    groups = [g for _, g in df.groupby(by, observed=True, sort=True)] if by else [df]
+    per_group = max(n_points // len(groups), 3)
+    sampled = []
+    for g in groups:
+        g = g.sort_values(x, kind='stable')
+        xs = g[x].values.astype('datetime64[ns]').astype(np.int64) / 1e9
+        keep = DOWNSAMPLERS[method](xs, g[y].to_numpy(dtype=float), per_group)
+        sampled.append(g.iloc[keep])
+    return pd.concat(sampled, ignore_index=True)
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import CategoricalDtype, union_categoricals
+
+# 분석용 DataFrame 고정 스키마
+# - 반복되는 문자열(호선/역/열차번호 등)은 category
+# - 코드 값(방향/상태/급행)은 int8, 값이 없거나 숫자가 아니면 MISSING_CODE
+# - 시각은 명시적 포맷으로 파싱 (형식 추론 없음)
+MISSING_CODE = -1
+
+# category 는 문자열 정렬 순서를 유지하므로 groupby 결과 순서가 문자열 컬럼과 같음
+CATEGORY_COLUMNS = [
+    'line_id', 'line_name', 'train_number', 'last_rec_date',
+]
+# 같은 값을 비교하는 컬럼끼리는 category 목록을 공유 (예: station_id == dest_station_id)
+SHARED_CATEGORY_COLUMNS = [
+    ('station_id', 'dest_station_id'),
+    ('station_name', 'dest_station_name'),
+]
+CODE_COLUMNS = ['direction_type', 'train_status', 'is_express']
+
+CREATED_AT_FORMAT = 'ISO8601'                 # PostgREST timestamptz (예: 2026-01-01T00:00:00.123+00:00)
+LAST_REC_TIME_FORMAT = 'ISO8601'              # recptnDt (한국시간, 예: 2026-01-01 08:30:15 / 2026-01-01T08:30:15)
+
+def _codes(values: pd.Series) -> pd.Series:
+    codes = pd.to_numeric(values, errors='coerce')
+    return codes.fillna(MISSING_CODE).astype(np.int8)
+
+def _category(values: pd.Series, dtype: CategoricalDtype = None) -> pd.Series:
+    values = values.where(values.isna(), values.astype(str))
+    return values.astype(dtype or 'category')
+
+def typed_frame(data) -> pd.DataFrame:
+    """
+    DB 조회 결과(행 리스트) 또는 문자열 DataFrame 을 고정 스키마의 압축 DataFrame 으로 변환합니다.
+    이미 변환된 컬럼은 그대로 둡니다.
+    """
+    df = data.copy() if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+    if df.empty:
+        return df
+
+    if 'id' in df:
+        df['id'] = pd.to_numeric(df['id'], downcast='integer')
+    for col in CATEGORY_COLUMNS:
+        if col in df and not isinstance(df[col].dtype, CategoricalDtype):
+            df[col] = _category(df[col])
+    for cols in SHARED_CATEGORY_COLUMNS:
+        present = [col for col in cols if col in df]
+        dtypes = {df[col].dtype for col in present}
+        if not present or (len(dtypes) == 1 and isinstance(next(iter(dtypes)), CategoricalDtype)):
+            continue
+        values = pd.concat([df[col].astype(object) for col in present], ignore_index=True).dropna()
+        dtype = CategoricalDtype(sorted(pd.unique(values.astype(str))))
+        for col in present:
+            df[col] = _category(df[col].astype(object), dtype)
+    for col in CODE_COLUMNS:
+        if col in df and df[col].dtype != np.int8:
+            df[col] = _codes(df[col])
+    if 'is_last_train' in df and df['is_last_train'].dtype != bool:
+        df['is_last_train'] = df['is_last_train'].astype(str).str.lower().isin(('true', '1'))
+
+    if 'created_at' in df and not pd.api.types.is_datetime64_any_dtype(df['created_at']):
+        df['created_at'] = pd.to_datetime(df['created_at'], format=CREATED_AT_FORMAT, utc=True)
+    if 'last_rec_time' in df and not pd.api.types.is_datetime64_any_dtype(df['last_rec_time']):
+        df['last_rec_time'] = pd.to_datetime(df['last_rec_time'], format=LAST_REC_TIME_FORMAT, errors='coerce')
+    return df
+
+def concat_frames(frames: list) -> pd.DataFrame:
+    """
+    typed_frame 결과를 이어 붙입니다.
+    category 목록이 달라도 object 로 바뀌지 않도록 컬럼별로 category 를 합칩니다.
+    """
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+
+    frames = [f.copy() for f in frames]
+    category_groups = [[col] for col in CATEGORY_COLUMNS] + [list(cols) for cols in SHARED_CATEGORY_COLUMNS]
+    for cols in category_groups:
+        parts = [f[col] for f in frames for col in cols
+                 if col in f and isinstance(f[col].dtype, CategoricalDtype)]
+        if not parts:
+            continue
+        dtype = CategoricalDtype(union_categoricals(parts, sort_categories=True).categories)
+        for f in frames:
+            for col in cols:
+                if col in f:
+                    f[col] = f[col].astype(dtype)
+    return pd.concat(frames, ignore_index=True)
+
+def memory_report(df: pd.DataFrame) -> pd.DataFrame:
+    """컬럼별 dtype 과 메모리 사용량(바이트, 문자열 내용 포함)을 반환합니다."""
+    usage = df.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({'dtype': df.dtypes.astype(str), 'bytes': usage})
+    report.loc['(total)'] = ['', int(usage.sum())]
+    report['bytes_per_row'] = (report['bytes'] / max(len(df), 1)).round(1)
+    return report
+
+def compare_memory(rows: list) -> dict:
+    """같은 행 목록을 문자열 DataFrame 과 압축 DataFrame 으로 만들어 메모리 사용량을 비교합니다."""
+    raw = pd.DataFrame(rows)
+    typed = typed_frame(rows)
+    raw_bytes = int(raw.memory_usage(deep=True, index=False).sum())
+    typed_bytes = int(typed.memory_usage(deep=True, index=False).sum())
+    return {
+        'rows': len(raw),
+        'object_bytes_per_row': raw_bytes / max(len(raw), 1),
+        'typed_bytes_per_row': typed_bytes / max(len(typed), 1),
+        'ratio': raw_bytes / typed_bytes if typed_bytes else float('nan'),
+    }
+
+if __name__ == "__main__":
+    import argparse
+    from db_client import DbClient
+
+    parser = argparse.ArgumentParser(description="최근 적재 행으로 분석용 DataFrame 메모리 사용량 비교")
+    parser.add_argument("--limit", type=int, default=10000)
+    args = parser.parse_args()
+
+    rows = DbClient().fetch_latest(args.limit)
+    print(memory_report(typed_frame(rows)))
+    result = compare_memory(rows)
+    print(f"{result['rows']}행: object {result['object_bytes_per_row']:.0f} B/행 → "
+          f"typed {result['typed_bytes_per_row']:.0f} B/행 ({result['ratio']:.1f}배 감소)")
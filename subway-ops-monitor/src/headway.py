@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+# 배차 간격을 계산하는 기준 (같은 호선/역/방향에 연속으로 도착한 열차 간 시간 차이)
+HEADWAY_KEYS = ['line_name', 'station_name', 'direction_type']
+
+# 집계 수준별 그룹 기준
+STAT_LEVELS = {
+    'line': ['line_name'],
+    'direction': ['line_name', 'direction_type'],
+    'station': ['line_name', 'station_name', 'direction_type'],
+}
+
+def compute_headways(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    위치 스냅샷에서 열차 도착 이벤트를 뽑아 배차 간격(분)을 계산합니다.
+    - (호선, 역, 방향) 그룹 번호와 created_at 으로 한 번만 정렬
+    - 같은 열차가 연속 관측된 행은 하나의 도착으로 보고, 열차가 바뀌는 행만 도착 이벤트로 사용
+    - 직전 도착과의 시간 차이를 그룹 경계를 넘지 않도록 shift 한 번으로 계산
+    :return: 도착 이벤트 DataFrame (HEADWAY_KEYS, train_number, created_at, headway)
+    """
+    if df.empty:
+        return pd.DataFrame(columns=HEADWAY_KEYS + ['train_number', 'created_at', 'headway'])
+
+    group = df.groupby(HEADWAY_KEYS, sort=False, observed=True, dropna=False).ngroup().to_numpy()
+    # tz-aware 컬럼도 object 배열이 아닌 datetime64 배열로 변환
+    times = df['created_at'].values
+    order = np.lexsort((times, group))
+
+    group = group[order]
+    times = times[order]
+    trains = df['train_number'].to_numpy()[order]
+
+    same_group = np.empty(len(group), dtype=bool)
+    same_group[0] = False
+    same_group[1:] = group[1:] == group[:-1]
+
+    # 그룹이 바뀌었거나 직전 행과 다른 열차면 새 도착
+    is_arrival = ~same_group
+    is_arrival[1:] |= trains[1:] != trains[:-1]
+
+    arrivals = df.iloc[order[is_arrival]][HEADWAY_KEYS + ['train_number', 'created_at']].reset_index(drop=True)
+    arrival_group = group[is_arrival]
+    arrival_times = times[is_arrival]
+
+    headway = np.full(len(arrivals), np.nan)
+    if len(arrivals) > 1:
+        prev_same = arrival_group[1:] == arrival_group[:-1]
+        delta = (arrival_times[1:] - arrival_times[:-1]) / np.timedelta64(1, 's') / 60.0
+        headway[1:] = np.where(prev_same, delta, np.nan)
+    arrivals['headway'] = headway
+    return arrivals
+
+def headway_stats(events: pd.DataFrame, by: list) -> pd.DataFrame:
+    """
+    배차 간격 통계를 계산합니다.
+    mean/std/count 와 변동계수(cv = std / mean, Bunching Index), 중앙값/90 백분위수를 포함합니다.
+    """
+    valid = events.dropna(subset=['headway'])
+    if valid.empty:
+        return pd.DataFrame(columns=by + ['mean', 'std', 'count', 'cv', 'p50', 'p90'])
+
+    grouped = valid.groupby(by, observed=True)['headway']
+    stats = grouped.agg(['mean', 'std', 'count'])
+    quantiles = grouped.quantile([0.5, 0.9]).unstack()
+    stats['cv'] = stats['std'] / stats['mean']
+    stats['p50'] = quantiles[0.5]
+    stats['p90'] = quantiles[0.9]
+    return stats.reset_index()
+
+def summarize_headways(df: pd.DataFrame) -> dict:
+    """호선/방향/역 단위 배차 간격 통계를 한 번의 이벤트 계산으로 모두 만듭니다."""
+    events = compute_headways(df)
+    return {level: headway_stats(events, by) for level, by in STAT_LEVELS.items()}
@@ -18,16 +18,31 @@ def init_db():
         cur = conn.cursor()
         
         print("Dropping existing table...")
-        cur.execute("DROP TABLE IF EXISTS subway_time CASCADE;")
+        # subway_time 은 조회용 뷰 (정규화 이전 DB 에서는 테이블)
+        cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('subway_time')")
+        row = cur.fetchone()
+        if row is not None:
+            kind = "VIEW" if row[0] == 'v' else "TABLE"
+            cur.execute(f"DROP {kind} subway_time CASCADE;")
+        cur.execute("DROP TABLE IF EXISTS subway_positions CASCADE;")
         conn.commit()
 
         print("Executing schema.sql...")
         cur.execute(sql)
+
+        # 어제 ~ PARTITION_DAYS_AHEAD 일 뒤까지의 일 단위 파티션 생성
+        cur.execute(
+            "SELECT create_subway_time_partitions("
+            "(now() AT TIME ZONE 'Asia/Seoul')::date - 1, "
+            "(now() AT TIME ZONE 'Asia/Seoul')::date + %s)",
+            (Config.PARTITION_DAYS_AHEAD,),
+        )
+        print(f"Created {cur.fetchone()[0]} daily partitions.")
         conn.commit()
         
         cur.close()
         conn.close()
-        print("Table 'subway_time' created successfully (or already exists).")
+        print("Table 'subway_positions' and view 'subway_time' created successfully (or already exist).")
         return True
         
     except Exception as e:
@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+from config import Config
+
+# directAt 코드 - 1:급행, 7:특급 은 급행으로 취급 (frames.typed_frame 에서 int8 로 변환)
+EXPRESS_CODES = (1, 7)
+
+OVERTAKE_COLUMNS = ['line_name', 'direction_type', 'from_station', 'to_station', 'overtake_count']
+INTERFERENCE_COLUMNS = ['line_name', 'direction_type', 'express_station', 'local_station',
+                        'interference_sec', 'episodes']
+
+def station_progress(df: pd.DataFrame, topology=None) -> pd.Series:
+    """
+    열차의 진행 위치(값이 클수록 진행 방향으로 앞쪽)를 계산합니다.
+    역 순서 색인(StationTopology)에 있는 호선/방향은 색인의 순번을 사용합니다.
+    색인이 없거나 색인에 없는 역이 관측된 호선/방향은 호선 내 역 ID 의 순위를 역 순서 대용값으로 사용하고,
+    하행/외선(1)은 역 ID 증가 방향, 상행/내선(0)은 감소 방향으로 진행한다고 가정합니다.
+    """
+    station_no = pd.to_numeric(df['station_id'], errors='coerce')
+    ordinal = station_no.groupby(df['line_name'], observed=True).rank(method='dense')
+    direction = pd.to_numeric(df['direction_type'], errors='coerce')
+    proxy = ordinal.where(direction == 1, -ordinal)
+    if topology is None or not len(topology):
+        return proxy
+
+    # 색인에 없는 역이 하나라도 있는 호선/방향은 전체를 대용값으로 계산 (두 기준의 순번을 섞지 않음)
+    indexed = topology.ordinals(df)
+    covered = indexed.notna().groupby([df['line_name'], df['direction_type']], observed=True).transform('all')
+    return indexed.where(covered, proxy)
+
+def _held_longer_than_usual(station: np.ndarray) -> np.ndarray:
+    """
+    (스냅샷, 열차) 역 코드 행렬에서 열차가 현재 역에 평소보다 오래 머물고 있는 스냅샷을 표시합니다.
+    평소 체류 = 같은 역에서 끝난 방문(연속으로 같은 역에 관측된 스냅샷 수)의 중앙값
+    """
+    n_snap, n_train = station.shape
+    stay = np.zeros(station.shape, dtype=bool)
+    stay[1:] = station[1:] == station[:-1]
+    idx = np.broadcast_to(np.arange(n_snap)[:, None], station.shape)
+    # 현재 역에 도착한 뒤 지난 스냅샷 수 (도착한 스냅샷 = 0)
+    run = idx - np.maximum.accumulate(np.where(stay, 0, idx), axis=0)
+
+    # 방문이 끝난 스냅샷(다음 스냅샷에 역이 바뀜)의 체류 길이로 역별 중앙값 계산
+    ends = np.zeros(station.shape, dtype=bool)
+    ends[:-1] = ~stay[1:] & ~np.isnan(station[:-1])
+    visits = pd.DataFrame({'station': station[ends], 'length': run[ends] + 1})
+    usual = visits.groupby('station')['length'].median()
+    baseline = usual.reindex(station.ravel()).fillna(1).to_numpy().reshape(station.shape)
+    return run + 1 > baseline
+
+def detect_interference(df: pd.DataFrame, snapshot_sec: int = None, max_gap: int = 5, topology=None) -> dict:
+    """
+    급행/일반 열차의 추월 및 간섭을 탐지합니다.
+    - 호선/방향별로 스냅샷(수집 주기 단위) x 열차 위치 행렬을 만들고, 변화 없는 열차는 직전 위치로 채움
+    - 급행-일반 열차 쌍의 위치 차이(D = 급행 - 일반)를 스냅샷 단위로 한 번에 계산
+    - 추월: D 의 부호가 음수(급행이 뒤) → 양수(급행이 앞)로 바뀐 시점 (같은 역에 있는 구간은 건너뜀)
+    - 간섭: D == -1 (급행이 일반 열차 바로 한 역 뒤에 붙어 있음) 이면서 급행이 실제로 붙잡혀 있는 스냅샷의 지속 시간
+      (급행이 그 역에 머문 스냅샷 수가 같은 역 급행 체류의 중앙값보다 길 때만 - 지나가는 열차는 제외)
+    :param snapshot_sec: 스냅샷 간격(초), 기본값은 BATCH_INTERVAL
+    :param max_gap: 관측이 없을 때 직전 위치를 유지할 최대 스냅샷 수
+    :param topology: 역 순서 색인 (없으면 역 ID 순위로 대체)
+    :return: {'overtakes': DataFrame, 'interference': DataFrame, 'express_count': int, 'normal_count': int}
+    """
+    express_mask = pd.to_numeric(df['is_express'], errors='coerce').isin(EXPRESS_CODES) \
+        if not df.empty else pd.Series(dtype=bool)
+    result = {
+        'overtakes': pd.DataFrame(columns=OVERTAKE_COLUMNS),
+        'interference': pd.DataFrame(columns=INTERFERENCE_COLUMNS),
+        'express_count': int(express_mask.sum()),
+        'normal_count': int((~express_mask).sum()),
+    }
+    if df.empty:
+        return result
+
+    freq = f"{snapshot_sec or Config.BATCH_INTERVAL}s"
+    base = df[['line_name', 'direction_type', 'train_number', 'station_id']].copy()
+    base['express'] = express_mask.to_numpy()
+    base['snapshot'] = pd.to_datetime(df['created_at'], utc=True).dt.floor(freq)
+    base['progress'] = station_progress(df, topology)
+    # station_id 가 없는 행은 factorize 코드가 -1 이므로 NaN 으로 바꿈 (take 로 마지막 역 이름이 붙지 않도록)
+    codes, stations = pd.factorize(base['station_id'])
+    base['station_code'] = np.where(codes >= 0, codes, np.nan)
+    base = base.dropna(subset=['progress', 'snapshot'])
+
+    overtakes, interference = [], []
+    for (line, direction), g in base.groupby(['line_name', 'direction_type'], observed=True, sort=False):
+        g = g.sort_values('snapshot', kind='stable').drop_duplicates(['snapshot', 'train_number'], keep='last')
+        # 열차별 급행 여부 (마지막 관측 기준)
+        is_express = g.groupby('train_number', observed=True)['express'].last()
+        if not is_express.any() or is_express.all():
+            continue
+
+        progress = g.pivot(index='snapshot', columns='train_number', values='progress').ffill(limit=max_gap)
+        station = g.pivot(index='snapshot', columns='train_number', values='station_code').ffill(limit=max_gap)
+        exp_cols = is_express.reindex(progress.columns).to_numpy(dtype=bool)
+
+        P = progress.to_numpy(dtype=float)
+        S = station.to_numpy(dtype=float)
+        D = P[:, exp_cols][:, :, None] - P[:, ~exp_cols][:, None, :]   # (스냅샷, 급행, 일반)
+        n_snap, n_exp, n_loc = D.shape
+        if n_snap < 2:
+            continue
+
+        # 추월 - 같은 역(D == 0)에 있던 구간은 직전 부호를 유지하여 대피선 정차 후 추월도 잡아냄
+        sign = np.sign(D)
+        sign[sign == 0] = np.nan
+        carried = pd.DataFrame(sign.reshape(n_snap, -1)).ffill().to_numpy().reshape(D.shape)
+        passed = (carried[:-1] == -1) & (np.sign(D[1:]) == 1)
+        s_idx, e_idx, _ = np.nonzero(passed)
+        exp_station = S[:, exp_cols]
+        if len(s_idx):
+            overtakes.append(pd.DataFrame({
+                'line_name': line,
+                'direction_type': direction,
+                'from_code': exp_station[s_idx, e_idx],
+                'to_code': exp_station[s_idx + 1, e_idx],
+            }))
+
+        # 간섭 - 급행이 일반 열차 한 역 뒤에서 평소보다 오래 정차 중인 스냅샷, 다음 스냅샷까지의 시간을 지속 시간으로 누적
+        held = (D == -1) & _held_longer_than_usual(exp_station)[:, :, None]
+        snap_times = progress.index.to_numpy()
+        step_sec = np.empty(n_snap)
+        step_sec[:-1] = (snap_times[1:] - snap_times[:-1]) / np.timedelta64(1, 's')
+        step_sec[-1] = pd.Timedelta(freq).total_seconds()
+        starts = held.copy()
+        starts[1:] &= ~held[:-1]
+        s_idx, e_idx, l_idx = np.nonzero(held)
+        if len(s_idx):
+            interference.append(pd.DataFrame({
+                'line_name': line,
+                'direction_type': direction,
+                'express_code': exp_station[s_idx, e_idx],
+                'local_code': S[:, ~exp_cols][s_idx, l_idx],
+                'interference_sec': step_sec[s_idx],
+                'episodes': starts[s_idx, e_idx, l_idx].astype(int),
+            }))
+
+    names = pd.Series(df['station_name'].to_numpy(), index=df['station_id'].to_numpy())
+    names = names[~names.index.duplicated()]
+
+    def station_name(codes):
+        ids = stations.take(codes.astype(int))
+        return names.reindex(ids).to_numpy()
+
+    if overtakes:
+        o = pd.concat(overtakes, ignore_index=True).dropna(subset=['from_code', 'to_code'])
+        o['from_station'] = station_name(o['from_code'])
+        o['to_station'] = station_name(o['to_code'])
+        result['overtakes'] = o.groupby(['line_name', 'direction_type', 'from_station', 'to_station'], observed=True)\
+            .size().reset_index(name='overtake_count')\
+            .sort_values('overtake_count', ascending=False, ignore_index=True)
+    if interference:
+        i = pd.concat(interference, ignore_index=True).dropna(subset=['express_code', 'local_code'])
+        i['express_station'] = station_name(i['express_code'])
+        i['local_station'] = station_name(i['local_code'])
+        result['interference'] = i.groupby(['line_name', 'direction_type', 'express_station', 'local_station'],
+                                           observed=True)[['interference_sec', 'episodes']].sum().reset_index()\
+            .sort_values('interference_sec', ascending=False, ignore_index=True)
+    return result
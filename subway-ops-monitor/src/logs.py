@@ -0,0 +1,25 @@
+import json
+import threading
+from datetime import datetime, timezone
+from config import Config
+
+def log(event: str, message: str, level: str = "info", **fields):
+    """
+    수집기 로그를 출력합니다.
+    - text (기본): 기존처럼 message 만 출력
+    - json: {"ts", "level", "event", "message", "thread", ...fields} 를 한 줄 JSON 으로 출력 (로그 수집기에서 필드로 검색)
+    :param event: 이벤트 이름 (예: batch_end, api_error)
+    :param fields: 함께 기록할 값 (호선, 행 수, 소요 시간 등)
+    """
+    if Config.LOG_FORMAT != "json":
+        print(message)
+        return
+    record = {
+        "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        "level": level,
+        "event": event,
+        "message": message,
+        "thread": threading.current_thread().name,
+        **fields,
+    }
+    print(json.dumps(record, ensure_ascii=False, default=str), flush=True)
@@ -1,33 +1,109 @@
-import schedule
 import time
 from config import Config
 from api_client import SeoulSubwayAPI
 from db_client import DbClient
+from state_tracker import TrainStateTracker
+from spool import WriteSpool, SpoolDrainer, SpoolFullError
+from recorder import PayloadRecorder
+from metrics import ROWS_FETCHED, ROWS_WRITTEN, BATCH_DURATION, BATCHES, LAST_BATCH, SPOOL_PENDING, start_server
+from scheduler import FixedRateScheduler, Tick
+from profiling import BatchProfiler
+from poll_planner import PollPlanner
+from sharding import ShardCoordinator
+from logs import log
+from contextlib import nullcontext
 
-def job():
-    print(f"\n[Batch Start] {time.strftime('%Y-%m-%d %H:%M:%S')}")
-    
-    api = SeoulSubwayAPI()
-    db = DbClient()
+def job(api: SeoulSubwayAPI, db: DbClient, tracker: TrainStateTracker = None, spool: WriteSpool = None,
+        profiler: BatchProfiler = None, tick: Tick = None, planner: PollPlanner = None,
+        coordinator: ShardCoordinator = None):
+    # 제때 시작한 배치는 예정 시각(주기 경계)을 수집 시각으로 기록하여 스냅샷 간격을 일정하게 유지
+    collected_at = tick.planned_at.isoformat() if tick is not None and tick.on_time else None
+    # 지정한 배치만 프로파일링 (PROFILE_BATCHES / SIGUSR1)
+    with profiler.batch() if profiler is not None else nullcontext():
+        collect(api, db, tracker, spool, collected_at, planner, coordinator)
+
+def collect(api: SeoulSubwayAPI, db: DbClient, tracker: TrainStateTracker = None, spool: WriteSpool = None,
+            collected_at: str = None, planner: PollPlanner = None, coordinator: ShardCoordinator = None):
+    log("batch_start", f"\n[Batch Start] {time.strftime('%Y-%m-%d %H:%M:%S')}")
+    batch_start = time.monotonic()
     
-    # 모니터링 대상 호선 (예시: 1~9호선, 경의중앙선 등 필요에 따라 추가)
-    # API 호선명 파라미터 확인 필요. 보통 "1호선", "2호선" 등으로 사용
-    target_lines = ["1호선", "2호선", "3호선", "4호선", "5호선", "6호선", "7호선", "8호선", "9호선"]
+    # 모니터링 대상 호선 (Config.LINE_REGISTRY / TARGET_LINE_IDS 로 관리)
+    target = Config.get_target_lines()
+    if coordinator is not None:
+        # 수평 분할: 임대를 가진 호선만 수집 (넘겨받은 호선은 이전 상태를 지우고 전체 스냅샷부터 시작)
+        target, acquired = coordinator.acquire()
+        if tracker is not None and acquired:
+            tracker.forget(acquired)
+    target_lines = list(target.values())
+    if planner is not None:
+        # 적응형 조회: 주기가 돌아왔고 호출 한도 토큰이 남은 호선만 조회
+        target_lines = planner.due(time.time(), target_lines if coordinator is not None else None)
+    if not target_lines:
+        log("batch_idle", "[Batch End] 이번 배치에 조회할 호선이 없습니다.")
+        if coordinator is not None:
+            coordinator.release_excess()
+        return
     
     total_inserted = 0
     
-    for line in target_lines:
-        print(f"Fetching {line}...", end=" ")
-        data = api.get_realtime_positions(line)
-        data = api.get_realtime_positions(line)
-        if data:
-            count = db.insert_positions(data)
-            print(f"Inserted {count} records.")
-            total_inserted += count
+    # 호선별 조회는 동시에 진행하고, 응답이 도착하는 대로 DB에 적재
+    for line, data in api.iter_realtime_positions(target_lines):
+        if not data:
+            log("line_empty", f"[{line}] No data.", line=line)
+            if planner is not None:
+                planner.observe(line, 0, 0)
+            continue
+
+        if coordinator is not None and not coordinator.holds(line):
+            # 조회 중 임대가 만료됨 - 다른 인스턴스가 가져갔을 수 있으므로 적재하지 않음
+            log("line_lease_lost", f"[{line}] 임대가 만료되어 {len(data)}건을 버립니다.", level="warning",
+                line=line, fetched=len(data))
+            continue
+
+        fetched = len(data)
+        ROWS_FETCHED.inc(fetched, line=line)
+        # 상태 변화 감지: 직전 관측과 동일한 열차는 적재하지 않음
+        # (바뀐 상태는 적재/스풀 기록에 성공한 뒤에만 상태표에 반영 - 실패한 전이를 다음 배치에서 다시 적재)
+        if tracker is not None:
+            data = tracker.filter_changed(data, commit=False)
+        if planner is not None:
+            planner.observe(line, fetched, len(data))
+
+        if spool is not None:
+            # 스풀에 기록만 하고 DB 적재는 SpoolDrainer 가 담당 (수집 루프는 DB를 기다리지 않음)
+            try:
+                count = db.spool_positions(spool, data, collected_at) if data else 0
+            except SpoolFullError as e:
+                # 상태표에 반영하지 않았으므로 스풀에 여유가 생기면 다음 배치에서 다시 기록됨
+                count = 0
+                log("line_spool_full", f"[{line}] {e} - {len(data)}건을 기록하지 못했습니다.", level="error",
+                    line=line, rows=len(data))
+            log("line_spooled", f"[{line}] Spooled {count}/{fetched} records.", line=line, fetched=fetched, rows=count)
         else:
-            print("No data.")
+            count = db.insert_positions(data, collected_at) if data else 0
+            log("line_inserted", f"[{line}] Inserted {count}/{fetched} records.", line=line, fetched=fetched, rows=count)
+        if tracker is not None and data and count == len(data):
+            tracker.commit(data)
+        ROWS_WRITTEN.inc(count, line=line)
+        total_inserted += count
+
+    if tracker is not None:
+        tracker.evict_stale()
+        tracker.save()
+    if planner is not None:
+        planner.save()
+    if coordinator is not None:
+        # 몫보다 많이 가진 호선은 이번 배치까지 수집한 뒤 반납 (다음 배치부터 다른 인스턴스가 수집)
+        coordinator.release_excess()
+    if spool is not None:
+        SPOOL_PENDING.set(spool.pending_bytes())
             
-    print(f"[Batch End] Total {total_inserted} records processed.")
+    elapsed = time.monotonic() - batch_start
+    BATCH_DURATION.observe(elapsed)
+    BATCHES.inc()
+    LAST_BATCH.set(time.time())
+    log("batch_end", f"[Batch End] Total {total_inserted} records processed. ({elapsed:.2f}s)",
+        rows=total_inserted, duration=round(elapsed, 3))
 
 def main():
     print("=== Seoul Subway Monitoring System Started ===")
@@ -38,23 +114,72 @@ def main():
         print(f"[System Error] 설정 오류: {e}")
         return
 
+    # API 세션/DB 클라이언트는 배치마다 새로 만들지 않고 재사용 (keep-alive 유지)
+    # 원본 응답 기록 (replay.py 로 같은 변환/적재 경로에 다시 흘려보낼 수 있음)
+    recorder = PayloadRecorder() if Config.RECORD_ENABLED else None
+    api = SeoulSubwayAPI(recorder=recorder)
+    db = DbClient()
+    tracker = TrainStateTracker() if Config.CHANGE_DETECTION else None
+
+    # 로컬 스풀 + 백그라운드 적재 스레드 (이전 실행에서 남은 배치부터 순서대로 적재)
+    spool = drainer = None
+    if Config.SPOOL_ENABLED:
+        spool = WriteSpool()
+        drainer = SpoolDrainer(spool, db)
+        drainer.start()
+
     # 테이블 초기화 (테이블이 없으면 생성)
     try:
-        tmp_db = DbClient()
-        tmp_db.initialize_table()
+        db.initialize_table()
     except Exception as e:
         print(f"[System Warning] 테이블 초기화 중 오류: {e}")
 
-    # 초기 실행
+    # Prometheus /metrics 엔드포인트 (METRICS_PORT=0 이면 비활성)
+    try:
+        if start_server():
+            print(f"[Metrics] http://{Config.METRICS_HOST}:{Config.METRICS_PORT}/metrics")
+    except OSError as e:
+        print(f"[System Warning] 메트릭 엔드포인트를 열 수 없습니다: {e}")
 
-    job()
-    
-    # 주기적 실행 설정
-    schedule.every(Config.BATCH_INTERVAL).seconds.do(job)
-    
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+    # 선택한 배치 프로파일링 (PROFILE_BATCHES, 또는 kill -USR1 <pid> 로 다음 배치)
+    profiler = BatchProfiler()
+    profiler.install_signal()
+
+    # 호선별 적응형 조회 주기 - 배치는 최소 조회 간격마다 돌고, 호선별로 주기가 돌아온 호선만 조회
+    planner = None
+    batch_interval = Config.BATCH_INTERVAL
+    if Config.ADAPTIVE_POLLING:
+        batch_interval = Config.POLL_MIN_INTERVAL
+        planner = PollPlanner(list(Config.get_target_lines().values()), tick=batch_interval)
+
+    # 수평 분할 - 여러 인스턴스가 DB 임대 테이블로 호선을 나눠 수집 (인스턴스가 죽으면 SHARD_LEASE_TTL 뒤 재분배)
+    coordinator = ShardCoordinator() if Config.SHARDING_ENABLED else None
+
+    # 주기적 실행 설정 - 시작 직후 1회 실행한 뒤 배치 주기 (BATCH_INTERVAL, 적응형 조회 시 POLL_MIN_INTERVAL) 경계(예: 매분 00초)에 맞춰 실행
+    # 배치가 주기를 넘기면 SCHEDULE_POLICY (skip | coalesce | catchup) 에 따라 처리
+    scheduler = FixedRateScheduler()
+    scheduler.add("batch", batch_interval,
+                  lambda tick: job(api, db, tracker, spool, profiler, tick, planner, coordinator), run_now=True)
+    # 파티션 사전 생성 / 보관 기간 정리 (멱등 작업이므로 1시간마다 확인, 배치와 별도 스레드)
+    scheduler.add("maintenance", 3600, lambda tick: db.maintain_partitions(), policy="skip")
+    try:
+        scheduler.run_forever()
+    finally:
+        # 진행 중인 배치가 끝나기를 기다린 뒤 순서대로 정리
+        scheduler.stop()
+        if coordinator is not None:
+            # 종료 시 임대를 바로 반납하여 다른 인스턴스가 TTL 을 기다리지 않고 이어받게 함
+            coordinator.close()
+        # 조회 스레드 풀 종료 대기, 세션 정리, 응답 기록 파일 마무리(gzip 마지막 블록 기록)
+        api.close()
+        if drainer is not None:
+            drainer.stop()
+        if spool is not None:
+            spool.close()
+        if tracker is not None:
+            tracker.save()
+        db.close()
+        print("=== Seoul Subway Monitoring System Stopped ===")
 
 if __name__ == "__main__":
     main()
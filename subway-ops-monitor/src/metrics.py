@@ -0,0 +1,177 @@
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import Config
+
+# 지연 시간 히스토그램 구간 (초)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20)
+BATCH_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+LAG_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    """레이블 값 조합별 값을 보관하는 메트릭 공통 부분 (스레드 안전)"""
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key: tuple, value) -> list:
+        return [f"{self.name}{_labels(self.label_names, key)} {_number(value)}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [구간별 개수..., +Inf], 합계
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    def time(self, **labels):
+        """with 블록 실행 시간을 기록합니다."""
+        return _Timer(self, labels)
+
+    def _samples(self, key: tuple, value) -> list:
+        counts, total = value
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = f'le="{_number(bound) if bound != float("inf") else "+Inf"}"'
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(total)}")
+        lines.append(f"{self.name}_count{_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+        self.histogram.observe(self.elapsed, **self.labels)
+        return False
+
+REGISTRY = []
+
+# ---------------------------------------------------------------------- 수집기 메트릭
+API_LATENCY = Histogram("subway_api_request_seconds", "API page request latency", ("line",))
+API_ERRORS = Counter("subway_api_errors_total", "API failures by line and error type", ("line", "type"))
+ROWS_FETCHED = Counter("subway_rows_fetched_total", "Positions returned by the API", ("line",))
+ROWS_WRITTEN = Counter("subway_rows_written_total", "Positions inserted or spooled after change detection", ("line",))
+DB_WRITE_LATENCY = Histogram("subway_db_write_seconds", "Insert latency per call", ("backend", "path"))
+DB_ROWS = Counter("subway_db_rows_total", "Rows written to the database", ("backend", "path"))
+DB_ERRORS = Counter("subway_db_errors_total", "Database write failures by error type", ("backend", "type"))
+BATCH_DURATION = Histogram("subway_batch_duration_seconds", "Collection batch duration", buckets=BATCH_BUCKETS)
+SCHEDULE_LAG = Histogram("subway_schedule_lag_seconds", "Delay between planned and actual task start",
+                         ("task",), buckets=LAG_BUCKETS)
+SCHEDULE_OVERRUNS = Counter("subway_schedule_overruns_total", "Runs that went past the next planned tick",
+                            ("task", "policy"))
+SCHEDULE_SKIPPED = Counter("subway_schedule_skipped_ticks_total", "Planned ticks dropped by the overrun policy",
+                           ("task",))
+BATCHES = Counter("subway_batches_total", "Completed collection batches")
+LAST_BATCH = Gauge("subway_last_batch_timestamp_seconds", "Unix time of the last completed batch")
+SPOOL_PENDING = Gauge("subway_spool_pending_bytes", "Spool bytes waiting for the database")
+SPOOL_DROPPED = Counter("subway_spool_dropped_bytes_total", "Spool bytes discarded by the size limit", ("policy",))
+POLL_INTERVAL = Gauge("subway_poll_interval_seconds", "Planned poll interval per line", ("line",))
+POLL_TOKENS = Gauge("subway_poll_tokens", "API call tokens left in the quota bucket")
+POLL_DEFERRED = Counter("subway_poll_deferred_total", "Line polls postponed for lack of quota tokens", ("line",))
+API_CALLS_TODAY = Gauge("subway_api_calls_today", "API calls spent against the daily quota")
+SHARD_LINES = Gauge("subway_shard_lines", "Lines currently leased by this collector instance")
+SHARD_MEMBERS = Gauge("subway_shard_members", "Live collector instances sharing the line registry")
+SHARD_HANDOFFS = Counter("subway_shard_handoffs_total", "Line leases acquired, released or lost", ("direction",))
+
+def render() -> str:
+    """Prometheus 텍스트 형식 (text/plain; version=0.0.4)"""
+    lines = []
+    for metric in list(REGISTRY):
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 스크레이프 요청마다 접근 로그를 남기지 않음
+        pass
+
+def start_server(port: int = None, host: str = None):
+    """
+    /metrics 엔드포인트를 백그라운드 스레드로 엽니다. (port 0 이면 열지 않음)
+    :return: HTTP 서버 (종료 시 shutdown())
+    """
+    port = Config.METRICS_PORT if port is None else port
+    if not port:
+        return None
+    server = ThreadingHTTPServer((host or Config.METRICS_HOST, port), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
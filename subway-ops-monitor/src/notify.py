@@ -0,0 +1,107 @@
+import json
+import select
+import threading
+import psycopg2
+from psycopg2 import sql
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from config import Config
+
+# NOTIFY 페이로드 최대 크기는 8000 바이트이므로 행 자체가 아닌 요약 정보만 보냄
+def batch_summary(rows: list) -> dict:
+    """적재한 행 목록에서 알림용 요약(행 수, 호선 ID, created_at 범위)을 만듭니다."""
+    created = [row["created_at"] for row in rows if row.get("created_at")]
+    return {
+        "rows": len(rows),
+        "lines": sorted({row["line_id"] for row in rows if row.get("line_id")}),
+        "from": min(created) if created else None,
+        "to": max(created) if created else None,
+    }
+
+def publish_batch(cur, rows: list, channel: str = None):
+    """
+    새 배치 알림을 보냅니다.
+    적재와 같은 트랜잭션에서 호출하면 커밋될 때만 전달되고, 롤백되면 전달되지 않습니다.
+    """
+    if not rows or not Config.NOTIFY_ENABLED:
+        return
+    cur.execute("SELECT pg_notify(%s, %s)", (channel or Config.NOTIFY_CHANNEL, json.dumps(batch_summary(rows))))
+
+
+class BatchListener(threading.Thread):
+    """
+    새 배치 알림을 구독하는 백그라운드 스레드.
+    알림을 받을 때마다 version 을 올리므로, 대시보드는 version 만 주기적으로 비교하면 됩니다.
+    알림의 호선 ID 별로도 마지막 version 을 기록하므로, 호선별 화면은 line_version 으로 해당 호선이 바뀔 때만 갱신할 수 있습니다.
+    연결이 끊기면 재연결하고, 끊긴 동안 놓친 배치가 있을 수 있으므로 재연결 시에는 모든 호선의 version 을 올립니다.
+    """
+
+    def __init__(self, dsn: str = None, channel: str = None, max_backoff: float = 60):
+        super().__init__(name="subway-listen", daemon=True)
+        self.dsn = dsn or Config.DATABASE_URL
+        self.channel = channel or Config.NOTIFY_CHANNEL
+        self.max_backoff = max_backoff
+        self.version = 0
+        self.last_batch = None
+        # 호선 ID → 그 호선이 포함된 마지막 알림의 version
+        self.line_versions = {}
+        # 모든 호선을 바뀐 것으로 본 마지막 version (재연결, 호선 정보가 없는 알림)
+        self._all_version = 0
+        # LISTEN 중인 동안만 설정 (해제 상태면 대시보드는 워터마크 조회로 대체)
+        self.connected = threading.Event()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        backoff = 1
+        while not self._stop_event.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(self.dsn, connect_timeout=10)
+                conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cur:
+                    cur.execute(sql.SQL("LISTEN {}").format(sql.Identifier(self.channel)))
+                self.connected.set()
+                self._bump(None)
+                backoff = 1
+                print(f"[Listen] '{self.channel}' 채널 구독 시작")
+
+                while not self._stop_event.is_set():
+                    if select.select([conn], [], [], 5) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self._bump(conn.notifies.pop(0).payload)
+            except Exception as e:
+                print(f"[Listen Error] 알림 구독 실패, {backoff}초 후 재연결합니다: {e}")
+            finally:
+                self.connected.clear()
+                if conn is not None:
+                    conn.close()
+            self._stop_event.wait(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def _bump(self, payload):
+        batch = None
+        if payload:
+            try:
+                batch = json.loads(payload)
+            except ValueError:
+                batch = None
+        lines = batch.get("lines") if isinstance(batch, dict) else None
+        with self._lock:
+            self.version += 1
+            self.last_batch = batch
+            if lines is None:
+                self._all_version = self.version
+            else:
+                for line_id in lines:
+                    self.line_versions[str(line_id)] = self.version
+
+    def line_version(self, line_id) -> int:
+        """이 호선의 데이터가 마지막으로 바뀐 알림 version"""
+        with self._lock:
+            return max(self.line_versions.get(str(line_id), 0), self._all_version)
+
+    def stop(self, timeout: float = None):
+        self._stop_event.set()
+        self.join(timeout)
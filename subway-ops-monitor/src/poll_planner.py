@@ -0,0 +1,198 @@
+import json
+import math
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from config import Config
+from metrics import POLL_INTERVAL, POLL_TOKENS, POLL_DEFERRED, API_CALLS_TODAY
+from logs import log
+
+KST = timezone(timedelta(hours=9))
+
+class TokenBucket:
+    """초당 rate 개씩 최대 capacity 개까지 채워지는 토큰 버킷"""
+
+    def __init__(self, capacity: float, rate: float, now: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self._updated = now
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + max(now - self._updated, 0.0) * self.rate)
+        self._updated = now
+
+    def take(self, amount: float) -> bool:
+        if self.tokens < amount:
+            return False
+        self.tokens -= amount
+        return True
+
+class _LineState:
+    def __init__(self, interval: float, change: float = None, pages: int = 1):
+        self.interval = interval
+        # 조회당 상태가 바뀐 열차 비율 (지수 이동 평균)
+        self.change = change
+        self.pages = pages
+        self.next_due = 0.0
+
+class PollPlanner:
+    """
+    호선별 조회 주기를 상태 변화 비율과 남은 일일 API 호출 한도에 맞춰 조정합니다.
+    - 조회 결과에서 상태가 바뀐 열차 비율(TrainStateTracker 기준)이 목표(POLL_TARGET_CHANGE)보다 높으면
+      주기를 줄이고, 낮으면 늘림 (POLL_MIN_INTERVAL ~ POLL_MAX_INTERVAL, 배치 주기의 배수)
+    - 남은 한도를 한국시간 자정까지 남은 시간으로 나눈 속도로 토큰을 채우고, 호출(페이지) 1회에 토큰 1개 사용
+    - 호선별 필요 호출 속도의 합이 토큰 속도를 넘으면 모든 호선의 주기를 같은 비율로 늘림
+    - 토큰이 부족하면 급한 호선(변화 비율이 높은 호선)부터 조회하고 나머지는 다음 배치로 미룸
+    """
+
+    def __init__(self, lines: list, tick: float = None, state_path: str = None):
+        self.tick = tick or Config.POLL_MIN_INTERVAL
+        self.min_interval = max(Config.POLL_MIN_INTERVAL, self.tick)
+        self.max_interval = max(Config.POLL_MAX_INTERVAL, self.min_interval)
+        self.quota = Config.API_DAILY_QUOTA
+        self.state_path = state_path or Config.POLL_STATE_PATH
+        self._lock = threading.Lock()
+        self._lines = {line: _LineState(self.min_interval) for line in lines}
+        self._day = None
+        self._used = 0
+        self._bucket = None
+        self.load()
+
+    # ------------------------------------------------------------------ 조회 계획
+    def due(self, now: float, lines: list = None) -> list:
+        """
+        이번 배치에서 조회할 호선명 목록을 반환합니다. (토큰을 미리 사용)
+        :param now: 현재 시각 (epoch 초)
+        :param lines: 이 인스턴스가 맡은 호선명 (수평 분할 시, 일일 한도도 맡은 호선 비율만큼만 사용)
+        """
+        with self._lock:
+            owned = self._lines if lines is None else {line: self._lines[line] for line in lines if line in self._lines}
+            self._roll_day(now)
+            rate = self._budget_rate(now, len(owned) / max(len(self._lines), 1))
+            stretch = self._stretch(rate, owned)
+            # 다음 배치까지 반 주기 이내로 남은 호선은 이번에 조회 (주기 경계 오차 흡수)
+            due = [(line, state) for line, state in owned.items() if state.next_due <= now + self.tick / 2]
+            due.sort(key=lambda item: (-(item[1].change if item[1].change is not None else 1.0), item[1].next_due))
+
+            selected = []
+            for line, state in due:
+                if self._bucket is not None:
+                    self._bucket.refill(now)
+                    if not self._bucket.take(state.pages):
+                        POLL_DEFERRED.inc(line=line)
+                        continue
+                selected.append(line)
+                self._used += state.pages
+                # 한도 때문에 늘린 주기도 최대 간격을 넘기지 않음 (그 이상은 토큰 버킷이 제한)
+                interval = min(state.interval * stretch, self.max_interval)
+                state.next_due = now + self._quantize(interval)
+                POLL_INTERVAL.set(interval, line=line)
+
+            if self._bucket is not None:
+                POLL_TOKENS.set(self._bucket.tokens)
+            API_CALLS_TODAY.set(self._used)
+            if len(selected) < len(due):
+                log("poll_deferred", f"[Planner] 호출 한도로 {len(due) - len(selected)}개 호선 조회를 미룹니다. "
+                    f"(오늘 {self._used}/{self.quota}회)", level="warning",
+                    deferred=[line for line, _ in due if line not in selected], used=self._used, quota=self.quota)
+            return selected
+
+    def observe(self, line: str, fetched: int, changed: int):
+        """
+        조회 결과로 호선의 변화 비율과 조회 주기를 갱신합니다.
+        :param fetched: API 가 돌려준 열차 수 (0 이면 운행 없음/조회 실패 → 주기를 늘림)
+        :param changed: 상태가 바뀐 열차 수 (TrainStateTracker.filter_changed 결과)
+        """
+        with self._lock:
+            state = self._lines.get(line)
+            if state is None:
+                return
+            pages = max(1, math.ceil(fetched / Config.API_PAGE_SIZE))
+            if pages > state.pages:
+                # 예상보다 페이지가 많았던 만큼 토큰을 추가로 사용 (부족하면 다음 조회가 미뤄짐)
+                self._used += pages - state.pages
+                if self._bucket is not None:
+                    self._bucket.tokens -= pages - state.pages
+            state.pages = pages
+
+            ratio = changed / fetched if fetched else 0.0
+            alpha = Config.POLL_SMOOTHING
+            state.change = ratio if state.change is None else alpha * ratio + (1 - alpha) * state.change
+            # 변화 비율이 목표보다 높으면 주기를 줄이고 낮으면 늘림 (한 번에 최대 2배)
+            factor = min(max(Config.POLL_TARGET_CHANGE / max(state.change, 1e-6), 0.5), 2.0)
+            state.interval = min(max(state.interval * factor, self.min_interval), self.max_interval)
+
+    def snapshot(self) -> dict:
+        """호선별 현재 주기/변화 비율 (로그, 대시보드 확인용)"""
+        with self._lock:
+            return {line: {"interval": s.interval, "change": s.change, "pages": s.pages}
+                    for line, s in self._lines.items()}
+
+    # ------------------------------------------------------------------ 일일 한도
+    def _roll_day(self, now: float):
+        day = datetime.fromtimestamp(now, KST).date().isoformat()
+        if day != self._day:
+            self._day, self._used = day, 0
+            self._bucket = None
+
+    def _budget_rate(self, now: float, share: float = 1.0):
+        """남은 한도(이 인스턴스 몫)를 자정(한국시간)까지 고르게 쓰는 초당 호출 수. 한도가 없으면 None"""
+        if not self.quota:
+            return None
+        local = datetime.fromtimestamp(now, KST)
+        midnight = (local + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        remaining = max(self.quota * share - self._used, 0)
+        rate = remaining / max((midnight - local).total_seconds(), 1.0)
+        if self._bucket is None:
+            capacity = max(rate * Config.POLL_BUCKET_SECONDS, sum(s.pages for s in self._lines.values()))
+            self._bucket = TokenBucket(min(capacity, remaining), rate, now)
+        else:
+            self._bucket.refill(now)
+            self._bucket.rate = rate
+        return rate
+
+    def _stretch(self, rate, lines: dict) -> float:
+        """호선별 주기로 필요한 호출 속도가 한도 속도를 넘으면 주기를 늘릴 배율 (1 이상)"""
+        if rate is None:
+            return 1.0
+        demand = sum(s.pages / s.interval for s in lines.values())
+        return max(demand / rate, 1.0) if rate > 0 else self.max_interval / self.min_interval
+
+    def _quantize(self, interval: float) -> float:
+        """조회 주기를 배치 주기의 배수로 맞춤"""
+        return max(round(interval / self.tick), 1) * self.tick
+
+    # ------------------------------------------------------------------ 저장 / 복원
+    def save(self):
+        """오늘 사용한 호출 수와 호선별 주기를 저장합니다. (재시작 후에도 한도 계산 유지)"""
+        with self._lock:
+            data = {
+                "day": self._day,
+                "used": self._used,
+                "lines": {line: {"interval": s.interval, "change": s.change, "pages": s.pages}
+                          for line, s in self._lines.items()},
+            }
+        try:
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+            tmp_path = f"{self.state_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            print(f"[Planner Error] 상태 저장 실패: {e}")
+
+    def load(self):
+        if not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._day, self._used = data.get("day"), int(data.get("used", 0))
+            for line, saved in data.get("lines", {}).items():
+                if line in self._lines:
+                    interval = min(max(float(saved["interval"]), self.min_interval), self.max_interval)
+                    self._lines[line] = _LineState(interval, saved.get("change"), int(saved.get("pages", 1)))
+            print(f"[Planner] 상태 복원: 오늘 API 호출 {self._used}회")
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"[Planner Error] 상태 로드 실패, 기본값으로 시작합니다: {e}")
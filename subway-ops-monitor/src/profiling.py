@@ -0,0 +1,103 @@
+import cProfile
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from config import Config
+from logs import log
+
+class StackSampler(threading.Thread):
+    """
+    모든 스레드의 호출 스택을 일정 간격으로 수집합니다. (API 조회 스레드 포함)
+    결과는 collapsed stack 형식 (flamegraph.pl / speedscope 로 열 수 있음)
+    """
+
+    def __init__(self, interval_ms: float = None):
+        super().__init__(name="stack-sampler", daemon=True)
+        self.interval = (interval_ms or Config.PROFILE_SAMPLE_MS) / 1000.0
+        self.samples = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        names = {}
+        while not self._stop_event.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == self.ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def dump(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+class BatchProfiler:
+    """
+    선택한 배치만 프로파일링합니다.
+    - PROFILE_BATCHES 에 지정한 배치 번호 (시작 후 1부터), 또는 SIGUSR1 을 받은 직후의 배치
+    - cprofile: 배치를 실행한 스레드의 cProfile 통계 (.prof, pstats / snakeviz)
+    - sample: 전체 스레드 스택 샘플링 (.folded)
+    """
+
+    def __init__(self, batches: list = None, mode: str = None, directory: str = None):
+        self.batches = set(Config.PROFILE_BATCHES if batches is None else batches)
+        self.mode = mode or Config.PROFILE_MODE
+        self.directory = directory or Config.PROFILE_DIR
+        self.seq = 0
+        self._requested = threading.Event()
+
+    def request(self):
+        """다음 배치를 프로파일링하도록 예약합니다."""
+        self._requested.set()
+
+    def install_signal(self):
+        """SIGUSR1 (kill -USR1 <pid>) 로 다음 배치 프로파일링을 예약합니다. (지원하는 OS, 메인 스레드에서만)"""
+        if hasattr(signal, "SIGUSR1") and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.request())
+
+    @contextmanager
+    def batch(self):
+        """배치 1회를 감싸는 컨텍스트. 대상 배치이면 프로파일 결과를 PROFILE_DIR 에 저장합니다."""
+        self.seq += 1
+        if self.seq not in self.batches and not self._requested.is_set():
+            yield
+            return
+        self._requested.clear()
+
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        if self.mode == "sample":
+            sampler = StackSampler()
+            sampler.start()
+            try:
+                yield
+            finally:
+                sampler.stop()
+                path = os.path.join(self.directory, f"batch-{self.seq:06d}-{stamp}.folded")
+                sampler.dump(path)
+                log("profile_saved", f"[Profile] 배치 {self.seq} 스택 샘플 저장: {path}", batch=self.seq, path=path)
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                path = os.path.join(self.directory, f"batch-{self.seq:06d}-{stamp}.prof")
+                profiler.dump_stats(path)
+                log("profile_saved", f"[Profile] 배치 {self.seq} cProfile 저장: {path}", batch=self.seq, path=path)
@@ -0,0 +1,120 @@
+import gzip
+import json
+import os
+import threading
+import zlib
+from datetime import datetime, timezone
+from config import Config
+
+SEGMENT_PREFIX = "rec-"
+SEGMENT_SUFFIX = ".ndjson.gz"
+
+class PayloadRecorder:
+    """
+    API 원본 응답을 수집 시각과 함께 gzip NDJSON 으로 기록합니다. (장애 재현/백필/회귀 테스트용)
+    - 호선 조회 1회 = 1줄: {"fetched_at", "line", "pages": [{"start", "end", "response"}, ...]}
+    - 수집 시각(UTC) 기준 RECORD_SEGMENT_MINUTES 분 단위로 파일을 나눔 (rec-20260105T0500Z-00.ndjson.gz)
+    - 줄마다 sync flush 하므로 비정상 종료 시에도 마지막으로 기록한 줄까지는 읽을 수 있음
+    """
+
+    def __init__(self, directory: str = None, segment_minutes: int = None):
+        self.directory = directory or Config.RECORD_DIR
+        self.segment_seconds = 60 * (segment_minutes or Config.RECORD_SEGMENT_MINUTES)
+        self._lock = threading.Lock()
+        self._segment = None
+        self._file = None
+        os.makedirs(self.directory, exist_ok=True)
+
+    def record(self, line: str, pages: list, fetched_at: datetime):
+        """
+        호선 1회 조회의 원본 응답을 기록합니다. (API 조회 스레드에서 동시에 호출됨)
+        :param pages: [(start, end, 응답 JSON), ...]
+        """
+        entry = {
+            "fetched_at": fetched_at.astimezone(timezone.utc).isoformat(),
+            "line": line,
+            "pages": [{"start": start, "end": end, "response": response} for start, end, response in pages],
+        }
+        data = json.dumps(entry, ensure_ascii=False).encode('utf-8') + b"\n"
+        segment = int(fetched_at.timestamp()) // self.segment_seconds * self.segment_seconds
+        with self._lock:
+            if segment != self._segment:
+                self._open(segment)
+            self._file.write(data)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _open(self, segment: int):
+        """
+        새 구간 파일을 엽니다. 같은 구간 파일이 이미 있으면 (재시작 등) 다음 번호로 새로 만들어
+        비정상 종료로 끊긴 gzip 스트림 뒤에 이어 쓰지 않도록 합니다.
+        """
+        if self._file is not None:
+            self._file.close()
+        stamp = datetime.fromtimestamp(segment, timezone.utc).strftime("%Y%m%dT%H%MZ")
+        part = 0
+        while os.path.exists(self._path(stamp, part)):
+            part += 1
+        self._file = gzip.open(self._path(stamp, part), 'wb')
+        self._segment = segment
+
+    def _path(self, stamp: str, part: int) -> str:
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{stamp}-{part:02d}{SEGMENT_SUFFIX}")
+
+
+def segment_files(directory: str = None) -> list:
+    """기록 파일을 시간 순으로 반환합니다."""
+    directory = directory or Config.RECORD_DIR
+    if not os.path.isdir(directory):
+        return []
+    names = [name for name in os.listdir(directory)
+             if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)]
+    return [os.path.join(directory, name) for name in sorted(names)]
+
+def iter_recordings(directory: str = None, start: datetime = None, end: datetime = None, lines: list = None):
+    """
+    기록된 응답을 파일 순서대로 읽습니다. [start, end) 구간과 호선명(lines)으로 거를 수 있습니다.
+    기록 도중 끊긴 파일은 읽을 수 있는 줄까지만 반환합니다.
+    """
+    paths = segment_files(directory)
+    starts = [_segment_start(path) for path in paths]
+    for i, path in enumerate(paths):
+        if end is not None and starts[i] >= end:
+            continue
+        # 다음 구간이 start 이전에 시작하면 이 파일은 전부 start 이전
+        later = [s for s in starts[i + 1:] if s > starts[i]]
+        if start is not None and later and later[0] <= start:
+            continue
+        try:
+            with gzip.open(path, 'rb') as f:
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        break
+                    record = json.loads(raw)
+                    fetched_at = datetime.fromisoformat(record["fetched_at"])
+                    if start is not None and fetched_at < start:
+                        continue
+                    if end is not None and fetched_at >= end:
+                        continue
+                    if lines and record["line"] not in lines:
+                        continue
+                    record["fetched_at"] = fetched_at
+                    yield record
+        except (EOFError, gzip.BadGzipFile, zlib.error, ValueError) as e:
+            print(f"[Record Warning] {os.path.basename(path)} 끝부분을 읽을 수 없어 건너뜁니다: {e}")
+
+def _segment_start(path: str) -> datetime:
+    stamp = os.path.basename(path)[len(SEGMENT_PREFIX):].split("-")[0]
+    return datetime.strptime(stamp, "%Y%m%dT%H%MZ").replace(tzinfo=timezone.utc)
+
+def record_positions(record: dict) -> list:
+    """기록 1줄의 페이지 응답을 이어 붙여 realtimePositionList 항목 목록으로 반환합니다."""
+    positions = []
+    for page in record["pages"]:
+        positions.extend((page.get("response") or {}).get("realtimePositionList") or [])
+    return positions
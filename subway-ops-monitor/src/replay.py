@@ -0,0 +1,113 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone, timedelta
+from config import Config
+from db_client import DbClient
+from state_tracker import TrainStateTracker
+from recorder import iter_recordings, record_positions
+
+KST = timezone(timedelta(hours=9))
+
+def replay(records, db: DbClient, speed: float = 1.0, tracker: TrainStateTracker = None,
+           retime: bool = False, dry_run: bool = False) -> dict:
+    """
+    기록된 원본 응답을 수집기와 같은 경로(상태 변화 감지 → _transform_data → insert_positions)로 적재합니다.
+    적재 전에 수집 시각(한국시간) 날짜의 파티션을 만들고, 적재하지 못한 행 수는 failed 로 집계합니다.
+    :param speed: 재생 배속 (1 = 기록된 간격 그대로, N = N배속, 0 = 대기 없이 최대 속도)
+    :param retime: True 면 재생 시각을 수집 시각으로 사용 (부하 테스트), False 면 기록된 수집 시각 유지 (백필/재현)
+    :param dry_run: DB 에 적재하지 않고 변환까지만 수행 (매핑 변경 확인, 회귀 비교용)
+    :return: 재생 통계
+    """
+    stats = {"records": 0, "fetched": 0, "written": 0, "failed": 0, "lag_max": 0.0}
+    # 파티션을 확인한 날짜 (한국시간)
+    days = set()
+    wall_start = time.monotonic()
+    first = None
+    for record in records:
+        fetched_at = record["fetched_at"]
+        first = first or fetched_at
+        if speed > 0:
+            # 기록된 간격을 배속으로 나눈 시각까지 대기 (적재가 밀리면 대기 없이 따라잡음)
+            delay = (fetched_at - first).total_seconds() / speed - (time.monotonic() - wall_start)
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                stats["lag_max"] = max(stats["lag_max"], -delay)
+
+        positions = record_positions(record)
+        stats["records"] += 1
+        stats["fetched"] += len(positions)
+        if tracker is not None:
+            positions = tracker.filter_changed(positions, commit=False)
+        collected = datetime.now(timezone.utc) if retime else fetched_at
+        collected_at = collected.isoformat()
+
+        if dry_run:
+            written = len([db._transform_data(pos, collected_at) for pos in positions])
+        else:
+            day = collected.astimezone(KST).date()
+            if positions and day not in days:
+                # 기록된 날짜의 파티션이 없으면 행이 적재되지 않으므로 먼저 만듦
+                db.ensure_partitions(day, day)
+                days.add(day)
+            written = db.insert_positions(positions, collected_at=collected_at) if positions else 0
+        if tracker is not None and written == len(positions):
+            tracker.commit(positions)
+        stats["written"] += written
+        stats["failed"] += len(positions) - written
+
+        if stats["records"] % 100 == 0:
+            print(f"[Replay] {stats['records']} responses, {stats['written']} records "
+                  f"(recorded {fetched_at.astimezone(KST):%Y-%m-%d %H:%M:%S})")
+
+    stats["elapsed"] = time.monotonic() - wall_start
+    return stats
+
+def parse_time(value: str):
+    """ISO 8601 시각 (시간대가 없으면 한국시간)"""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=KST)
+
+def main():
+    parser = argparse.ArgumentParser(description="기록된 원본 API 응답을 수집기와 같은 변환/적재 경로로 재생")
+    parser.add_argument("--dir", default=Config.RECORD_DIR, help="기록 디렉터리")
+    parser.add_argument("--from", dest="start", help="시작 시각 (예: 2026-01-05T07:00, 시간대 생략 시 한국시간)")
+    parser.add_argument("--to", dest="end", help="종료 시각 (미포함)")
+    parser.add_argument("--lines", help="재생할 호선명 (쉼표 구분, 예: 1호선,2호선)")
+    parser.add_argument("--speed", default="1", help="재생 배속 (1, 10 ..., max = 대기 없이 최대 속도)")
+    parser.add_argument("--retime", action="store_true", help="기록된 수집 시각 대신 재생 시각으로 적재")
+    parser.add_argument("--all-rows", action="store_true", help="상태 변화 감지 없이 모든 행 적재")
+    parser.add_argument("--backend", help="적재 방식 (rest | copy | values, 기본: DB_WRITE_BACKEND)")
+    parser.add_argument("--dry-run", action="store_true", help="DB 적재 없이 변환만 수행")
+    args = parser.parse_args()
+
+    speed = 0.0 if args.speed == "max" else float(args.speed)
+    lines = [line.strip() for line in args.lines.split(",") if line.strip()] if args.lines else None
+    records = iter_recordings(args.dir, parse_time(args.start), parse_time(args.end), lines)
+    db = DbClient(write_backend=args.backend)
+
+    tracker = None
+    checkpoint_dir = tempfile.TemporaryDirectory()
+    if Config.CHANGE_DETECTION and not args.all_rows:
+        # 재생 전용 상태표 (실행 중인 수집기의 체크포인트와 분리)
+        tracker = TrainStateTracker(checkpoint_path=os.path.join(checkpoint_dir.name, "replay_state.json"))
+
+    print(f"=== Replay: {args.dir} (speed {args.speed}{', dry run' if args.dry_run else ''}) ===")
+    try:
+        stats = replay(records, db, speed=speed, tracker=tracker, retime=args.retime, dry_run=args.dry_run)
+    finally:
+        db.close()
+        checkpoint_dir.cleanup()
+    print(f"[Replay End] {stats['records']} responses, {stats['fetched']} fetched → {stats['written']} records "
+          f"in {stats['elapsed']:.1f}s (max lag {stats['lag_max']:.1f}s)")
+    if stats["failed"]:
+        print(f"[Replay Error] {stats['failed']} records were not written. Check the DB errors above.", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
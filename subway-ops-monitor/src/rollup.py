@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+# 호선/방향 합계 행의 station_id (docs/schema.sql 의 refresh_subway_rollups 참고)
+ALL_STATIONS = '*'
+
+# 다시 합칠 때 더하는 컬럼 / 최대값을 취하는 컬럼
+SUM_COLUMNS = [
+    'observations', 'express_observations', 'active_train_minutes', 'minutes',
+    'arrivals', 'headway_count', 'headway_sum', 'headway_sumsq',
+    'dwell_count', 'dwell_sum', 'dwell_sumsq',
+]
+MAX_COLUMNS = ['active_trains_max', 'headway_max', 'dwell_max']
+
+def _mean_std(count, total, sumsq):
+    """개수/합/제곱합으로 평균과 표본 표준편차를 계산합니다. (pandas std 와 같은 ddof=1)"""
+    count = count.astype(float)
+    mean = total / count.where(count > 0)
+    var = (sumsq - count * mean ** 2) / (count - 1).where(count > 1)
+    return mean, np.sqrt(var.clip(lower=0))
+
+def rollup_metrics(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    집계 행(합계 컬럼)에서 지표 컬럼을 계산해 붙입니다.
+    - headway_mean/std/max (분), headway_cv
+    - dwell_mean/std/max (초)
+    - active_trains_avg (분 단위 평균 운행 열차 수), express_share (급행 관측 비율)
+    CHANGE_DETECTION 사용 시 observations/active_trains 는 적재된 상태 전이 기준이므로,
+    active_trains_avg 는 분마다 상태가 바뀐 열차 수의 평균, express_share 는 상태 전이 중 급행 비율입니다.
+    """
+    if df.empty:
+        return df
+    df = df.copy()
+    headway_mean, headway_std = _mean_std(df['headway_count'], df['headway_sum'], df['headway_sumsq'])
+    df['headway_mean'] = headway_mean / 60.0
+    df['headway_std'] = headway_std / 60.0
+    df['headway_cv'] = headway_std / headway_mean
+    df['headway_max_min'] = df['headway_max'] / 60.0
+    df['dwell_mean'], df['dwell_std'] = _mean_std(df['dwell_count'], df['dwell_sum'], df['dwell_sumsq'])
+    df['active_trains_avg'] = df['active_train_minutes'] / df['minutes'].where(df['minutes'] > 0)
+    df['express_share'] = df['express_observations'] / df['observations'].where(df['observations'] > 0)
+    return df
+
+def combine_rollups(df: pd.DataFrame, by: list, freq: str = None) -> pd.DataFrame:
+    """
+    집계 행을 더 큰 단위로 다시 합칩니다. (예: 방향 구분 없이 호선별, 1시간 → 1일)
+    개수/합/제곱합을 더하므로 평균/표준편차는 원본 행으로 계산한 값과 같습니다.
+    active_trains_max 는 구간별 최대값의 최대값이므로 방향을 합치면 근사값입니다.
+    :param freq: bucket 을 다시 묶을 단위 (예: 'D'), None 이면 bucket 구분 없이 합침
+    """
+    if df.empty:
+        return df
+    keys = list(by)
+    if freq is not None:
+        df = df.assign(bucket=pd.to_datetime(df['bucket'], utc=True).dt.floor(freq))
+        keys = ['bucket'] + keys
+    aggregations = {col: 'sum' for col in SUM_COLUMNS}
+    aggregations.update({col: 'max' for col in MAX_COLUMNS})
+    combined = df.groupby(keys, observed=True, dropna=False).agg(aggregations).reset_index()
+    return rollup_metrics(combined)
@@ -0,0 +1,137 @@
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from config import Config
+from metrics import SCHEDULE_LAG, SCHEDULE_OVERRUNS, SCHEDULE_SKIPPED
+from logs import log
+
+POLICIES = ("skip", "coalesce", "catchup")
+
+class Tick:
+    """작업 1회 실행 정보 - 예정 시각(epoch 초), 실제 시작 지연(초)"""
+
+    def __init__(self, planned: float, lag: float):
+        self.planned = planned
+        self.lag = lag
+
+    @property
+    def planned_at(self) -> datetime:
+        return datetime.fromtimestamp(self.planned, timezone.utc)
+
+    @property
+    def on_time(self) -> bool:
+        """예정 시각을 수집 시각으로 기록해도 될 만큼 제때 시작했는지 여부"""
+        return self.lag <= Config.SCHEDULE_ALIGN_TOLERANCE
+
+class _Task:
+    def __init__(self, name: str, interval: float, fn, offset: float, policy: str, run_now: bool):
+        if policy not in POLICIES:
+            raise ValueError(f"지원하지 않는 스케줄 정책입니다: {policy}")
+        self.name = name
+        self.interval = float(interval)
+        self.fn = fn
+        self.offset = offset
+        self.policy = policy
+        self.run_now = run_now
+
+class FixedRateScheduler:
+    """
+    작업을 벽시계 경계에 맞춘 고정 주기로 실행합니다. (예: 60초 주기 → 매분 00초 + SCHEDULE_OFFSET)
+    예정 시각은 epoch 기준 주기의 배수이므로 실행 시간이 길어도 이후 예정 시각이 밀리지 않습니다.
+    작업마다 별도 스레드에서 실행하여 한 작업의 지연이 다른 작업에 영향을 주지 않으며,
+    실행이 다음 예정 시각을 넘기면(overrun) 정책에 따라 처리합니다.
+    - skip: 지나간 예정 시각은 버리고 다음 경계에서 실행 (스냅샷 시각이 항상 경계에 맞음)
+    - coalesce: 지나간 예정 시각을 1회로 합쳐 즉시 실행한 뒤 다시 경계에 맞춤
+    - catchup: 지나간 예정 시각마다 즉시 연속 실행 (최대 SCHEDULE_CATCHUP_MAX 회, 나머지는 건너뜀)
+    """
+
+    def __init__(self):
+        self._tasks = []
+        self._threads = []
+        self._stop_event = threading.Event()
+
+    def add(self, name: str, interval: float, fn, offset: float = None, policy: str = None, run_now: bool = False):
+        """
+        :param fn: fn(tick: Tick) 형태로 호출
+        :param offset: 주기 경계로부터의 시작 오프셋(초)
+        :param run_now: 시작 직후 1회 실행한 뒤 경계에 맞춤
+        """
+        offset = Config.SCHEDULE_OFFSET if offset is None else offset
+        self._tasks.append(_Task(name, interval, fn, offset, policy or Config.SCHEDULE_POLICY, run_now))
+
+    def start(self):
+        for task in self._tasks:
+            thread = threading.Thread(target=self._run, args=(task,), name=f"schedule-{task.name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def run_forever(self):
+        """작업 스레드를 시작하고, 중지(stop/Ctrl+C)될 때까지 호출한 스레드를 붙잡아 둡니다."""
+        self.start()
+        try:
+            while not self._stop_event.wait(1.0):
+                pass
+        except KeyboardInterrupt:
+            self.stop()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    @staticmethod
+    def next_boundary(now: float, interval: float, offset: float = 0.0) -> float:
+        """now 이후(포함) 첫 번째 주기 경계 시각"""
+        return math.ceil((now - offset) / interval) * interval + offset
+
+    def _run(self, task: _Task):
+        now = time.time()
+        first_run = task.run_now
+        planned = now if first_run else self.next_boundary(now, task.interval, task.offset)
+        while self._wait_until(planned):
+            lag = max(time.time() - planned, 0.0)
+            SCHEDULE_LAG.observe(lag, task=task.name)
+            try:
+                task.fn(Tick(planned, lag))
+            except Exception as e:
+                log("schedule_error", f"[Scheduler Error] {task.name} 실행 실패: {e}", level="error",
+                    task=task.name, error=str(e))
+            if first_run:
+                # 시작 직후 실행 이후에는 경계에 맞춤
+                first_run = False
+                planned = self.next_boundary(time.time(), task.interval, task.offset)
+            else:
+                planned = self._next_tick(task, planned, time.time())
+
+    def _next_tick(self, task: _Task, planned: float, now: float) -> float:
+        """직전 예정 시각과 실행이 끝난 시각으로 다음 예정 시각을 정합니다."""
+        following = planned + task.interval
+        if now < following:
+            return following
+
+        # 실행 중 지나간 예정 시각 수
+        behind = int((now - following) // task.interval) + 1
+        if task.policy == "skip":
+            skipped = behind
+        elif task.policy == "coalesce":
+            skipped = behind - 1
+        else:
+            skipped = max(behind - Config.SCHEDULE_CATCHUP_MAX, 0)
+        SCHEDULE_OVERRUNS.inc(task=task.name, policy=task.policy)
+        if skipped:
+            SCHEDULE_SKIPPED.inc(skipped, task=task.name)
+        log("schedule_overrun",
+            f"[Scheduler] {task.name} 실행이 주기({task.interval:g}s)를 넘김: "
+            f"{behind}회 지연, {skipped}회 건너뜀 ({task.policy})",
+            level="warning", task=task.name, policy=task.policy, behind=behind, skipped=skipped)
+        return following + skipped * task.interval
+
+    def _wait_until(self, target: float) -> bool:
+        """target 시각(epoch 초)까지 대기합니다. 시스템 시계 조정에 대응하도록 짧게 나눠 기다림. 중지 시 False"""
+        while True:
+            remaining = target - time.time()
+            if remaining <= 0:
+                return not self._stop_event.is_set()
+            if self._stop_event.wait(min(remaining, 1.0)):
+                return False
@@ -0,0 +1,171 @@
+import math
+import threading
+import time
+import psycopg2
+from config import Config
+from metrics import SHARD_LINES, SHARD_MEMBERS, SHARD_HANDOFFS
+from logs import log
+
+class ShardCoordinator:
+    """
+    여러 수집기 인스턴스가 호선을 나눠 수집하도록 Postgres 임대(lease) 테이블로 조율합니다.
+    (docs/schema.sql 의 collector_instances / collector_leases, 외부 코디네이터 없이 DB 만 사용)
+    - 배치마다 생존 신호를 남기고, 살아 있는 인스턴스 수로 나눈 몫(올림)만큼 호선 임대를 갱신/획득
+    - 임대는 DB 시각 기준 SHARD_LEASE_TTL 동안 유효하며, 만료된 임대만 다른 인스턴스가 가져감
+      → 인스턴스가 죽으면 TTL 뒤 남은 인스턴스가 나눠 가짐
+    - 몫보다 많이 가진 인스턴스는 배치가 끝난 뒤 남는 호선을 반납 → 새 인스턴스가 다음 배치부터 수집
+    - 임대 갱신 요청 시작 시각 + TTL - SHARD_LEASE_MARGIN (로컬 단조 시계) 이 지나면 그 호선 결과를 적재하지 않음
+      → 멈췄다 깨어난 인스턴스가 이미 넘어간 호선을 적재하지 않으므로 같은 호선을 두 인스턴스가 동시에 수집하지 않음
+    """
+
+    def __init__(self, lines: dict = None, instance_id: str = None):
+        # {subwayId: 호선명}
+        self.lines = dict(lines or Config.get_target_lines())
+        self.instance_id = instance_id or Config.COLLECTOR_ID
+        self.ttl = Config.SHARD_LEASE_TTL
+        self.margin = Config.SHARD_LEASE_MARGIN
+        self.held = set()
+        self.members = 1
+        self._deadline = 0.0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def acquire(self) -> tuple:
+        """
+        임대를 갱신하고 몫이 남으면 빈(또는 만료된) 호선을 가져옵니다.
+        DB 에 접속할 수 없으면 기존 임대를 만료 전까지만 계속 사용합니다.
+        :return: (이번 배치에 수집할 {subwayId: 호선명}, 새로 가져온 subwayId 집합)
+        """
+        with self._lock:
+            started = time.monotonic()
+            try:
+                conn = self._connect()
+                with conn, conn.cursor() as cur:
+                    held, members = self._renew_and_claim(cur)
+            except psycopg2.Error as e:
+                self._close_conn()
+                log("shard_error", f"[Shard Error] 임대 갱신 실패, 기존 임대를 만료 전까지 사용합니다: {e}",
+                    level="error", error=str(e), held=len(self.held))
+                return self._owned(), set()
+
+            acquired, lost = held - self.held, self.held - held
+            self.held, self.members = held, members
+            self._deadline = started + self.ttl - self.margin
+            if acquired:
+                SHARD_HANDOFFS.inc(len(acquired), direction="acquired")
+            if lost:
+                SHARD_HANDOFFS.inc(len(lost), direction="lost")
+            if acquired or lost:
+                log("shard_rebalanced",
+                    f"[Shard] {self.instance_id}: 호선 {len(held)}/{len(self.lines)}개 담당 "
+                    f"(인스턴스 {members}개, +{len(acquired)} -{len(lost)})",
+                    instance=self.instance_id, members=members, held=sorted(held),
+                    acquired=sorted(acquired), lost=sorted(lost))
+            SHARD_LINES.set(len(held))
+            SHARD_MEMBERS.set(members)
+            return self._owned(), acquired
+
+    def holds(self, line_name: str) -> bool:
+        """이 호선의 임대가 아직 유효한지 (적재 직전 확인)"""
+        return time.monotonic() < self._deadline and line_name in {self.lines[line_id] for line_id in self.held}
+
+    def release_excess(self):
+        """살아 있는 인스턴스 수 기준 몫보다 많이 가진 호선을 반납합니다. (배치가 끝난 뒤 호출)"""
+        share = math.ceil(len(self.lines) / max(self.members, 1))
+        if len(self.held) > share:
+            self._release(sorted(self.held)[share:])
+
+    def close(self):
+        """종료 시 모든 임대를 반납하고 인스턴스 등록을 지워 다른 인스턴스가 바로 가져가게 합니다."""
+        self._release(sorted(self.held), leave=True)
+        with self._lock:
+            self._close_conn()
+
+    def _renew_and_claim(self, cur) -> tuple:
+        line_ids = list(self.lines)
+        cur.execute(
+            "INSERT INTO collector_instances (instance_id, heartbeat_at) VALUES (%s, now()) "
+            "ON CONFLICT (instance_id) DO UPDATE SET heartbeat_at = now()",
+            (self.instance_id,),
+        )
+        # 오래전에 사라진 인스턴스 기록 정리
+        cur.execute(
+            "DELETE FROM collector_instances WHERE heartbeat_at < now() - make_interval(secs => %s)",
+            (self.ttl * 10,),
+        )
+        cur.execute(
+            "SELECT count(*) FROM collector_instances WHERE heartbeat_at > now() - make_interval(secs => %s)",
+            (self.ttl,),
+        )
+        members = cur.fetchone()[0]
+        cur.execute(
+            "INSERT INTO collector_leases (line_id) SELECT unnest(%s::varchar[]) ON CONFLICT (line_id) DO NOTHING",
+            (line_ids,),
+        )
+        # 가지고 있던 임대 갱신 (다른 인스턴스가 이미 가져갔으면 owner 가 달라 갱신되지 않음)
+        cur.execute(
+            "UPDATE collector_leases SET expires_at = now() + make_interval(secs => %s) "
+            "WHERE owner = %s AND line_id = ANY(%s) RETURNING line_id",
+            (self.ttl, self.instance_id, line_ids),
+        )
+        held = {row[0] for row in cur.fetchall()}
+
+        share = math.ceil(len(line_ids) / max(members, 1))
+        if len(held) < share:
+            # 비어 있거나 만료된 임대만 가져옴 (다른 인스턴스가 잠근 행은 건너뛰어 동시에 같은 호선을 가져가지 않음)
+            cur.execute(
+                "UPDATE collector_leases SET owner = %s, expires_at = now() + make_interval(secs => %s), "
+                "acquired_at = now() "
+                "WHERE line_id IN ("
+                "    SELECT line_id FROM collector_leases"
+                "    WHERE line_id = ANY(%s) AND (owner IS NULL OR expires_at <= now())"
+                "    ORDER BY line_id LIMIT %s FOR UPDATE SKIP LOCKED"
+                ") RETURNING line_id",
+                (self.instance_id, self.ttl, line_ids, share - len(held)),
+            )
+            held |= {row[0] for row in cur.fetchall()}
+        return held, members
+
+    def _release(self, line_ids: list, leave: bool = False):
+        if not line_ids and not leave:
+            return
+        with self._lock:
+            try:
+                conn = self._connect()
+                with conn, conn.cursor() as cur:
+                    cur.execute(
+                        "UPDATE collector_leases SET owner = NULL, expires_at = NULL "
+                        "WHERE owner = %s AND line_id = ANY(%s)",
+                        (self.instance_id, line_ids),
+                    )
+                    if leave:
+                        cur.execute("DELETE FROM collector_instances WHERE instance_id = %s", (self.instance_id,))
+            except psycopg2.Error as e:
+                # 반납하지 못한 임대는 TTL 뒤 만료되어 다른 인스턴스가 가져감
+                self._close_conn()
+                log("shard_error", f"[Shard Error] 임대 반납 실패: {e}", level="error", error=str(e))
+                return
+            self.held -= set(line_ids)
+            if line_ids:
+                SHARD_HANDOFFS.inc(len(line_ids), direction="released")
+                log("shard_released", f"[Shard] {self.instance_id}: 호선 {len(line_ids)}개 반납 ({', '.join(line_ids)})",
+                    instance=self.instance_id, released=line_ids)
+            SHARD_LINES.set(len(self.held))
+
+    def _owned(self) -> dict:
+        if time.monotonic() >= self._deadline:
+            return {}
+        return {line_id: self.lines[line_id] for line_id in sorted(self.held)}
+
+    def _connect(self):
+        if self._conn is None or self._conn.closed:
+            self._conn = psycopg2.connect(Config.DATABASE_URL, connect_timeout=10)
+        return self._conn
+
+    def _close_conn(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except psycopg2.Error:
+                pass
+            self._conn = None
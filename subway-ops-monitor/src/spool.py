@@ -0,0 +1,242 @@
+import json
+import os
+import threading
+import uuid
+from config import Config
+from metrics import SPOOL_DROPPED
+from logs import log
+
+class SpoolFullError(OSError):
+    """스풀이 SPOOL_MAX_BYTES 에 도달했고 정책이 stop 일 때 새 배치 기록을 거부합니다."""
+
+class WriteSpool:
+    """
+    DB 적재 대기 배치를 보관하는 로컬 write-ahead 버퍼입니다.
+    - 배치 1건 = NDJSON 1줄, 기록할 때마다 fsync 하여 프로세스가 죽어도 유실되지 않음
+    - 세그먼트 파일이 일정 크기를 넘으면 새 세그먼트로 교체 (seg-000000000001.ndjson ...)
+    - cursor.json 에 DB 반영이 끝난 위치(세그먼트, 오프셋)를 기록하고, 다 읽은 세그먼트는 삭제
+    - 대기 데이터가 SPOOL_MAX_BYTES 를 넘으면 SPOOL_FULL_POLICY 에 따라
+      가장 오래된 세그먼트를 버리거나(drop_oldest) 새 배치를 거부(stop, SpoolFullError)
+    """
+
+    SEGMENT_PREFIX = "seg-"
+    SEGMENT_SUFFIX = ".ndjson"
+
+    def __init__(self, directory: str = None, segment_bytes: int = None, max_bytes: int = None,
+                 full_policy: str = None):
+        self.directory = directory or Config.SPOOL_DIR
+        self.segment_bytes = segment_bytes or Config.SPOOL_SEGMENT_BYTES
+        self.max_bytes = Config.SPOOL_MAX_BYTES if max_bytes is None else max_bytes
+        self.full_policy = full_policy or Config.SPOOL_FULL_POLICY
+        self.cursor_path = os.path.join(self.directory, "cursor.json")
+        self._lock = threading.Lock()
+        # 새 배치가 들어오면 drainer 를 깨우기 위한 이벤트
+        self.has_data = threading.Event()
+
+        os.makedirs(self.directory, exist_ok=True)
+        segments = self._segments()
+        self._active_seq = segments[-1] if segments else 1
+        self._truncate_partial_tail(self._segment_path(self._active_seq))
+        self._active = open(self._segment_path(self._active_seq), 'ab')
+        if self.pending_bytes() > 0:
+            self.has_data.set()
+
+    def append(self, rows: list, batch_id: str = None) -> str:
+        """
+        배치를 스풀에 기록합니다. (fsync 완료 후 반환, DB 상태와 무관하게 즉시 끝남)
+        :param rows: _transform_data 로 변환된 행 리스트
+        :return: 배치 ID (DB 재적재 시 중복 방지 키)
+        :raises SpoolFullError: 스풀이 가득 찼고 정책이 stop 인 경우
+        """
+        batch_id = batch_id or uuid.uuid4().hex
+        line = json.dumps({"batch_id": batch_id, "rows": rows}, ensure_ascii=False).encode('utf-8') + b"\n"
+        with self._lock:
+            self._enforce_limit(len(line))
+            if self._active.tell() > 0 and self._active.tell() + len(line) > self.segment_bytes:
+                self._rotate()
+            self._active.write(line)
+            self._active.flush()
+            os.fsync(self._active.fileno())
+        self.has_data.set()
+        return batch_id
+
+    def read_pending(self, max_rows: int):
+        """
+        아직 DB에 반영되지 않은 배치를 기록 순서대로 읽습니다.
+        :param max_rows: 한 번에 읽을 최대 행 수 (최소 1개 배치는 반환)
+        :return: (배치 리스트, 읽기를 마친 위치) - 위치는 commit() 에 그대로 전달
+        """
+        seq, offset = self._load_cursor()
+        with self._lock:
+            active_seq = self._active_seq
+
+        batches = []
+        total_rows = 0
+        while seq <= active_seq:
+            path = self._segment_path(seq)
+            if not os.path.exists(path):
+                seq, offset = seq + 1, 0
+                continue
+
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                for line in f:
+                    # 기록 도중 끊긴 마지막 줄은 완성될 때까지 읽지 않음
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        batch = json.loads(line)
+                    except ValueError as e:
+                        print(f"[Spool Error] 손상된 배치를 건너뜁니다 ({os.path.basename(path)}@{offset}): {e}")
+                        offset += len(line)
+                        continue
+                    if batches and total_rows + len(batch["rows"]) > max_rows:
+                        return batches, (seq, offset)
+                    batches.append(batch)
+                    total_rows += len(batch["rows"])
+                    offset += len(line)
+
+            # 활성 세그먼트는 아직 기록 중이므로 다음 세그먼트로 넘어가지 않음
+            if seq == active_seq:
+                break
+            seq, offset = seq + 1, 0
+
+        return batches, (seq, offset)
+
+    def commit(self, position):
+        """DB 반영이 끝난 위치를 기록하고, 다 읽은 세그먼트 파일을 삭제합니다."""
+        with self._lock:
+            # 크기 제한으로 이미 더 앞의 세그먼트를 버린 경우 커서를 되돌리지 않음
+            if tuple(position) > self._load_cursor():
+                self._write_cursor(*position)
+            if self.pending_bytes() == 0:
+                self.has_data.clear()
+
+    def _write_cursor(self, seq: int, offset: int):
+        tmp_path = f"{self.cursor_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"segment": seq, "offset": offset}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.cursor_path)
+
+        for old_seq in self._segments():
+            if old_seq < seq:
+                os.remove(self._segment_path(old_seq))
+
+    def _enforce_limit(self, incoming: int):
+        """새 배치를 기록하면 SPOOL_MAX_BYTES 를 넘는 경우 정책대로 처리합니다. (self._lock 안에서 호출)"""
+        if not self.max_bytes:
+            return
+        while self.pending_bytes() + incoming > self.max_bytes:
+            if self.full_policy == "stop":
+                SPOOL_DROPPED.inc(incoming, policy="stop")
+                raise SpoolFullError(f"스풀이 가득 찼습니다 ({self.max_bytes} bytes)")
+            seq, offset = self._load_cursor()
+            if seq >= self._active_seq:
+                if self._active.tell() == 0:
+                    # 버릴 데이터가 없음 (배치 1건이 제한보다 큼) - 그대로 기록
+                    return
+                # 기록 중인 세그먼트만 남았으면 새 세그먼트로 넘긴 뒤 버림
+                self._rotate()
+            path = self._segment_path(seq)
+            dropped = os.path.getsize(path) - offset if os.path.exists(path) else 0
+            self._write_cursor(seq + 1, 0)
+            SPOOL_DROPPED.inc(dropped, policy="drop_oldest")
+            log("spool_dropped", f"[Spool] 최대 크기({self.max_bytes} bytes) 초과로 가장 오래된 세그먼트를 버립니다 "
+                f"({os.path.basename(path)}, {dropped} bytes)", level="warning", segment=seq, bytes=dropped)
+
+    def pending_bytes(self) -> int:
+        """DB 반영을 기다리는 데이터 크기(바이트)를 반환합니다."""
+        seq, offset = self._load_cursor()
+        total = 0
+        for s in self._segments():
+            if s >= seq:
+                size = os.path.getsize(self._segment_path(s))
+                total += size - offset if s == seq else size
+        return max(total, 0)
+
+    def close(self):
+        with self._lock:
+            self._active.close()
+
+    def _truncate_partial_tail(self, path: str):
+        """비정상 종료로 기록이 끊긴 마지막 줄을 잘라내어 이어쓰기 시 배치가 섞이지 않도록 합니다."""
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                keep = data.rfind(b"\n") + 1
+                f.truncate(keep)
+                print(f"[Spool] {os.path.basename(path)} 의 불완전한 마지막 배치({len(data) - keep} bytes)를 제거했습니다.")
+
+    def _rotate(self):
+        self._active.close()
+        self._active_seq += 1
+        self._active = open(self._segment_path(self._active_seq), 'ab')
+
+    def _segments(self) -> list:
+        seqs = []
+        for name in os.listdir(self.directory):
+            if name.startswith(self.SEGMENT_PREFIX) and name.endswith(self.SEGMENT_SUFFIX):
+                seqs.append(int(name[len(self.SEGMENT_PREFIX):-len(self.SEGMENT_SUFFIX)]))
+        return sorted(seqs)
+
+    def _segment_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{self.SEGMENT_PREFIX}{seq:012d}{self.SEGMENT_SUFFIX}")
+
+    def _load_cursor(self):
+        if not os.path.exists(self.cursor_path):
+            segments = self._segments()
+            return (segments[0] if segments else 1), 0
+        with open(self.cursor_path, 'r', encoding='utf-8') as f:
+            cursor = json.load(f)
+        return cursor["segment"], cursor["offset"]
+
+
+class SpoolDrainer(threading.Thread):
+    """
+    스풀에 쌓인 배치를 순서대로 DB에 반영하는 백그라운드 스레드입니다.
+    - 여러 배치를 묶어(최대 SPOOL_DRAIN_MAX_ROWS 행) 한 트랜잭션으로 적재하여 장애 후 실시간보다 빠르게 따라잡음
+    - DB 실패 시 지수 백오프(최대 SPOOL_RETRY_MAX 초)로 재시도, 수집 루프는 기다리지 않음
+    - 배치 ID 기준으로 중복 적재를 막으므로 재시작 후 재전송해도 안전 (DbClient.write_batches 참고)
+    """
+
+    def __init__(self, spool: WriteSpool, db, max_rows: int = None):
+        super().__init__(name="spool-drainer", daemon=True)
+        self.spool = spool
+        self.db = db
+        self.max_rows = max_rows or Config.SPOOL_DRAIN_MAX_ROWS
+        self._stop_event = threading.Event()
+
+    def run(self):
+        backoff = 1.0
+        while not self._stop_event.is_set():
+            # 이벤트를 놓친 경우에 대비해 타임아웃마다 남은 데이터도 확인
+            if not self.spool.has_data.wait(timeout=1.0) and self.spool.pending_bytes() == 0:
+                continue
+
+            batches, position = self.spool.read_pending(self.max_rows)
+            if not batches:
+                # 기록 중인 줄만 남은 경우 - 잠시 후 다시 확인
+                self.spool.commit(position)
+                self._stop_event.wait(0.1)
+                continue
+
+            try:
+                inserted = self.db.write_batches(batches)
+            except Exception as e:
+                pending_mb = self.spool.pending_bytes() / (1024 * 1024)
+                print(f"[Spool] DB 적재 실패, {backoff:.0f}초 후 재시도 (대기 {pending_mb:.1f}MB): {e}")
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, Config.SPOOL_RETRY_MAX)
+                continue
+
+            self.spool.commit(position)
+            backoff = 1.0
+            print(f"[Spool] {len(batches)}개 배치, {inserted} records 적재 완료")
+
+    def stop(self, timeout: float = 5.0):
+        self._stop_event.set()
+        self.join(timeout)
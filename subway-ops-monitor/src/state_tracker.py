@@ -0,0 +1,107 @@
+import json
+import os
+import time
+from config import Config
+
+class TrainStateTracker:
+    """
+    (line_id, train_number) 별 마지막 상태를 메모리에 유지하고,
+    역(station_id)/상태(train_status)/수신시간(recptnDt)이 바뀐 열차만 골라냅니다.
+    상태표는 체크포인트 파일로 저장하여 재시작 시 전체 스냅샷이 다시 적재되지 않도록 합니다.
+    """
+
+    def __init__(self, checkpoint_path: str = None, ttl: int = None):
+        self.checkpoint_path = checkpoint_path or Config.STATE_CHECKPOINT_PATH
+        # 이 시간(초) 동안 관측되지 않은 열차는 운행 종료로 보고 상태표에서 제거
+        self.ttl = Config.STATE_TTL if ttl is None else ttl
+        # key: (subwayId, trainNo) -> value: (statnId, trainSttus, recptnDt, last_seen)
+        self._states = {}
+        self._dirty = False
+        self.load()
+
+    def filter_changed(self, positions: list, commit: bool = True) -> list:
+        """
+        API 원본 위치 리스트 중 직전 관측 대비 상태가 바뀐 항목만 반환합니다.
+        :param positions: API 원본 데이터 리스트
+        :param commit: False 면 바뀐 상태를 상태표에 반영하지 않음 (적재 성공 후 commit() 으로 반영)
+        :return: 상태 전이가 발생한 항목 리스트
+        """
+        now = time.time()
+        changed = []
+        seen = {}
+        for pos in positions:
+            key = (pos.get('subwayId'), pos.get('trainNo'))
+            state = (pos.get('statnId'), pos.get('trainSttus'), pos.get('recptnDt'))
+            prev = seen.get(key) or self._states.get(key)
+            if prev is None or prev[:3] != state:
+                changed.append(pos)
+                seen[key] = state
+            elif key not in seen:
+                # 상태가 그대로인 열차는 마지막 관측 시각만 갱신
+                self._states[key] = (*state, now)
+        if commit:
+            self.commit(changed)
+        return changed
+
+    def commit(self, positions: list):
+        """적재(또는 스풀 기록)에 성공한 항목의 상태를 상태표에 반영합니다."""
+        now = time.time()
+        for pos in positions:
+            key = (pos.get('subwayId'), pos.get('trainNo'))
+            self._states[key] = (pos.get('statnId'), pos.get('trainSttus'), pos.get('recptnDt'), now)
+        if positions:
+            self._dirty = True
+
+    def forget(self, line_ids):
+        """
+        지정한 호선의 열차 상태를 지웁니다. (다른 인스턴스에서 넘겨받은 호선의 첫 관측이 오래된 상태에 묻히지 않도록)
+        :param line_ids: subwayId 목록
+        """
+        line_ids = set(line_ids)
+        stale = [key for key in self._states if key[0] in line_ids]
+        for key in stale:
+            del self._states[key]
+        if stale:
+            self._dirty = True
+        return len(stale)
+
+    def evict_stale(self):
+        """TTL 동안 관측되지 않은 열차를 상태표에서 제거합니다."""
+        cutoff = time.time() - self.ttl
+        stale = [key for key, value in self._states.items() if value[3] < cutoff]
+        for key in stale:
+            del self._states[key]
+        if stale:
+            self._dirty = True
+        return len(stale)
+
+    def save(self):
+        """상태표를 체크포인트 파일에 저장합니다. (임시 파일 기록 후 교체하여 원자적으로 저장)"""
+        if not self._dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.checkpoint_path), exist_ok=True)
+            tmp_path = f"{self.checkpoint_path}.tmp"
+            rows = [[*key, *value] for key, value in self._states.items()]
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(rows, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.checkpoint_path)
+            self._dirty = False
+        except OSError as e:
+            print(f"[State Error] 체크포인트 저장 실패: {e}")
+
+    def load(self):
+        """체크포인트 파일이 있으면 상태표를 복원합니다."""
+        if not os.path.exists(self.checkpoint_path):
+            return
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                rows = json.load(f)
+            self._states = {(row[0], row[1]): tuple(row[2:6]) for row in rows}
+            self.evict_stale()
+            print(f"[State] 체크포인트 복원: {len(self._states)}개 열차")
+        except (OSError, ValueError, IndexError) as e:
+            print(f"[State Error] 체크포인트 로드 실패, 빈 상태로 시작합니다: {e}")
+            self._states = {}
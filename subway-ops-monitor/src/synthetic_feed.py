@@ -0,0 +1,303 @@
+import math
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta, timezone
+from config import Config
+
+KST = timezone(timedelta(hours=9))
+
+# 호선별 역 수 (실제 노선 규모 근사, 지선/순환 구조는 단순화하여 왕복 운행으로 모델링)
+STATION_COUNTS = {
+    "1001": 98, "1002": 51, "1003": 44, "1004": 51, "1005": 56, "1006": 39,
+    "1007": 53, "1008": 18, "1009": 38, "1063": 57, "1065": 14, "1067": 24,
+    "1075": 63, "1077": 16, "1092": 13, "1032": 5,
+}
+# 급행 열차를 운행하는 호선
+EXPRESS_LINES = ("1001", "1009", "1063", "1075")
+
+# 운행 모델 (초) - 역간 주행, 역 정차, 종착역 회차 대기, 기본 배차 간격
+RUN_SEC = (70, 150)
+DWELL_SEC = (20, 45)
+TURNAROUND_SEC = 300
+HEADWAY_SEC = 300
+# 급행: 주행 시간 비율, 정차역 간격(양 끝 종착역은 항상 정차), 일반 열차 대비 편성 비율
+EXPRESS_RUN_RATIO = 0.85
+EXPRESS_STOP_EVERY = 3
+EXPRESS_SHARE = 0.3
+# 역 출발 후 '출발(2)' 상태로 보고되는 주행 구간 비율 (나머지는 다음 역 '진입(0)')
+DEPART_SHARE = 0.3
+# 열차별 운행 지연/회복 (초, 주기 초) - 배차 간격이 시간에 따라 흔들리도록 함
+DRIFT_SEC = 60
+DRIFT_PERIOD_SEC = (1800, 5400)
+
+STATUS_ENTER, STATUS_ARRIVE, STATUS_DEPART = 0, 1, 2
+DIRECTION_UP, DIRECTION_DOWN = 0, 1
+
+class _Service:
+    """한 호선의 한 운행 패턴(일반/급행)에 속한 열차 묶음입니다. (열차별 위치는 시각의 함수)"""
+
+    def __init__(self, line_index: int, n_stations: int, run: np.ndarray, dwell: np.ndarray,
+                 express: bool, scale: float, headway_sec: float, rng: np.random.Generator, number_base: int):
+        self.line_index = line_index
+        self.n_stations = n_stations
+        self.express = express
+        # 진행 방향 기준 k 번째 역 도착/출발 시각 (운행 시작 기준 초)
+        stops = np.ones(n_stations, dtype=bool)
+        if express:
+            stops = (np.arange(n_stations) % EXPRESS_STOP_EVERY == 0)
+            stops[-1] = True
+            run = run * EXPRESS_RUN_RATIO
+        dwell = np.where(stops, dwell, 0.0)
+        dwell[0] = dwell[-1] = 0.0                      # 종착역 정차는 회차 대기로 처리
+        self.run = np.append(run, 0.0)
+        self.arrive = np.concatenate([[0.0], np.cumsum(dwell[:-1] + run)])
+        self.depart = self.arrive + dwell
+        self.leg = self.arrive[-1] + TURNAROUND_SEC
+        self.depart[-1] = self.leg
+        self.cycle = 2 * self.leg
+
+        n_local = max(1, round(self.cycle * scale / headway_sec))
+        n_trains = max(1, round(n_local * EXPRESS_SHARE)) if express else n_local
+        spacing = self.cycle / n_trains
+        self.offsets = np.arange(n_trains) * spacing + rng.uniform(-0.15, 0.15, n_trains) * spacing
+        self.drift_period = rng.uniform(*DRIFT_PERIOD_SEC, n_trains)
+        self.drift_phase = rng.uniform(0, 2 * math.pi, n_trains)
+        self.numbers = number_base + 2 * np.arange(n_trains)
+        # 절반의 열차는 회차 시 열차번호가 바뀜 (하행 짝수 → 상행 홀수)
+        self.renumbered = np.arange(n_trains) % 2 == 0
+        # 보고 지연 (recptnDt 가 수집 시각보다 늦는 정도, 초)
+        self.lag = np.arange(n_trains) * 7 % 20
+
+    @property
+    def n_trains(self) -> int:
+        return len(self.offsets)
+
+    def state(self, t: np.ndarray) -> dict:
+        """
+        시각 배열 t (기준 시각 이후 초) 에 대한 열차별 상태를 계산합니다.
+        :return: 시각 × 열차 순서로 펼친 배열 dict (역 위치는 호선 내 역 순번)
+        """
+        t = np.asarray(t, dtype=float)[:, None]
+        drift = DRIFT_SEC * np.sin(2 * math.pi * t / self.drift_period + self.drift_phase)
+        phase = np.mod(t + self.offsets + drift, self.cycle)
+        up = phase >= self.leg
+        p = phase - up * self.leg
+
+        k = np.searchsorted(self.arrive, p, side='right') - 1
+        dwelling = p < self.depart[k]
+        departing = ~dwelling & (p < self.depart[k] + self.run[k] * DEPART_SHARE)
+        status = np.where(dwelling, STATUS_ARRIVE, np.where(departing, STATUS_DEPART, STATUS_ENTER))
+        position = np.where(dwelling | departing, k, k + 1)
+
+        last = self.n_stations - 1
+        n = t.shape[0]
+        trains = np.broadcast_to(np.arange(self.n_trains), (n, self.n_trains))
+        numbers = self.numbers + (self.renumbered & up)
+        return {
+            'train': trains.ravel(),
+            'station': np.where(up, last - position, position).ravel(),
+            'dest': np.where(up, 0, last).ravel(),
+            'direction': np.where(up, DIRECTION_UP, DIRECTION_DOWN).ravel(),
+            'status': status.ravel(),
+            'number': numbers.ravel(),
+            'lag': np.broadcast_to(self.lag, (n, self.n_trains)).ravel(),
+        }
+
+class SyntheticNetwork:
+    """
+    실시간 열차 위치 API(realtimePositionList)를 흉내 내는 결정적 가상 노선망입니다.
+    열차는 역 사이를 주행하며 진입/도착/출발 상태를 보고하고, 종착역에서 회차하며,
+    급행 열차는 일부 역만 정차합니다. 같은 seed/시각이면 항상 같은 결과를 반환합니다.
+    """
+
+    def __init__(self, lines: list = None, scale: float = 1.0, seed: int = 42,
+                 start: datetime = None, headway_sec: float = HEADWAY_SEC):
+        """
+        :param lines: 호선 ID 목록 (기본: 레지스트리 전체)
+        :param scale: 열차 수 배율 (2.0 이면 배차 간격이 절반)
+        :param start: 기준 시각 (기본: 2026-01-05 05:30 한국시간)
+        """
+        self.lines = list(lines or Config.LINE_REGISTRY)
+        unknown = [line_id for line_id in self.lines if line_id not in Config.LINE_REGISTRY]
+        if unknown:
+            raise ValueError(f"등록되지 않은 호선 ID입니다: {', '.join(unknown)}")
+        self.start = start or datetime(2026, 1, 5, 5, 30, tzinfo=KST)
+        rng = np.random.default_rng(seed)
+
+        self.station_codes, self.station_names, self.station_line = [], [], []
+        self._first_station = []
+        self.services = []
+        for line_index, line_id in enumerate(self.lines):
+            line_name = Config.LINE_REGISTRY[line_id]
+            n_stations = STATION_COUNTS.get(line_id, 30)
+            self._first_station.append(len(self.station_codes))
+            for k in range(n_stations):
+                # 실제 statnId 형식 (예: 1002000201)
+                self.station_codes.append(f"{line_id}000{101 + k}")
+                self.station_names.append(f"{line_name} {k + 1:02d}역")
+                self.station_line.append(line_index)
+            run = rng.uniform(*RUN_SEC, n_stations - 1)
+            dwell = rng.uniform(*DWELL_SEC, n_stations)
+            patterns = (False, True) if line_id in EXPRESS_LINES else (False,)
+            for express in patterns:
+                base = 5000 if express else 1000
+                self.services.append(_Service(line_index, n_stations, run, dwell, express,
+                                              scale, headway_sec, rng, base))
+        self._first_station = np.array(self._first_station)
+
+    @property
+    def trains_per_snapshot(self) -> int:
+        return sum(s.n_trains for s in self.services)
+
+    def _seconds(self, when: datetime) -> float:
+        return (when - self.start).total_seconds()
+
+    # ------------------------------------------------------------------ API 형식
+    def positions(self, when: datetime, line_id: str = None) -> list:
+        """when 시각의 열차 위치 목록 (API realtimePositionList 와 같은 형식, 값은 문자열)"""
+        when = when if when.tzinfo else when.replace(tzinfo=KST)
+        t = np.array([self._seconds(when)])
+        positions = []
+        for service in self.services:
+            line = self.lines[service.line_index]
+            if line_id is not None and line != line_id:
+                continue
+            line_name = Config.LINE_REGISTRY[line]
+            first = self._first_station[service.line_index]
+            s = service.state(t)
+            for i in range(len(s['train'])):
+                station = first + s['station'][i]
+                dest = first + s['dest'][i]
+                received = (when - timedelta(seconds=int(s['lag'][i]))).astimezone(KST)
+                positions.append({
+                    "subwayId": line,
+                    "subwayNm": line_name,
+                    "statnId": self.station_codes[station],
+                    "statnNm": self.station_names[station],
+                    "trainNo": str(s['number'][i]),
+                    "lastRecptnDt": received.strftime("%Y%m%d"),
+                    "recptnDt": received.strftime("%Y-%m-%d %H:%M:%S"),
+                    "updnLine": str(s['direction'][i]),
+                    "statnTid": self.station_codes[dest],
+                    "statnTnm": self.station_names[dest],
+                    "trainSttus": str(s['status'][i]),
+                    "directAt": "1" if service.express else "0",
+                    # 자정 이후 각 패턴의 마지막 편성을 막차로 표시
+                    "lstcarAt": "1" if received.hour < 1 and s['train'][i] == service.n_trains - 1 else "0",
+                })
+        return positions
+
+    def payload(self, line_id: str, when: datetime, start: int = 0, end: int = None) -> dict:
+        """API 응답 본문 (start~end 인덱스 구간, errorMessage.total 에 전체 건수)"""
+        rows = self.positions(when, line_id)
+        end = len(rows) - 1 if end is None else end
+        return {
+            "errorMessage": {
+                "status": 200, "code": "INFO-000", "message": "정상 처리되었습니다.",
+                "link": "", "developerMessage": "", "total": len(rows),
+            },
+            "realtimePositionList": rows[start:end + 1],
+        }
+
+    def snapshot_times(self, count: int, interval: float = None):
+        interval = interval or Config.BATCH_INTERVAL
+        return [self.start + timedelta(seconds=i * interval) for i in range(count)]
+
+    def iter_snapshots(self, rows: int, interval: float = None):
+        """
+        수집 주기마다 전체 노선망 스냅샷을 (시각, 위치 목록) 으로 내보냅니다. 총 rows 행에서 멈춥니다.
+        """
+        interval = interval or Config.BATCH_INTERVAL
+        emitted, i = 0, 0
+        while emitted < rows:
+            when = self.start + timedelta(seconds=i * interval)
+            positions = self.positions(when)[:rows - emitted]
+            emitted += len(positions)
+            i += 1
+            yield when, positions
+
+    # ------------------------------------------------------------------ 분석용 DataFrame
+    def frame(self, rows: int, interval: float = None) -> pd.DataFrame:
+        """
+        subway_time 뷰를 조회해 typed_frame 으로 만든 것과 같은 스키마의 DataFrame 을 벡터 연산으로 만듭니다.
+        (수천만 행 분석 벤치마크용, 행 dict 를 거치지 않음)
+        """
+        interval = interval or Config.BATCH_INTERVAL
+        per_snapshot = self.trains_per_snapshot
+        snapshots = max(1, math.ceil(rows / per_snapshot))
+        t = np.arange(snapshots) * float(interval)
+
+        parts = {key: [] for key in ('snap', 'line', 'station', 'dest', 'direction', 'status',
+                                     'number', 'lag', 'express', 'last')}
+        for service in self.services:
+            s = service.state(t)
+            n = len(s['train'])
+            first = self._first_station[service.line_index]
+            parts['snap'].append(np.repeat(np.arange(snapshots), service.n_trains))
+            parts['line'].append(np.full(n, service.line_index))
+            parts['station'].append(first + s['station'])
+            parts['dest'].append(first + s['dest'])
+            parts['direction'].append(s['direction'])
+            parts['status'].append(s['status'])
+            parts['number'].append(s['number'])
+            parts['lag'].append(s['lag'])
+            parts['express'].append(np.full(n, int(service.express)))
+            parts['last'].append(s['train'] == service.n_trains - 1)
+        cols = {key: np.concatenate(values) for key, values in parts.items()}
+        order = np.argsort(cols['snap'], kind='stable')[:rows]
+        cols = {key: values[order] for key, values in cols.items()}
+
+        created = pd.Timestamp(self.start).tz_convert('UTC') + pd.to_timedelta(cols['snap'] * interval, unit='s')
+        received = (created - pd.to_timedelta(cols['lag'], unit='s')).tz_convert('Asia/Seoul').tz_localize(None)
+        line_ids = np.array(self.lines)
+        line_names = np.array([Config.LINE_REGISTRY[line] for line in self.lines])
+        station_codes = np.array(self.station_codes)
+        station_names = np.array(self.station_names)
+        numbers, number_codes = np.unique(cols['number'], return_inverse=True)
+        days, day_codes = np.unique(received.normalize().values, return_inverse=True)
+
+        station_dtype = pd.CategoricalDtype(sorted(self.station_codes))
+        name_dtype = pd.CategoricalDtype(sorted(self.station_names))
+        return pd.DataFrame({
+            'id': np.arange(1, len(order) + 1, dtype=np.int32 if len(order) < 2 ** 31 else np.int64),
+            'line_id': _categorical(cols['line'], line_ids),
+            'line_name': _categorical(cols['line'], line_names),
+            'station_id': _categorical(cols['station'], station_codes, station_dtype),
+            'station_name': _categorical(cols['station'], station_names, name_dtype),
+            'train_number': _categorical(number_codes, numbers.astype(str)),
+            'last_rec_date': _categorical(day_codes, pd.DatetimeIndex(days).strftime('%Y-%m-%d').to_numpy()),
+            'last_rec_time': received,
+            'direction_type': cols['direction'].astype(np.int8),
+            'dest_station_id': _categorical(cols['dest'], station_codes, station_dtype),
+            'dest_station_name': _categorical(cols['dest'], station_names, name_dtype),
+            'train_status': cols['status'].astype(np.int8),
+            'is_express': cols['express'].astype(np.int8),
+            'is_last_train': cols['last'] & (received.hour < 1),
+            'created_at': created,
+        })
+
+def _categorical(codes: np.ndarray, labels: np.ndarray, dtype: pd.CategoricalDtype = None) -> pd.Categorical:
+    """정수 코드 → labels 값의 category (frames.typed_frame 처럼 정렬된 category 목록 사용)"""
+    dtype = dtype or pd.CategoricalDtype(sorted(set(labels[np.unique(codes)])))
+    mapping = dtype.categories.get_indexer(labels)
+    return pd.Categorical.from_codes(mapping[codes], dtype=dtype)
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="가상 노선망의 API 형식 열차 위치 스냅샷 출력")
+    parser.add_argument("--line", help="호선 ID (기본: 전체)")
+    parser.add_argument("--at", help="시각 (YYYY-MM-DD HH:MM:SS, 한국시간)")
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    network = SyntheticNetwork(scale=args.scale, seed=args.seed)
+    when = datetime.strptime(args.at, "%Y-%m-%d %H:%M:%S").replace(tzinfo=KST) if args.at else network.start
+    if args.line:
+        print(json.dumps(network.payload(args.line, when), ensure_ascii=False, indent=2))
+    else:
+        positions = network.positions(when)
+        print(json.dumps(positions[:5], ensure_ascii=False, indent=2))
+        print(f"... {len(positions)} trains on {len(network.lines)} lines")
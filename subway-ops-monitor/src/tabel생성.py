@@ -1,11 +1,12 @@
 import psycopg2
 from config import Config
+from db_client import DbClient
 from urllib.parse import urlparse
 import sys
 
 def create_subway_table():
     """
-    Supabase DB에 realtime_subway_positions 테이블을 생성합니다.
+    Supabase DB에 열차 위치 스키마(lines/stations, subway_positions, subway_time 뷰)를 생성합니다.
     """
     conn = None
     cur = None
@@ -30,43 +31,13 @@ def create_subway_table():
         
         print("⏳ 데이터베이스에 연결 중... (응답이 없으면 엔터를 쳐보세요)")
         conn = psycopg2.connect(dsn, connect_timeout=10)
-        cur = conn.cursor()
         
-        # 3. 테이블 생성 쿼리 (AGENT.md 및 docs/schema.sql 참고)
-        # - direction_type, is_express: 데이터 타입 정합성을 위해 INTEGER 사용
-        # - is_last_train: BOOLEAN 사용
-        create_query = """
-        CREATE TABLE IF NOT EXISTS realtime_subway_positions (
-            id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
-            
-            -- API 원본 데이터 매핑
-            line_id VARCHAR(50),          -- subwayId
-            line_name VARCHAR(50),        -- subwayNm
-            station_id VARCHAR(50),       -- statnId
-            station_name VARCHAR(100),    -- statnNm
-            train_number VARCHAR(50),     -- trainNo
-            last_rec_date VARCHAR(20),    -- lastRecptnDt
-            last_rec_time VARCHAR(20),    -- recptnDt
-            direction_type INTEGER,       -- updnLine (0/1)
-            dest_station_id VARCHAR(50),  -- statnTid
-            dest_station_name VARCHAR(100),-- statnTnm
-            train_status VARCHAR(50),     -- trainSttus
-            is_express INTEGER,           -- directAt (0/1/7)
-            is_last_train BOOLEAN,        -- lstcarAt (0/1 -> T/F)
-            
-            created_at TIMESTAMPTZ DEFAULT NOW()
-        );
-        
-        -- 인덱스 생성 (조회 성능 최적화)
-        CREATE INDEX IF NOT EXISTS idx_subway_positions_created_at ON realtime_subway_positions(created_at);
-        CREATE INDEX IF NOT EXISTS idx_subway_positions_line_id ON realtime_subway_positions(line_id);
-        """
-        
-        # 4. 쿼리 실행
-        cur.execute(create_query)
-        conn.commit()
-        
-        print("✅ 테이블 'realtime_subway_positions' 생성이 완료되었습니다.")
+        # 연결 확인용 커넥션은 닫고, 스키마 생성은 DbClient 에 맡김
+        conn.close()
+        conn = None
+
+        # 3. 테이블 생성 (docs/schema.sql 하나만 정식 DDL 로 사용 - init_db.py / DbClient.initialize_table 과 동일)
+        DbClient().initialize_table()
         
     except psycopg2.OperationalError as e:
         print(f"\n❌ 데이터베이스 연결 오류: {e}")
@@ -0,0 +1,460 @@
+import json
+import os
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+from config import Config
+from trips import reconstruct_visits
+
+TOPOLOGY_COLUMNS = ['line_name', 'direction_type', 'station_id', 'station_name',
+                    'ordinal', 'branch', 'junction_ordinal', 'is_loop']
+# 관측 궤적의 역간 이동 횟수 (시드에 없는 호선/방향의 순서 계산 근거, 캐시에 누적)
+EDGE_COLUMNS = ['line_name', 'direction_type', 'station_id', 'next_station_id',
+                'station_name', 'next_station_name', 'count']
+
+class StationTopology:
+    """
+    호선/방향별 역 순서 색인입니다.
+    - ordinal: 진행 방향 기준 역 순번 (값이 클수록 진행 방향 앞쪽)
+    - branch: 0 = 본선, 1 이상 = 지선 (2호선 성수/신정지선, 5호선 마천지선 등)
+    - junction_ordinal: 지선이 본선과 만나는 분기역의 본선 순번
+    - is_loop: 순환선 여부 (2호선 본선) - 순번 차이를 순환 길이로 보정
+    관측된 열차 궤적(역 → 다음 역 이동)으로 만들거나 시드 파일에서 읽어 오며, CSV 로 저장해 재사용합니다.
+    """
+
+    def __init__(self, table: pd.DataFrame = None):
+        self.table = table if table is not None else pd.DataFrame(columns=TOPOLOGY_COLUMNS)
+        self._build_index()
+
+    # ------------------------------------------------------------------ 생성 / 저장
+    @classmethod
+    def from_observations(cls, df: pd.DataFrame, min_count: int = 2):
+        """
+        관측 데이터의 역간 이동(방문 → 다음 방문)을 간선으로 하는 그래프에서 역 순서를 구합니다.
+        :param min_count: 잡음 제거를 위해 이보다 적게 관측된 이동은 무시
+        """
+        return cls.from_edges(observed_edges(df), min_count)
+
+    @classmethod
+    def from_edges(cls, edges: pd.DataFrame, min_count: int = 2):
+        """observed_edges 형식의 (누적) 이동 횟수로 역 순서를 구합니다."""
+        names = dict(zip(edges['station_id'], edges['station_name']))
+        names.update(zip(edges['next_station_id'], edges['next_station_name']))
+        edges = edges[(edges['count'] >= min_count) & (edges['station_id'] != edges['next_station_id'])]
+
+        tables = []
+        for (line, direction), g in edges.groupby(['line_name', 'direction_type'], observed=True, sort=False):
+            weights = {(a, b): c for a, b, c in zip(g['station_id'], g['next_station_id'], g['count'])}
+            rows = _order_stations(weights)
+            if not rows:
+                continue
+            part = pd.DataFrame(rows, columns=['station_id', 'ordinal', 'branch', 'junction_ordinal', 'is_loop'])
+            part.insert(0, 'direction_type', direction)
+            part.insert(0, 'line_name', line)
+            part['station_name'] = part['station_id'].map(names)
+            tables.append(part[TOPOLOGY_COLUMNS])
+
+        table = pd.concat(tables, ignore_index=True) if tables else None
+        return cls(table)
+
+    @classmethod
+    def load(cls, path: str):
+        """CSV 파일(시드 또는 캐시)에서 색인을 읽습니다."""
+        table = pd.read_csv(path, dtype={'line_name': str, 'direction_type': str,
+                                         'station_id': str, 'station_name': str})
+        return cls(table[TOPOLOGY_COLUMNS])
+
+    def save(self, path: str = None):
+        """색인을 CSV 로 저장합니다."""
+        path = path or Config.TOPOLOGY_CACHE_PATH
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.table.to_csv(path, index=False, encoding='utf-8')
+
+    def merge(self, other: "StationTopology"):
+        """다른 색인의 호선/방향 중 이 색인에 없는 것을 추가합니다. (시드 파일이 없는 호선을 관측값으로 보완)"""
+        if other.table.empty:
+            return self
+        known = pd.MultiIndex.from_frame(self.table[['line_name', 'direction_type']].astype(str))
+        keys = pd.MultiIndex.from_frame(other.table[['line_name', 'direction_type']].astype(str))
+        extra = other.table[~keys.isin(known)]
+        return StationTopology(pd.concat([self.table, extra], ignore_index=True))
+
+    def replace(self, other: "StationTopology"):
+        """다른 색인에 있는 호선/방향을 그 색인의 순서로 바꿉니다. (관측이 늘어 다시 만든 호선/방향 반영)"""
+        if other.table.empty:
+            return self
+        if self.table.empty:
+            return other
+        keys = pd.MultiIndex.from_frame(self.table[['line_name', 'direction_type']].astype(str))
+        rebuilt = pd.MultiIndex.from_frame(other.table[['line_name', 'direction_type']].astype(str))
+        kept = self.table[~keys.isin(rebuilt)]
+        return StationTopology(pd.concat([kept, other.table], ignore_index=True))
+
+    def keys(self) -> set:
+        """색인에 있는 (호선, 방향) 목록"""
+        return set(zip(self.table['line_name'].astype(str), self.table['direction_type'].astype(str)))
+
+    # ------------------------------------------------------------------ 조회
+    def _build_index(self):
+        """(호선, 방향, 역 ID) → 행 번호 색인과 numpy 배열을 만들어 조회를 O(1) 로 처리합니다."""
+        self.table = self.table.drop_duplicates(['line_name', 'direction_type', 'station_id']).reset_index(drop=True)
+        t = self.table
+        self._index = pd.MultiIndex.from_arrays(
+            [t['line_name'].astype(str), t['direction_type'].astype(str), t['station_id'].astype(str)])
+        self._position = {key: i for i, key in enumerate(self._index)}
+        self._ordinal = t['ordinal'].to_numpy(dtype=float)
+        self._branch = t['branch'].to_numpy(dtype=float)
+        self._junction = t['junction_ordinal'].to_numpy(dtype=float)
+        loops = t[t['is_loop'].astype(bool) & (t['branch'] == 0)]
+        self._loop_length = loops.groupby(['line_name', 'direction_type'])['ordinal'].max().add(1).to_dict()
+
+    def __len__(self):
+        return len(self.table)
+
+    def positions(self, df: pd.DataFrame) -> np.ndarray:
+        """DataFrame 각 행의 색인 위치를 반환합니다. (없는 역은 -1)"""
+        if not len(self.table) or df.empty:
+            return np.full(len(df), -1, dtype=np.int64)
+        # 고유한 (호선, 방향, 역) 조합만 색인에서 찾은 뒤 행으로 펼침
+        codes, uniques = zip(*(pd.factorize(df[c]) for c in ('line_name', 'direction_type', 'station_id')))
+        combined = (codes[0].astype(np.int64) * len(uniques[1]) + codes[1]) * len(uniques[2]) + codes[2]
+        inverse, combos = pd.factorize(combined)
+        parts = np.divmod(combos, len(uniques[2]))
+        line_code, direction_code = np.divmod(parts[0], len(uniques[1]))
+        keys = pd.MultiIndex.from_arrays([
+            pd.Index(uniques[0]).take(line_code).astype(str),
+            pd.Index(uniques[1]).take(direction_code).astype(str),
+            pd.Index(uniques[2]).take(parts[1]).astype(str),
+        ])
+        return self._index.get_indexer(keys)[inverse].astype(np.int64)
+
+    def ordinals(self, df: pd.DataFrame) -> pd.Series:
+        """각 행의 진행 방향 역 순번을 반환합니다. (색인에 없는 역은 NaN)"""
+        pos = self.positions(df)
+        values = np.where(pos >= 0, self._ordinal[pos], np.nan)
+        return pd.Series(values, index=df.index)
+
+    def distance(self, line_name: str, direction_type: str, from_station: str, to_station: str) -> float:
+        """
+        두 역 사이의 역 수를 반환합니다. (진행 방향 기준, to 가 앞이면 양수)
+        서로 다른 선로(본선/지선) 사이는 분기역을 거치는 역 수(부호 없음)로 계산하고, 순환선은 순환 길이로 보정합니다.
+        """
+        direction_type = str(direction_type)
+        a = self._position.get((line_name, direction_type, str(from_station)))
+        b = self._position.get((line_name, direction_type, str(to_station)))
+        if a is None or b is None:
+            return np.nan
+
+        if self._branch[a] == self._branch[b]:
+            diff = self._ordinal[b] - self._ordinal[a]
+        else:
+            # 서로 다른 선로: 각 역 → 분기역 거리 + 분기역 간 거리 (부호 없음)
+            ja = self._ordinal[a] if self._branch[a] == 0 else self._junction[a]
+            jb = self._ordinal[b] if self._branch[b] == 0 else self._junction[b]
+            return abs(jb - ja) + abs(self._ordinal[a] - ja) + abs(self._ordinal[b] - jb)
+
+        loop = self._loop_length.get((line_name, direction_type))
+        if loop and self._branch[a] == 0 and self._branch[b] == 0:
+            diff = (diff + loop / 2) % loop - loop / 2
+        return diff
+
+
+def _order_stations(weights: dict) -> list:
+    """
+    한 호선/방향의 이동 그래프에서 역 순번을 계산합니다.
+    1) 순환(2호선 본선 등)이 있으면 관측 횟수가 가장 적은 간선을 끊어 DAG 로 만듦
+    2) 가장 긴 경로를 본선(branch 0)으로 보고 0부터 순번 부여
+    3) 남은 역은 다시 가장 긴 경로를 찾아 지선으로 붙이고, 분기역 순번을 기준으로 순번 부여
+    :return: [(station_id, ordinal, branch, junction_ordinal, is_loop), ...]
+    """
+    weights = dict(weights)
+    removed = []
+    while True:
+        cycle = _find_cycle(weights)
+        if cycle is None:
+            break
+        weakest = min(cycle, key=lambda e: weights[e])
+        removed.append(weakest)
+        del weights[weakest]
+
+    successors = defaultdict(list)
+    predecessors = defaultdict(list)
+    nodes = set()
+    for a, b in weights:
+        successors[a].append(b)
+        predecessors[b].append(a)
+        nodes.update((a, b))
+
+    main = _longest_path(nodes, successors, predecessors)
+    # 끊어낸 간선이 본선의 끝 → 시작을 잇는다면 순환선
+    is_loop = bool(main) and any(a == main[-1] and b == main[0] for a, b in removed)
+    rows = [(station, i, 0, np.nan, is_loop) for i, station in enumerate(main)]
+    ordinal = {station: i for i, station in enumerate(main)}
+
+    branch = 0
+    remaining = nodes - set(main)
+    while remaining:
+        path = _longest_path(remaining, successors, predecessors)
+        branch += 1
+        # 분기: 지선 첫 역의 선행 역이 이미 순번을 가진 경우 (본선 → 지선 방향)
+        head = next((p for p in predecessors[path[0]] if p in ordinal), None)
+        tail = next((s for s in successors[path[-1]] if s in ordinal), None)
+        if head is not None:
+            junction = ordinal[head]
+            values = [junction + i + 1 for i in range(len(path))]
+        elif tail is not None:
+            # 합류: 지선 → 본선 방향
+            junction = ordinal[tail]
+            values = [junction - (len(path) - i) for i in range(len(path))]
+        else:
+            # 본선과 연결되지 않은 구간 - 별도 선로로 0부터 부여
+            junction = np.nan
+            values = list(range(len(path)))
+        for station, value in zip(path, values):
+            rows.append((station, value, branch, junction, False))
+            ordinal[station] = value
+        remaining -= set(path)
+    return rows
+
+def _find_cycle(weights: dict):
+    """그래프에서 순환 하나를 찾아 간선 리스트로 반환합니다. (없으면 None)"""
+    successors = defaultdict(list)
+    for a, b in weights:
+        successors[a].append(b)
+
+    state = {}
+    for start in list(successors):
+        if start in state:
+            continue
+        stack = [(start, iter(successors[start]))]
+        path = [start]
+        state[start] = 1
+        while stack:
+            node, it = stack[-1]
+            nxt = next(it, None)
+            if nxt is None:
+                state[node] = 2
+                stack.pop()
+                path.pop()
+            elif state.get(nxt) == 1:
+                cycle_nodes = path[path.index(nxt):] + [nxt]
+                return list(zip(cycle_nodes[:-1], cycle_nodes[1:]))
+            elif nxt not in state:
+                state[nxt] = 1
+                stack.append((nxt, iter(successors[nxt])))
+                path.append(nxt)
+    return None
+
+def _longest_path(nodes: set, successors: dict, predecessors: dict) -> list:
+    """DAG 에서 nodes 만 사용하는 가장 긴 경로를 반환합니다. (위상 정렬 + DP)"""
+    indegree = {n: sum(1 for p in predecessors[n] if p in nodes) for n in nodes}
+    queue = sorted(n for n, d in indegree.items() if d == 0)
+    order = []
+    while queue:
+        node = queue.pop()
+        order.append(node)
+        for nxt in successors[node]:
+            if nxt in indegree:
+                indegree[nxt] -= 1
+                if indegree[nxt] == 0:
+                    queue.append(nxt)
+
+    length = {n: 1 for n in order}
+    parent = {}
+    for node in order:
+        for nxt in successors[node]:
+            if nxt in length and length[node] + 1 > length[nxt]:
+                length[nxt] = length[node] + 1
+                parent[nxt] = node
+
+    if not length:
+        return []
+    end = max(length, key=lambda n: (length[n], n))
+    path = [end]
+    while path[-1] in parent:
+        path.append(parent[path[-1]])
+    return path[::-1]
+
+
+def train_spacing(df: pd.DataFrame, topology: StationTopology, snapshot_sec: int = None) -> pd.DataFrame:
+    """
+    스냅샷별로 같은 호선/방향/선로의 열차를 진행 순서로 정렬하여 앞 열차와의 간격(역 수)을 계산합니다.
+    :return: line_name, direction_type, snapshot, train_number, station_id, ordinal, spacing
+    """
+    freq = f"{snapshot_sec or Config.BATCH_INTERVAL}s"
+    base = df[['line_name', 'direction_type', 'train_number', 'station_id']].copy()
+    base['snapshot'] = pd.to_datetime(df['created_at'], utc=True).dt.floor(freq)
+    pos = topology.positions(df)
+    known = pos >= 0
+    base = base[known]
+    base['ordinal'] = topology._ordinal[pos[known]]
+    base['branch'] = topology._branch[pos[known]]
+    if base.empty:
+        return base.assign(spacing=pd.Series(dtype=float))
+
+    keys = ['line_name', 'direction_type', 'branch', 'snapshot']
+    base = base.drop_duplicates(keys[:2] + ['snapshot', 'train_number'], keep='last')
+    base = base.sort_values(keys + ['ordinal'], kind='stable')
+    # 정렬된 다음 행 = 바로 앞 열차
+    base['spacing'] = base.groupby(keys, observed=True)['ordinal'].shift(-1) - base['ordinal']
+    return base.drop(columns='branch').reset_index(drop=True)
+
+
+def observed_edges(df: pd.DataFrame, since: pd.Timestamp = None) -> pd.DataFrame:
+    """
+    관측 궤적의 역간 이동 횟수 (line_name, direction_type, station_id, next_station_id, 역 이름, count)
+    :param since: 다음 역에서 처음 관측된 시각(moved_at)이 이 시각 이후인 이동만 셈 (이미 센 구간 제외)
+    """
+    edges, _ = _observed_moves(df, since)
+    return edges
+
+def _observed_moves(df: pd.DataFrame, since: pd.Timestamp = None) -> tuple:
+    """(이동 횟수, 센 이동 중 가장 늦은 moved_at) - 이동 시각은 창 경계와 관계없이 같으므로 중복 집계 기준으로 씀"""
+    visits = reconstruct_visits(df)
+    # reconstruct_visits 결과는 열차별 시간순이므로 다음 행이 같은 열차의 다음 방문 (다른 열차면 next_station_id 가 NaN)
+    visits['moved_at'] = visits['first_seen'].shift(-1)
+    visits = visits.dropna(subset=['next_station_id'])
+    if since is not None:
+        visits = visits[visits['moved_at'] > since]
+    if visits.empty:
+        return pd.DataFrame(columns=EDGE_COLUMNS), None
+    edges = visits.groupby(['line_name', 'direction_type', 'station_id', 'next_station_id'], observed=True)\
+        .agg(station_name=('station_name', 'first'), next_station_name=('next_station_name', 'first'),
+             count=('station_id', 'size')).reset_index()
+    return _edge_frame(edges), visits['moved_at'].max()
+
+def _edge_frame(edges: pd.DataFrame) -> pd.DataFrame:
+    edges = edges[EDGE_COLUMNS].copy()
+    for col in EDGE_COLUMNS[:-1]:
+        edges[col] = edges[col].astype(str)
+    edges['count'] = edges['count'].astype(np.int64)
+    return edges
+
+def _strong_edges(edges: pd.DataFrame, keys: set, min_count: int = 2) -> dict:
+    """(호선, 방향) 별 순서 계산에 쓰이는 간선 집합"""
+    strong = edges[edges['count'] >= min_count]
+    result = {key: set() for key in keys}
+    for line, direction, a, b in zip(strong['line_name'], strong['direction_type'],
+                                     strong['station_id'], strong['next_station_id']):
+        if (line, direction) in result:
+            result[(line, direction)].add((a, b))
+    return result
+
+
+_cached_topology = None
+# 시드 파일에 있는 (호선, 방향) - 관측으로 바꾸지 않음
+_seed_keys = set()
+# 시드에 없는 호선/방향의 누적 관측 이동 횟수
+_observed = pd.DataFrame(columns=EDGE_COLUMNS)
+# _observed 에 이미 센 마지막 이동 시각 (겹치는 창을 여러 번 넘겨도 같은 이동을 다시 세지 않음)
+_counted_until = None
+
+def get_topology(df: pd.DataFrame = None, refresh: bool = False) -> StationTopology:
+    """
+    프로세스 공용 역 순서 색인을 반환합니다.
+    시드 파일 → 캐시 파일 순으로 읽고, 시드에 없는 호선/방향은 df 관측 궤적의 역간 이동 횟수를 누적하여
+    새 이동(역)이 나타날 때마다 다시 계산합니다.
+    이동은 다음 역에서 처음 관측된 시각 기준으로 마지막으로 센 시각 이후의 것만 누적합니다.
+    (분석기/대시보드가 겹치는 창을 반복해서 넘겨도 같은 이동을 다시 세지 않음, 그보다 이른 구간은 무시)
+    관측 이동이 TOPOLOGY_MIN_TRANSITIONS 회 이상 쌓인 호선/방향만 캐시 파일에 저장하며,
+    역 순서가 바뀌거나 새로 기준을 넘은 호선/방향이 있을 때만 저장합니다.
+    (첫 배치처럼 일부 역만 관측된 순서가 캐시에 굳지 않도록 함)
+    """
+    global _cached_topology, _seed_keys, _observed, _counted_until
+    if _cached_topology is None or refresh:
+        topology = StationTopology()
+        _seed_keys = set()
+        if Config.TOPOLOGY_SEED_PATH and os.path.exists(Config.TOPOLOGY_SEED_PATH):
+            try:
+                topology = StationTopology.load(Config.TOPOLOGY_SEED_PATH)
+                _seed_keys = topology.keys()
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[Topology Error] {Config.TOPOLOGY_SEED_PATH} 로드 실패: {e}")
+        if Config.TOPOLOGY_CACHE_PATH and os.path.exists(Config.TOPOLOGY_CACHE_PATH):
+            try:
+                topology = topology.merge(StationTopology.load(Config.TOPOLOGY_CACHE_PATH))
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[Topology Error] {Config.TOPOLOGY_CACHE_PATH} 로드 실패: {e}")
+        _observed, _counted_until = _load_edges()
+        _cached_topology = topology
+
+    if df is None or df.empty:
+        return _cached_topology
+
+    keys = pd.MultiIndex.from_frame(df[['line_name', 'direction_type']].astype(str))
+    unseeded = ~keys.isin(list(_seed_keys)) if _seed_keys else np.ones(len(df), dtype=bool)
+    if not unseeded.any():
+        return _cached_topology
+
+    new_edges, moved_until = _observed_moves(df[unseeded], _counted_until)
+    if new_edges.empty:
+        return _cached_topology
+    _counted_until = moved_until
+    touched = set(zip(new_edges['line_name'], new_edges['direction_type']))
+    before = _strong_edges(_observed, touched)
+    mature_before = _mature_keys()
+    _observed = pd.concat([_observed, new_edges], ignore_index=True)\
+        .groupby(EDGE_COLUMNS[:4], sort=False)\
+        .agg(station_name=('station_name', 'first'), next_station_name=('next_station_name', 'first'),
+             count=('count', 'sum')).reset_index()
+    _observed = _edge_frame(_observed)
+    after = _strong_edges(_observed, touched)
+
+    # 순서 계산에 쓰이는 이동이 달라진 호선/방향만 다시 계산 (새 역 추가, 잡음 간선 확정 등)
+    changed = {key for key in touched if before[key] != after[key] or key not in _cached_topology.keys()}
+    if changed:
+        mask = pd.Series(list(zip(_observed['line_name'], _observed['direction_type']))).isin(changed).to_numpy()
+        rebuilt = StationTopology.from_edges(_observed[mask])
+        if len(rebuilt):
+            _cached_topology = _cached_topology.replace(rebuilt)
+            print(f"[Topology] 관측 궤적으로 {len(changed)}개 호선/방향 역 순서 갱신 ({len(rebuilt)}개 역)")
+    if changed or _mature_keys() - mature_before:
+        _save_observed(_cached_topology)
+    return _cached_topology
+
+def _mature_keys() -> set:
+    """관측 이동이 TOPOLOGY_MIN_TRANSITIONS 회 이상 쌓인 (호선, 방향)"""
+    totals = _observed.groupby(['line_name', 'direction_type'])['count'].sum()
+    return set(totals[totals >= Config.TOPOLOGY_MIN_TRANSITIONS].index)
+
+def _edges_path() -> str:
+    root, _ = os.path.splitext(Config.TOPOLOGY_CACHE_PATH)
+    return f"{root}_edges.csv"
+
+def _watermark_path() -> str:
+    root, _ = os.path.splitext(Config.TOPOLOGY_CACHE_PATH)
+    return f"{root}_edges.json"
+
+def _load_edges() -> tuple:
+    """저장된 누적 이동 횟수와 마지막으로 센 이동 시각"""
+    empty = pd.DataFrame(columns=EDGE_COLUMNS), None
+    path = _edges_path() if Config.TOPOLOGY_CACHE_PATH else None
+    if not path or not os.path.exists(path):
+        return empty
+    try:
+        edges = _edge_frame(pd.read_csv(path, dtype=str).astype({'count': np.int64}))
+        counted_until = None
+        if os.path.exists(_watermark_path()):
+            with open(_watermark_path(), 'r', encoding='utf-8') as f:
+                saved = json.load(f).get("counted_until")
+            counted_until = pd.Timestamp(saved) if saved else None
+        return edges, counted_until
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[Topology Error] {path} 로드 실패: {e}")
+        return empty
+
+def _save_observed(topology: StationTopology):
+    """누적 이동 횟수와, 관측이 충분히 쌓인 호선/방향의 역 순서를 캐시에 저장합니다."""
+    if not Config.TOPOLOGY_CACHE_PATH:
+        return
+    mature = _mature_keys()
+    keys = pd.Series(list(zip(topology.table['line_name'].astype(str),
+                              topology.table['direction_type'].astype(str))), dtype=object)
+    persist = keys.isin(mature | _seed_keys).to_numpy()
+    try:
+        StationTopology(topology.table[persist]).save()
+        _observed.to_csv(_edges_path(), index=False, encoding='utf-8')
+        with open(_watermark_path(), 'w', encoding='utf-8') as f:
+            json.dump({"counted_until": _counted_until.isoformat() if _counted_until is not None else None}, f)
+    except OSError as e:
+        print(f"[Topology Error] 캐시 저장 실패: {e}")
@@ -0,0 +1,194 @@
+import threading
+import pandas as pd
+
+# 열차 상태 코드 (trainSttus, frames.typed_frame 에서 int8 로 변환)
+STATUS_ENTER = 0        # 진입
+STATUS_ARRIVE = 1       # 도착
+STATUS_DEPART = 2       # 출발
+
+TRAIN_KEYS = ['line_name', 'train_number']
+
+VISIT_COLUMNS = TRAIN_KEYS + [
+    'station_id', 'station_name', 'direction_type',
+    'first_seen', 'last_seen', 'arrival', 'departure', 'dwell',
+    'next_station_id', 'next_station_name', 'travel',
+]
+
+# 방문 기록의 시각/시간 컬럼 타입 (빈 결과도 reconstruct_visits 결과와 같은 타입으로 맞춤)
+VISIT_DTYPES = {
+    'first_seen': 'datetime64[ns, UTC]', 'last_seen': 'datetime64[ns, UTC]',
+    'arrival': 'datetime64[ns, UTC]', 'departure': 'datetime64[ns, UTC]',
+    'dwell': 'float64', 'travel': 'float64',
+}
+
+def empty_visits() -> pd.DataFrame:
+    """컬럼 타입을 갖춘 빈 방문 기록"""
+    return pd.DataFrame({col: pd.Series(dtype=VISIT_DTYPES.get(col, 'object')) for col in VISIT_COLUMNS})
+
+def concat_visits(*frames: pd.DataFrame) -> pd.DataFrame:
+    """빈 프레임을 제외하고 이어 붙여 시각 컬럼 타입이 object 로 바뀌지 않게 합니다."""
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return empty_visits()
+    return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+def event_times(df: pd.DataFrame) -> pd.Series:
+    """
+    이벤트 시각을 계산합니다.
+    API 수신 시각(last_rec_time, 한국시간)이 있으면 사용하고, 없으면 적재 시각(created_at)을 사용합니다.
+    """
+    created = pd.to_datetime(df['created_at'], utc=True)
+    if 'last_rec_time' not in df:
+        return created
+    received = pd.to_datetime(df['last_rec_time'], errors='coerce')
+    if received.dt.tz is None:
+        received = received.dt.tz_localize('Asia/Seoul', ambiguous='NaT', nonexistent='NaT')
+    return received.dt.tz_convert('UTC').fillna(created)
+
+def reconstruct_visits(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    열차별 궤적을 역 방문(visit) 단위로 재구성합니다.
+    - 열차(호선, 열차번호)와 이벤트 시각으로 한 번 정렬
+    - 직전 행과 역이 달라지는 지점마다 새 방문으로 구분 (cumsum)
+    - 방문별 최초 도착(1) 시각과 최초 출발(2) 시각의 차이 = 체류 시간(dwell, 초)
+    - 이번 역 출발 ~ 다음 역 도착 시각의 차이 = 역간 주행 시간(travel, 초)
+    """
+    if df.empty:
+        return empty_visits()
+
+    events = df[TRAIN_KEYS + ['station_id', 'station_name', 'direction_type', 'train_status']].copy()
+    events['t'] = event_times(df)
+    events = events.sort_values(TRAIN_KEYS + ['t'], kind='stable').reset_index(drop=True)
+
+    train_change = (events[TRAIN_KEYS] != events[TRAIN_KEYS].shift()).any(axis=1)
+    station_change = events['station_id'] != events['station_id'].shift()
+    events['visit'] = (train_change | station_change).cumsum()
+
+    status = pd.to_numeric(events['train_status'], errors='coerce')
+    events['arrival'] = events['t'].where(status == STATUS_ARRIVE)
+    events['departure'] = events['t'].where(status == STATUS_DEPART)
+
+    visits = events.groupby('visit', sort=True).agg(
+        line_name=('line_name', 'first'),
+        train_number=('train_number', 'first'),
+        station_id=('station_id', 'first'),
+        station_name=('station_name', 'first'),
+        direction_type=('direction_type', 'first'),
+        first_seen=('t', 'min'),
+        last_seen=('t', 'max'),
+        arrival=('arrival', 'min'),
+        departure=('departure', 'min'),
+    ).reset_index(drop=True)
+
+    dwell = (visits['departure'] - visits['arrival']).dt.total_seconds()
+    visits['dwell'] = dwell.where(dwell >= 0)
+
+    # 같은 열차의 다음 방문 정보
+    same_train = (visits[TRAIN_KEYS] == visits[TRAIN_KEYS].shift(-1)).all(axis=1)
+    visits['next_station_id'] = visits['station_id'].shift(-1).where(same_train)
+    visits['next_station_name'] = visits['station_name'].shift(-1).where(same_train)
+    travel = (visits['arrival'].shift(-1) - visits['departure']).dt.total_seconds()
+    visits['travel'] = travel.where(same_train & (travel >= 0))
+    return visits[VISIT_COLUMNS]
+
+
+class TripReconstructor:
+    """
+    배치 단위로 들어오는 위치 데이터를 받아 열차 방문 기록을 증분으로 갱신합니다.
+    새 배치에 등장한 열차만 다시 계산하며, 열차별 마지막 2개 방문의 이벤트는
+    아직 끝나지 않았거나(체류 중) 다음 역 도착을 기다리는 중이므로 tail 로 보관합니다.
+    """
+
+    TAIL_VISITS = 2
+
+    def __init__(self, idle_timeout: pd.Timedelta = pd.Timedelta(hours=1), history: pd.Timedelta = pd.Timedelta(days=1)):
+        # 이 시간 동안 새 관측이 없는 열차는 운행 종료로 보고 tail 을 확정
+        self.idle_timeout = idle_timeout
+        # 확정된 방문 기록을 메모리에 유지할 기간
+        self.history = history
+        self._tail = pd.DataFrame()
+        self.visits = empty_visits()
+        # 갱신 중인 tail/visits 를 분석 스레드가 반쯤 바뀐 상태로 읽지 않도록 함
+        self._lock = threading.Lock()
+
+    def current(self, since: pd.Timestamp = None) -> pd.DataFrame:
+        """
+        확정된 방문 기록과 아직 열린(tail) 방문을 합친 현재 방문 기록을 반환합니다. (tail 은 그대로 보관)
+        :param since: 마지막 관측이 이 시각 이후인 방문만
+        """
+        with self._lock:
+            visits, tail = self.visits, self._tail
+        open_visits = reconstruct_visits(tail) if not tail.empty else empty_visits()
+        result = concat_visits(visits, open_visits)
+        if since is not None:
+            result = result[result['last_seen'] >= since]
+        return result.reset_index(drop=True)
+
+    def update(self, batch: pd.DataFrame) -> pd.DataFrame:
+        """
+        새 배치를 반영하고, 이번에 확정된 방문 기록을 반환합니다.
+        :param batch: fetch_data/fetch_incremental 형식의 DataFrame
+        """
+        if batch.empty:
+            return empty_visits()
+        with self._lock:
+            return self._update(batch)
+
+    def _update(self, batch: pd.DataFrame) -> pd.DataFrame:
+
+        if self._tail.empty:
+            affected_tail = self._tail
+        else:
+            keys = pd.MultiIndex.from_frame(batch[TRAIN_KEYS].drop_duplicates())
+            tail_keys = pd.MultiIndex.from_frame(self._tail[TRAIN_KEYS])
+            in_batch = tail_keys.isin(keys)
+            affected_tail = self._tail[in_batch]
+            self._tail = self._tail[~in_batch]
+
+        rows = pd.concat([affected_tail, batch], ignore_index=True) if not affected_tail.empty else batch
+        visits = reconstruct_visits(rows)
+
+        # 열차별 뒤에서부터 방문 순번 (0 = 진행 중인 방문)
+        rank_from_end = visits.groupby(TRAIN_KEYS, sort=False, observed=True).cumcount(ascending=False)
+        finalized = visits[rank_from_end >= self.TAIL_VISITS]
+
+        # 아직 확정되지 않은 방문에 속한 원본 행만 tail 로 보관
+        open_visits = visits[rank_from_end < self.TAIL_VISITS]
+        first_open = open_visits.groupby(TRAIN_KEYS, sort=False, observed=True)['first_seen'].min().rename('open_from')
+        rows = rows.assign(_t=event_times(rows))
+        rows = rows.join(first_open, on=TRAIN_KEYS)
+        new_tail = rows[rows['_t'] >= rows['open_from']].drop(columns=['_t', 'open_from'])
+        self._tail = pd.concat([self._tail, new_tail], ignore_index=True) if not self._tail.empty else new_tail
+
+        finalized = concat_visits(finalized, self._expire_idle(batch))
+        self._append(finalized)
+        return finalized
+
+    def flush(self) -> pd.DataFrame:
+        """보관 중인 tail 을 모두 확정합니다. (수집 종료 / 일괄 분석 시)"""
+        with self._lock:
+            finalized = reconstruct_visits(self._tail) if not self._tail.empty else empty_visits()
+            self._tail = pd.DataFrame()
+            self._append(finalized)
+        return finalized
+
+    def _expire_idle(self, batch: pd.DataFrame) -> pd.DataFrame:
+        """idle_timeout 동안 관측되지 않은 열차의 tail 을 확정합니다."""
+        if self._tail.empty:
+            return empty_visits()
+        now = event_times(batch).max()
+        last_seen = self._tail.assign(_t=event_times(self._tail)).groupby(TRAIN_KEYS, observed=True)['_t'].max()
+        idle = last_seen[last_seen < now - self.idle_timeout].index
+        if idle.empty:
+            return empty_visits()
+        is_idle = pd.MultiIndex.from_frame(self._tail[TRAIN_KEYS]).isin(idle)
+        expired = reconstruct_visits(self._tail[is_idle])
+        self._tail = self._tail[~is_idle]
+        return expired
+
+    def _append(self, finalized: pd.DataFrame):
+        if finalized.empty:
+            return
+        self.visits = concat_visits(self.visits, finalized)
+        cutoff = self.visits['last_seen'].max() - self.history
+        self.visits = self.visits[self.visits['last_seen'] >= cutoff].reset_index(drop=True)
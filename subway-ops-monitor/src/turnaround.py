@@ -0,0 +1,104 @@
+import pandas as pd
+from trips import event_times, STATUS_ARRIVE
+
+# 같은 열차의 관측 간격이 이보다 벌어지면 별개의 운행(에피소드)으로 취급
+EPISODE_GAP = pd.Timedelta(minutes=30)
+# 종착역 도착 후 이 시간 안에 반대 방향 관측이 없으면 회차로 보지 않음
+MAX_TURNAROUND = pd.Timedelta(minutes=60)
+# 반대 방향 (0:상행/내선 ↔ 1:하행/외선, 그 밖의 값은 매칭하지 않음)
+OPPOSITE_DIRECTION = {0: 1, 1: 0}
+
+TURNAROUND_COLUMNS = [
+    'line_name', 'station_id', 'station_name', 'train_number', 'arrival',
+    'departure', 'next_train_number', 'turnaround_min', 'matched_by',
+]
+
+def _prepare(df: pd.DataFrame) -> pd.DataFrame:
+    """매칭에 필요한 컬럼만 골라 이벤트 시각/방향 코드를 붙이고 (호선, 열차, 시각) 순으로 정렬합니다."""
+    cols = ['line_name', 'train_number', 'station_id', 'station_name',
+            'dest_station_id', 'direction_type', 'train_status']
+    events = df[cols].copy()
+    events['t'] = event_times(df)
+    events['direction'] = pd.to_numeric(events['direction_type'], errors='coerce')
+    # 방향 코드가 없거나 0/1 이 아닌 행(-1 등)은 회차 판단에 쓰지 않음
+    events = events[events['direction'].isin(OPPOSITE_DIRECTION.keys())]
+    events = events.sort_values(['line_name', 'train_number', 't'], kind='stable')
+
+    same_train = (events['line_name'] == events['line_name'].shift()) \
+        & (events['train_number'] == events['train_number'].shift())
+    gap = events['t'] - events['t'].shift()
+    events['episode_start'] = ~same_train | (gap > EPISODE_GAP)
+    events['direction_change'] = same_train & ~events['episode_start'] \
+        & (events['direction'] != events['direction'].shift())
+    return events.reset_index(drop=True)
+
+def compute_turnarounds(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    종착역 도착 ~ 반대 방향 첫 관측까지의 회차 시간을 계산합니다.
+    1) 종착역 도착: station_id == dest_station_id 이고 train_status == 도착(1) 인 첫 행
+    2) 같은 열차번호가 반대 방향으로 처음 관측된 시각과 as-of 조인 (Python 루프 없음)
+    3) 매칭되지 않은 도착은 열차번호가 바뀐 것으로 보고,
+       같은 종착역에서 반대 방향으로 새로 관측되기 시작한 열차와 as-of 조인
+    """
+    if df.empty:
+        return pd.DataFrame(columns=TURNAROUND_COLUMNS)
+
+    events = _prepare(df)
+
+    # 1) 종착역 도착 이벤트 (같은 열차가 같은 종착역에 연속 도착한 행은 첫 행만)
+    at_terminal = (events['station_id'] == events['dest_station_id']) \
+        & (pd.to_numeric(events['train_status'], errors='coerce') == STATUS_ARRIVE)
+    arrivals = events[at_terminal]
+    prev = arrivals.shift()
+    first_arrival = (arrivals['line_name'] != prev['line_name']) \
+        | (arrivals['train_number'] != prev['train_number']) \
+        | (arrivals['station_id'] != prev['station_id']) \
+        | (arrivals['t'] - prev['t'] > EPISODE_GAP)
+    arrivals = arrivals[first_arrival][['line_name', 'train_number', 'station_id', 'station_name', 'direction', 't']]
+    arrivals = arrivals.rename(columns={'t': 'arrival'})
+    arrivals['opposite'] = arrivals['direction'].map(OPPOSITE_DIRECTION).astype(arrivals['direction'].dtype)
+    if arrivals.empty:
+        return pd.DataFrame(columns=TURNAROUND_COLUMNS)
+    arrivals = arrivals.sort_values('arrival', kind='stable')
+
+    # 2) 같은 열차번호의 방향 전환 시점
+    turns = events[events['direction_change']][['line_name', 'train_number', 'direction', 't']]
+    turns = turns.rename(columns={'t': 'departure', 'direction': 'opposite'}).sort_values('departure', kind='stable')
+    same = pd.merge_asof(
+        arrivals, turns,
+        left_on='arrival', right_on='departure',
+        by=['line_name', 'train_number', 'opposite'],
+        direction='forward', tolerance=MAX_TURNAROUND,
+    )
+    same['next_train_number'] = same['train_number'].where(same['departure'].notna())
+    same['matched_by'] = 'same_number'
+
+    # 3) 열차번호 변경: 종착역에서 반대 방향으로 새 운행을 시작한 열차와 매칭
+    unmatched = same[same['departure'].isna()].drop(columns=['departure', 'next_train_number', 'matched_by'])
+    starts = events[events['episode_start']][['line_name', 'train_number', 'station_id', 'direction', 't']]
+    starts = starts.rename(columns={
+        't': 'departure', 'direction': 'opposite', 'train_number': 'next_train_number',
+    }).sort_values('departure', kind='stable')
+    renumbered = pd.merge_asof(
+        unmatched.sort_values('arrival', kind='stable'), starts,
+        left_on='arrival', right_on='departure',
+        by=['line_name', 'station_id', 'opposite'],
+        direction='forward', tolerance=MAX_TURNAROUND,
+    )
+    renumbered['matched_by'] = 'renumbered'
+
+    result = pd.concat([same[same['departure'].notna()], renumbered[renumbered['departure'].notna()]],
+                       ignore_index=True)
+    result['turnaround_min'] = (result['departure'] - result['arrival']).dt.total_seconds() / 60.0
+    return result[TURNAROUND_COLUMNS].sort_values('arrival').reset_index(drop=True)
+
+def turnaround_stats(turnarounds: pd.DataFrame) -> pd.DataFrame:
+    """종착역별 회차 시간 백분위수(분)를 계산합니다."""
+    if turnarounds.empty:
+        return pd.DataFrame(columns=['line_name', 'station_name', 'count', 'mean', 'p50', 'p90', 'max'])
+    grouped = turnarounds.groupby(['line_name', 'station_name'], observed=True)['turnaround_min']
+    stats = grouped.agg(['count', 'mean', 'max'])
+    quantiles = grouped.quantile([0.5, 0.9]).unstack()
+    stats['p50'] = quantiles[0.5]
+    stats['p90'] = quantiles[0.9]
+    return stats[['count', 'mean', 'p50', 'p90', 'max']].reset_index()